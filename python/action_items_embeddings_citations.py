@@ -1,12 +1,16 @@
 from pydantic import BaseModel
 import assemblyai as aai
 from assemblyai import LemurQuestionAnswer
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
 import requests
-nltk.download('punkt')
 import os
+import re
+import numpy as np
+import metrics
+from grounding import score_granularities, citations
+from grounding_index import search_granularities
+from embedding_cache import load_transcript_embeddings
+from model_registry import get_encoder
+from transcript_loader import get_default_loader
 
 # Replace with your API token
 aai.settings.api_key = os.environ.get("assemblyai_key")
@@ -16,10 +20,9 @@ headers = {
 }
 
 
-# should use this for action items
-transcriber = aai.Transcriber()
-
 #comment back in to re-generate the transcript and action items w a new context
+# should use this for action items (creating a Transcriber needs the API key, so it is not done at import)
+# transcriber = aai.Transcriber()
 # transcript = transcriber.transcribe("https://storage.googleapis.com/aai-web-samples/meeting.mp4")
 
 # if transcript.error:
@@ -55,126 +58,182 @@ Here are the action items I would suggest based on the transcript:
 """
 
 
-# Splitting the text into sections based on headers
-sections = {}
-current_section = None
-for line in action_items_response.strip().split("\n"):
-    if line.startswith("**") and line.endswith("**"):
-        current_section = line[2:-2].strip()  # Remove the ** and strip any spaces
-        sections[current_section] = []
-    elif current_section and line.strip() != "":
-        sections[current_section].append(line.strip())
+# Note - the first time the model is used it will take some time to download it locally.
+# The model registry loads it lazily, once per process, so importing this module stays cheap.
+# Why all-MiniLM-L6-v2? it's near the top of the leaderboard for semantic similarity search and is 5x faster than the largest model
+# It's also a good model for semantic similarity because it's been trained on the STSB benchmark dataset
+# MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_NAME = "infgrad/stella-base-en-v2"
 
-# Convert the dictionary format into a standard list of strings
+#this is the gitlab meeting transcript
+TRANSCRIPT_ID = "6v4muko96g-2d7a-4bc9-883f-fb33b4691a8e"
 
-formatted_action_items_sections = []
+ACTION_ITEM_THRESHOLDS = {
+    "sentence": 0.80, # Typically set higher than paragraph_threshold
+    "paragraph": 0.73, # Typically set lower than sentence_threshold
+    "chunk": 0.78,  # This could be set between the sentence and paragraph thresholds
+}
 
-for header, tasks in sections.items():
-    section_text = header + "\n" + "\n".join(tasks)
-    formatted_action_items_sections.append(section_text)
 
-#this is the gitlab meeting transcript
-transcript = aai.Transcript.get_by_id("6v4muko96g-2d7a-4bc9-883f-fb33b4691a8e")
+def fetch_segments():
+    # Paragraphs and sentences are requested concurrently and kept in the segment cache
+    return get_default_loader().load(TRANSCRIPT_ID)
 
-paragraphs = []
-for paragraph in transcript.get_paragraphs():
-    paragraphs.append(paragraph.text)
 
-sentences = []
-for sentence in transcript.get_sentences():
-    sentences.append(sentence.text)
+_HEADER = re.compile(r"^\*\*(.+?)\*\*:?$")
+_BULLET_MARKER = re.compile(r"^(?:[-*\u2022]|\d+[.)])\s+")
 
-def sliding_window(sentences, window_size=3):
+
+class ParsedActionItems:
     """
-    Splits sentences into chunks using a sliding window approach.
-    
-    Args:
-    - sentences (list of str): List of sentences from the transcript.
-    - window_size (int): Number of sentences per chunk.
-    
-    Returns:
-    - list of str: Chunks of sentences.
+    Action items flattened to one list of bullets.
+
+    - headers (list of str): section headers, in order ("" for bullets outside any section).
+    - bullets (list of str): every bullet without its list marker, in order.
+    - sections (array [n_bullets] of int): index into headers of each bullet's section.
     """
-    chunks = []
-    for i in range(0, len(sentences) - window_size + 1):
-        chunk = " ".join(sentences[i:i+window_size])
-        chunks.append(chunk)
-    return chunks
 
+    __slots__ = ("headers", "bullets", "sections")
 
-# Load the pre-trained sentence transformer model
-# Note - the first time you do this, it will take some time to download the model
-# We are downloading the model locally
-# Why all-MiniLM-L6-v2? it's near the top of the leaderboard for semantic similarity search and is 5x faster than the largest model
-# It's also a good model for semantic similarity because it's been trained on the STSB benchmark dataset
-# model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-model = SentenceTransformer("infgrad/stella-base-en-v2")
-
-# Embed each sentence in sentences
-sentence_embeddings = model.encode(sentences)
-paragraph_embeddings = model.encode(paragraphs)
-# Create chunks of 3 sentences using the sliding window approach
-sentence_chunks = sliding_window(sentences)
-# Embed each chunk
-chunk_embeddings = model.encode(sentence_chunks)
-
-def compare_against_all_granularities(qa_embedding, embeddings_list, k):
+    def __init__(self, headers, bullets, sections):
+        self.headers = headers
+        self.bullets = bullets
+        self.sections = np.asarray(sections, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.bullets)
+
+
+def parse_action_items(action_items):
+    """
+    Parse a LeMUR action items response ("**<topic header>**\n- item\n- item...") into bullets.
+
+    Lines before the first header are the model's preamble and are skipped unless they are list
+    items. A list of strings is taken as bullets that belong to no section.
     """
-    Compare the action items embedding against a list of embeddings and return the top_k similar items' indices and scores.
+    if not isinstance(action_items, str):
+        bullets = [item.strip() for item in action_items if item.strip()]
+        return ParsedActionItems([""] if bullets else [], bullets, [0] * len(bullets))
+
+    headers, bullets, sections = [], [], []
+    for line in action_items.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        header = _HEADER.match(line)
+        if header:
+            headers.append(header.group(1).strip())
+            continue
+        is_bullet = _BULLET_MARKER.match(line)
+        if not headers:
+            if not is_bullet:
+                continue
+            headers.append("")
+        bullets.append(_BULLET_MARKER.sub("", line) if is_bullet else line)
+        sections.append(len(headers) - 1)
+    return ParsedActionItems(headers, bullets, sections)
+
+
+def validate_action_items(action_items, texts, granularity_index, model_name=MODEL_NAME, k=3, thresholds=ACTION_ITEM_THRESHOLDS):
+    """
+    Ground every action item bullet on its own, and roll the verdicts up per section.
+
+    Args:
+    - action_items (str or list of str): a LeMUR action items response, or a list of items.
+    - texts (dict): granularity -> list of transcript texts, for the citations.
+    - granularity_index: the transcript as a dict of embeddings, a FusedIndex, or a dict of grounding_index indexes.
+    - model_name (str): sentence transformer used to embed the bullets.
+    - k (int): number of nearest transcript items kept per granularity.
+    - thresholds (dict): granularity -> similarity threshold.
+
+    Returns:
+    - dict:
+      - "action_items" (list of dict): per bullet {"section", "action_item", "citation", "grounding_threshold_passed"};
+      - "sections" (list of dict): per section {"header", "action_items", "grounded_action_items", "grounding_threshold_passed"},
+        where a section passes only if it has bullets and all of them do;
+      - "new_action_items" (str): the response rebuilt from the grounded bullets only;
+      - "filtered_action_items" (list of str): the ungrounded bullets.
     """
-    similarities = cosine_similarity([qa_embedding], embeddings_list)[0]
-    top_k_indices = similarities.argsort()[-k:][::-1]
-    return top_k_indices, similarities[top_k_indices]
-
-
-# Embed each action items and store a mapping between the action items text and the embedding
-action_items_embeddings = {}
-for action_item in formatted_action_items_sections:
-    embedding = model.encode([action_item])[0]
-    action_items_embeddings[action_item] = embedding
-
-
-k = 3  # top k similar items to retrieve
-
-new_action_items = []
-filtered_action_items = []
-
-sentence_threshold = 0.80 # Typically set higher than paragraph_threshold
-paragraph_threshold = 0.73 # Typically set lower than sentence_threshold
-chunk_threshold = 0.78  # This could be set between the sentence and paragraph thresholds
-
-for action_item, action_item_embedding in action_items_embeddings.items():
-    # Compare the summary sentence against all three granularities
-    top_k_sentence_indices, top_k_sentence_similarities = compare_against_all_granularities(action_item_embedding, sentence_embeddings, k)
-    top_k_paragraph_indices, top_k_paragraph_similarities = compare_against_all_granularities(action_item_embedding, paragraph_embeddings, k)
-    top_k_chunk_indices, top_k_chunk_similarities = compare_against_all_granularities(action_item_embedding, chunk_embeddings, k)
-    
-    # Extract the most similar item from each granularity
-    most_similar_sentence = sentences[top_k_sentence_indices[0]]
-    most_similar_paragraph = paragraphs[top_k_paragraph_indices[0]]
-    most_similar_chunk = sentence_chunks[top_k_chunk_indices[0]]
-    
-    # Check if the similarity scores cross their respective thresholds
-    sentence_pass = any(sim >= sentence_threshold for sim in top_k_sentence_similarities)
-    paragraph_pass = any(sim >= paragraph_threshold for sim in top_k_paragraph_similarities)
-    chunk_pass = any(sim >= chunk_threshold for sim in top_k_chunk_similarities)
-    
-    # If any of the granularities pass their threshold, include the summary sentence
-    if sentence_pass or paragraph_pass or chunk_pass:
-        new_action_items.append(action_item)
-    else:
-        filtered_action_items.append(action_item)
-    
-    # Log the most similar items with their scores
-    print("********************************")
-    print(f"ACTION ITEM: {action_item}")
-    print(f"Most similar sentence: {most_similar_sentence} (score: {top_k_sentence_similarities[0]})")
-    print(f"Most similar paragraph: {most_similar_paragraph} (score: {top_k_paragraph_similarities[0]})")
-    print(f"Most similar chunk: {most_similar_chunk} (score: {top_k_chunk_similarities[0]})")
-
-print("***************************")
-print("NEW ACTION ITEMS OUTPUT")
-print(new_action_items)
-print("***************************")
-print("FILTERED ACTION ITEMS")
-print(filtered_action_items)
\ No newline at end of file
+    parsed = parse_action_items(action_items)
+    if not len(parsed):
+        return {"action_items": [], "sections": [], "new_action_items": "", "filtered_action_items": []}
+    with metrics.span("validate", output="action_items"):
+        # Every bullet of every section goes through the encoder in one batch
+        embeddings = get_encoder(model_name).encode(parsed.bullets)
+        if isinstance(granularity_index, dict) and any(hasattr(index, "search") for index in granularity_index.values()):
+            scores = search_granularities(embeddings, granularity_index, k, query_texts=parsed.bullets)
+        else:
+            scores = score_granularities(embeddings, granularity_index, k)
+        # The passes_thresholds (>=) rule decides both the verdict and its citation
+        bullet_citations = citations(scores, thresholds, texts, strict=False)
+        passed = np.array([bullet_passed for _, _, bullet_passed in bullet_citations], dtype=bool)
+        grounded_per_section = np.bincount(parsed.sections, weights=passed, minlength=len(parsed.headers)).astype(int)
+        bullets_per_section = np.bincount(parsed.sections, minlength=len(parsed.headers))
+    metrics.incr("items_validated", len(parsed), output="action_items")
+    metrics.incr("items_filtered", int((~passed).sum()), output="action_items")
+
+    results = [
+        {
+            "section": parsed.headers[section],
+            "action_item": bullet,
+            "citation": {"reference": reference, "similarity_score": similarity},
+            "grounding_threshold_passed": bullet_passed,
+        }
+        for bullet, section, (reference, similarity, bullet_passed) in zip(parsed.bullets, parsed.sections, bullet_citations)
+    ]
+    sections = [
+        {
+            "header": header,
+            "action_items": int(bullets_per_section[position]),
+            "grounded_action_items": int(grounded_per_section[position]),
+            # A header without bullets grounds nothing
+            "grounding_threshold_passed": bool(0 < grounded_per_section[position] == bullets_per_section[position]),
+        }
+        for position, header in enumerate(parsed.headers)
+    ]
+    new_action_items = []
+    for position, header in enumerate(parsed.headers):
+        kept = [parsed.bullets[row] for row in np.flatnonzero(passed & (parsed.sections == position))]
+        if kept:
+            new_action_items.append("\n".join(([f"**{header}**"] if header else []) + [f"- {bullet}" for bullet in kept]))
+    return {
+        "action_items": results,
+        "sections": sections,
+        "new_action_items": "\n\n".join(new_action_items),
+        "filtered_action_items": [result["action_item"] for result in results if not result["grounding_threshold_passed"]],
+    }
+
+
+def main():
+    model = get_encoder(MODEL_NAME)
+
+    # Embed each sentence, paragraph and 3-sentence chunk of the transcript
+    # After the first run these come straight from the on-disk cache, skipping both the fetch and the encoder
+    texts, embeddings = load_transcript_embeddings(TRANSCRIPT_ID, MODEL_NAME, fetch_segments, model.encode)
+
+    k = 3  # top k similar items to retrieve
+
+    # Every bullet is grounded on its own, so one hallucinated item no longer sinks (or hides in) its section
+    result = validate_action_items(action_items_response, texts, embeddings, MODEL_NAME, k)
+
+    for item in result["action_items"]:
+        # Log the winning citation of every bullet
+        print("********************************")
+        print(f"ACTION ITEM ({item['section']}): {item['action_item']}")
+        print(f"Citation: {item['citation']['reference']} (score: {item['citation']['similarity_score']})")
+
+    print("***************************")
+    print("SECTIONS")
+    for section in result["sections"]:
+        print(f"{section['header']}: {section['grounded_action_items']}/{section['action_items']} grounded")
+    print("***************************")
+    print("NEW ACTION ITEMS OUTPUT")
+    print(result["new_action_items"])
+    print("***************************")
+    print("FILTERED ACTION ITEMS")
+    print(result["filtered_action_items"])
+    metrics.dump()
+
+
+if __name__ == "__main__":
+    main()
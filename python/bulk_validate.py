@@ -0,0 +1,315 @@
+"""
+Bulk validation of archived LeMUR outputs across a process pool.
+
+The manifest is JSONL, one job per line:
+
+    {"id": "job-1", "transcript_id": "...", "summary": "...", "qa": [{"question": ..., "answer": ...}], "action_items": ["..."]}
+
+action_items may also be a whole LeMUR action items response ("**<topic header>**\n- item...").
+
+Instead of transcript_id a job may carry transcript_text (segmented locally) or transcript_sentences
+(optionally with transcript_paragraphs). summary, qa and action_items are all optional.
+
+Each worker loads the sentence transformer once. Transcripts are processed in waves: every
+unique transcript of a wave is encoded once, by one worker, into a shared-memory block holding
+its fused, normalized embedding matrix. The jobs of the wave then attach to those blocks
+read-only instead of each re-encoding or copying the transcript. The segment texts are not
+shipped with the jobs: each worker reads them locally once per transcript and wave. Results are appended to the
+output JSONL as soon as each job finishes, and a rerun skips every id already in the output.
+
+    python bulk_validate.py manifest.jsonl results.jsonl [--workers N] [--model NAME] [--wave-size N]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import metrics
+from chunking import ChunkTexts, split_into_paragraphs
+from embedding_cache import encode_segments, load_transcript_embeddings
+from grounding import GRANULARITIES, FusedIndex, as_rows, normalize_rows_into
+from model_registry import get_encoder, sent_tokenize
+
+DEFAULT_MODEL = "infgrad/stella-base-en-v2"
+
+# Per-worker state: the model name, plus the shared-memory blocks and segment texts of the current wave
+_worker_model_name = None
+_attached = {}
+_attached_texts = {}
+_attached_wave = None
+
+
+def _init_worker(model_name):
+    global _worker_model_name
+    _worker_model_name = model_name
+    get_encoder(model_name)
+
+
+def transcript_key(job):
+    if job.get("transcript_id"):
+        return "id:" + job["transcript_id"]
+    source = job.get("transcript_text") or "\n".join(job.get("transcript_sentences", []))
+    if job.get("transcript_paragraphs"):
+        # Same sentences segmented into different paragraphs are a different transcript
+        source += "\x1f" + "\n".join(job["transcript_paragraphs"])
+    return "text:" + hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def transcript_segments(job):
+    """
+    (paragraphs, sentences) of the job's transcript, from the segment cache for a transcript_id.
+    """
+    if job.get("transcript_id"):
+        from transcript_loader import get_default_loader
+
+        # bulk_validate prefetched every transcript into the segment cache, so this normally reads from disk
+        return get_default_loader().load(job["transcript_id"])
+    sentences = job.get("transcript_sentences") or sent_tokenize(job["transcript_text"])
+    paragraphs = job.get("transcript_paragraphs") or split_into_paragraphs(sentences)
+    return paragraphs, sentences
+
+
+def _untrack(block):
+    """
+    Hand a shared-memory block's lifetime to the parent process.
+
+    On POSIX every SharedMemory handle registers with the resource tracker of its process, and a
+    worker's tracker would "clean up" (warn about and try to unlink) blocks at exit that the
+    parent has already unlinked. Only the parent, which unlinks every block, keeps it registered.
+    """
+    if os.name == "posix":
+        resource_tracker.unregister(block._name, "shared_memory")
+
+
+def _transcript_texts(job, model):
+    if job.get("transcript_id"):
+        return load_transcript_embeddings(
+            job["transcript_id"], _worker_model_name, lambda: transcript_segments(job), model.encode
+        )
+    paragraphs, sentences = transcript_segments(job)
+    return encode_segments(paragraphs, sentences, model.encode)
+
+
+def encode_transcript(job):
+    """
+    Worker task: encode one transcript and publish its fused matrix in a new shared-memory block.
+
+    The parent process owns the block from here on and unlinks it once the wave is done; this
+    worker drops it from its own resource tracker.
+    """
+    model = get_encoder(_worker_model_name)
+    _, embeddings = _transcript_texts(job, model)
+    matrices = [as_rows(embeddings[granularity]) for granularity in GRANULARITIES]
+    # An empty granularity may come without a dimension
+    dim = max(matrix.shape[1] for matrix in matrices)
+    sizes = [len(matrix) for matrix in matrices]
+    shape = (sum(sizes), dim)
+
+    block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 4))
+    _untrack(block)
+    stacked = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+    # Normalized block by block straight into shared memory, without a normalized copy in between
+    for matrix, start in zip(matrices, np.cumsum([0] + sizes[:-1])):
+        normalize_rows_into(matrix, stacked[start:start + len(matrix)])
+    del stacked
+    block.close()
+    return {
+        "key": transcript_key(job),
+        "shm_name": block.name,
+        "shape": shape,
+        "offsets": np.concatenate([[0], np.cumsum(sizes)]).tolist(),
+    }
+
+
+def _attach(meta):
+    global _attached_wave
+    if meta["wave"] != _attached_wave:
+        # A new wave started, so the previous wave's blocks are about to be unlinked: drop our mappings
+        for block, _ in _attached.values():
+            block.close()
+        _attached.clear()
+        _attached_texts.clear()
+        _attached_wave = meta["wave"]
+    entry = _attached.get(meta["shm_name"])
+    if entry is None:
+        # Only ever read here; the parent unlinks the block
+        block = shared_memory.SharedMemory(name=meta["shm_name"])
+        _untrack(block)
+        matrix = np.ndarray(tuple(meta["shape"]), dtype=np.float32, buffer=block.buf)
+        matrix.flags.writeable = False
+        entry = (block, FusedIndex.from_stacked(matrix, meta["offsets"]))
+        _attached[meta["shm_name"]] = entry
+    return entry[1]
+
+
+def _texts(job, meta):
+    # Segmenting (or reading) the transcript again is cheap next to pickling its texts into every job
+    texts = _attached_texts.get(meta["key"])
+    if texts is None:
+        paragraphs, sentences = transcript_segments(job)
+        texts = {"sentence": sentences, "paragraph": paragraphs, "chunk": ChunkTexts(sentences)}
+        _attached_texts[meta["key"]] = texts
+    return texts
+
+
+def validate_job(job, meta, k=3):
+    """
+    Worker task: validate every output of one manifest job against its shared transcript matrix.
+    """
+    with metrics.span("validate_job"):
+        return _validate_job(job, meta, k)
+
+
+def _validate_job(job, meta, k):
+    from action_items_embeddings_citations import validate_action_items
+    from qa_embeddings_citations import process_lemur_qa_batch
+    from summary_embeddings_citations import filter_summary_sentences_local
+
+    index = _attach(meta)
+    texts = _texts(job, meta)
+    result = {"id": job["id"], "transcript": meta["key"]}
+    if job.get("summary"):
+        new_summary, filtered_sentences = filter_summary_sentences_local(job["summary"], index, _worker_model_name, k)
+        result["summary"] = {"new_summary": new_summary, "filtered_sentences": filtered_sentences}
+    if job.get("qa"):
+        result["qa"] = process_lemur_qa_batch([(texts, index, job["qa"])], k, _worker_model_name)[0]
+    if job.get("action_items"):
+        # A list of items or a whole LeMUR response; every bullet is grounded on its own
+        action_items = validate_action_items(job["action_items"], texts, index, _worker_model_name, k)
+        result["action_items"] = action_items["action_items"]
+        result["action_item_sections"] = action_items["sections"]
+    return result
+
+
+def read_manifest(path):
+    with open(path) as f:
+        jobs = [json.loads(line) for line in f if line.strip()]
+    for position, job in enumerate(jobs):
+        job.setdefault("id", str(position))
+    return jobs
+
+
+def completed_ids(output_path):
+    """
+    Ids already validated successfully. Jobs that ended in an error are retried on the next run,
+    and a partially written last line (from a crash) is ignored.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if "error" not in record:
+                    done.add(record["id"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _waves(jobs, wave_size):
+    groups = {}
+    for job in jobs:
+        groups.setdefault(transcript_key(job), []).append(job)
+    keys = list(groups)
+    for start in range(0, len(keys), wave_size):
+        yield {key: groups[key] for key in keys[start:start + wave_size]}
+
+
+def bulk_validate(manifest_path, output_path, model_name=DEFAULT_MODEL, workers=None, wave_size=32, k=3, mp_context=None):
+    """
+    Validate every pending job of the manifest and append the results to output_path.
+
+    Returns:
+    - dict: counts of jobs done in this run, skipped from a previous run, and failed.
+    """
+    jobs = read_manifest(manifest_path)
+    done = completed_ids(output_path)
+    pending = [job for job in jobs if job["id"] not in done]
+    stats = {"done": 0, "skipped": len(jobs) - len(pending), "failed": 0}
+    if not pending:
+        return stats
+
+    workers = workers or os.cpu_count() or 1
+    transcript_ids = [job["transcript_id"] for job in pending if job.get("transcript_id")]
+    if transcript_ids:
+        from transcript_loader import get_default_loader
+
+        # Fetch every transcript's segments up front, concurrently; failures resurface per job in the workers
+        get_default_loader().load_many(transcript_ids, return_exceptions=True)
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn_line = f.read(1) != b"\n"
+        if torn_line:
+            # Terminate the half-written line from a crash so the next record starts on its own line
+            with open(output_path, "a") as f:
+                f.write("\n")
+    context = multiprocessing.get_context(mp_context) if mp_context else None
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(model_name,)) as pool, \
+            open(output_path, "a") as output:
+
+        def write(record):
+            output.write(json.dumps(record) + "\n")
+            # Flushed per job so a crash loses at most the job in flight
+            output.flush()
+
+        for wave_number, wave in enumerate(_waves(pending, wave_size)):
+            blocks = {}
+            try:
+                # Worker-side spans stay in the worker processes; the parent times each wave's two phases
+                with metrics.span("bulk_wave", phase="encode"):
+                    encode_futures = {pool.submit(encode_transcript, group[0]): key for key, group in wave.items()}
+                    for future in as_completed(encode_futures):
+                        key = encode_futures[future]
+                        try:
+                            blocks[key] = {**future.result(), "wave": wave_number}
+                        except Exception as e:
+                            for job in wave[key]:
+                                write({"id": job["id"], "error": f"transcript failed: {e}"})
+                                stats["failed"] += 1
+
+                with metrics.span("bulk_wave", phase="validate"):
+                    validate_futures = {
+                        pool.submit(validate_job, job, blocks[key], k): job
+                        for key, group in wave.items() if key in blocks
+                        for job in group
+                    }
+                    for future in as_completed(validate_futures):
+                        job = validate_futures[future]
+                        try:
+                            write(future.result())
+                            stats["done"] += 1
+                        except Exception as e:
+                            write({"id": job["id"], "error": str(e)})
+                            stats["failed"] += 1
+            finally:
+                # Workers still mapping these blocks drop them when they see the next wave;
+                # unlinking now only removes the name, the memory goes once the last mapping closes
+                for name in (meta["shm_name"] for meta in blocks.values()):
+                    try:
+                        block = shared_memory.SharedMemory(name=name)
+                        block.close()
+                        block.unlink()
+                    except FileNotFoundError:
+                        pass
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a JSONL manifest of LeMUR outputs across a process pool.")
+    parser.add_argument("manifest")
+    parser.add_argument("output")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--wave-size", type=int, default=32, help="transcripts held in shared memory at once")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+    print(bulk_validate(args.manifest, args.output, args.model, args.workers, args.wave_size, args.k))
+    metrics.dump()
@@ -0,0 +1,93 @@
+"""
+Early-exit cascaded grounding: a small model scores everything, the large model only the borderline cases.
+
+all-MiniLM-L6-v2 (the model the node validators use) is about 5x faster than stella-base. Every
+query is scored with it first, against its thresholds. A query exits early when the best margin
+over the fast thresholds, max over granularities of (top similarity - threshold), is outside
+[-band, +band]: it is then a clear pass or a clear fail. Only the queries inside the band are
+re-encoded and re-scored with the slow model, and its verdict replaces the fast one.
+
+The slow transcript index may be passed as a zero-argument callable. It is then only built
+(encoded, or read from the embedding cache) when at least one query actually escalates.
+"""
+import numpy as np
+
+import metrics
+from grounding import GRANULARITIES, citations, passes_thresholds, score_granularities, top_similarities
+from grounding_index import search_granularities
+from model_registry import get_encoder
+
+FAST_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# The thresholds the node validators use with all-MiniLM-L6-v2
+FAST_GRANULARITY_THRESHOLDS = {"sentence": 0.75, "paragraph": 0.69, "chunk": 0.72}
+FAST_SUMMARY_THRESHOLDS = {"sentence": 0.6, "paragraph": 0.6, "chunk": 0.6}
+DEFAULT_BAND = 0.05
+
+
+def _search(query_embeddings, index, k, query_texts=None):
+    if isinstance(index, dict) and any(hasattr(item, "search") for item in index.values()):
+        return search_granularities(query_embeddings, index, k, query_texts=query_texts)
+    return score_granularities(query_embeddings, index, k)
+
+
+def escalation_mask(scores, thresholds, band=DEFAULT_BAND):
+    """
+    Boolean mask of queries whose best margin over the thresholds lies within [-band, band].
+    """
+    margins = top_similarities(scores, GRANULARITIES) - np.array([thresholds[granularity] for granularity in GRANULARITIES])
+    return np.abs(margins.max(axis=1)) <= band
+
+
+def cascade_scores(queries, fast_index, slow_index, fast_model, slow_model, fast_thresholds, k=3, band=DEFAULT_BAND):
+    """
+    Score queries with the fast model and re-score the borderline ones with the slow model.
+
+    Args:
+    - queries (list of str): generated text to ground (summary sentences, answers...).
+    - fast_index / slow_index: transcript embeddings of each model, in any form score_granularities
+      or search_granularities accepts. slow_index may be a zero-argument callable returning one.
+    - fast_thresholds (dict): thresholds the escalation band is centred on.
+    - band (float): half-width of the uncertainty band; 0 never escalates, 1 always does.
+
+    Returns:
+    - (dict, dict or None, array, dict): fast scores of every query, slow scores of the escalated
+      queries only (None when nothing escalated), the indices of the escalated queries, and stats.
+    """
+    fast_scores = _search(get_encoder(fast_model).encode(queries), fast_index, k, queries)
+    escalated = np.flatnonzero(escalation_mask(fast_scores, fast_thresholds, band))
+    slow_scores = None
+    if len(escalated):
+        if callable(slow_index):
+            with metrics.span("cascade_slow_index"):
+                slow_index = slow_index()
+        escalated_queries = [queries[row] for row in escalated]
+        slow_scores = _search(get_encoder(slow_model).encode(escalated_queries), slow_index, k, escalated_queries)
+    metrics.incr("cascade_items", len(queries))
+    metrics.incr("cascade_escalated", len(escalated))
+    stats = {
+        "items": len(queries),
+        "escalated": len(escalated),
+        "escalated_fraction": len(escalated) / len(queries) if len(queries) else 0.0,
+    }
+    return fast_scores, slow_scores, escalated, stats
+
+
+def cascade_passes(fast_scores, slow_scores, escalated, fast_thresholds, slow_thresholds):
+    """
+    passes_thresholds for a cascade: the fast verdict, overridden by the slow one for escalated rows.
+    """
+    passed = passes_thresholds(fast_scores, fast_thresholds)
+    if slow_scores is not None:
+        passed[escalated] = passes_thresholds(slow_scores, slow_thresholds)
+    return passed
+
+
+def cascade_citations(fast_scores, slow_scores, escalated, fast_thresholds, slow_thresholds, texts):
+    """
+    grounding.citations for a cascade; escalated rows cite (and score) with the slow model.
+    """
+    results = citations(fast_scores, fast_thresholds, texts)
+    if slow_scores is not None:
+        for row, citation in zip(escalated, citations(slow_scores, slow_thresholds, texts)):
+            results[row] = citation
+    return results
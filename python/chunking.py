@@ -0,0 +1,123 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+from grounding import normalize_rows
+
+
+def chunk_starts(n_sentences, window_size=3, stride=1):
+    """
+    Start offsets of every sliding-window chunk over n_sentences sentences.
+    """
+    if n_sentences < window_size:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(0, n_sentences - window_size + 1, stride, dtype=np.int64)
+
+
+def sliding_window(sentences, window_size=3, stride=1):
+    """
+    Splits sentences into chunks of window_size sentences, starting a new chunk every stride sentences.
+
+    With the default stride of 1 this is the same as the sliding_window helper in the validators.
+    """
+    return [" ".join(sentences[i:i+window_size]) for i in chunk_starts(len(sentences), window_size, stride)]
+
+
+def iter_sliding_window(sentences, window_size=3, stride=1):
+    """
+    Lazy sliding_window: yields one chunk text at a time instead of building the whole list.
+    """
+    for start in chunk_starts(len(sentences), window_size, stride):
+        yield " ".join(sentences[start:start + window_size])
+
+
+class ChunkTexts(Sequence):
+    """
+    Read-only list of the sliding_window chunk texts that stores only the chunk start offsets.
+
+    A chunk is joined from the sentences when it is read (a citation, an encoder batch), so the
+    chunks of a transcript cost 8 bytes each instead of a second and third copy of every sentence.
+    Compares equal to the list sliding_window returns.
+    """
+
+    def __init__(self, sentences, window_size=3, stride=1):
+        self.sentences = sentences
+        self.window_size = window_size
+        self.stride = stride
+        self.starts = chunk_starts(len(sentences), window_size, stride)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        start = self.starts[index]
+        return " ".join(self.sentences[start:start + self.window_size])
+
+    def __iter__(self):
+        return iter_sliding_window(self.sentences, self.window_size, self.stride)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ChunkTexts)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ChunkTexts({len(self)} chunks of {self.window_size} sentences, stride {self.stride})"
+
+
+def pooled_chunk_embeddings(sentence_embeddings, window_size=3, stride=1, weights=None):
+    """
+    Build chunk embeddings from already computed sentence embeddings instead of re-encoding the chunk text.
+
+    Each chunk vector is the (optionally weighted) mean of its sentence vectors, computed in O(N)
+    with a cumulative sum, so the transformer only ever sees each sentence once.
+
+    Args:
+    - sentence_embeddings (array, shape [n, d]): embeddings of the transcript sentences.
+    - window_size (int): sentences per chunk.
+    - stride (int): sentences between the starts of consecutive chunks.
+    - weights (array, shape [n], optional): per-sentence weights, e.g. token counts. None means a plain mean.
+
+    Returns:
+    - array, shape [n_chunks, d]: float32 chunk embeddings, in the same order as sliding_window.
+    """
+    sentence_embeddings = np.asarray(sentence_embeddings, dtype=np.float32)
+    if len(sentence_embeddings):
+        # Pool directions, not raw vectors, so one long sentence with a large norm cannot dominate the chunk
+        sentence_embeddings = normalize_rows(sentence_embeddings)
+    starts = chunk_starts(len(sentence_embeddings), window_size, stride)
+    if len(starts) == 0:
+        return np.empty((0, sentence_embeddings.shape[1] if sentence_embeddings.ndim == 2 else 0), dtype=np.float32)
+
+    # float64 running sums keep the differences exact enough on multi-hour transcripts
+    if weights is None:
+        weighted = sentence_embeddings.astype(np.float64)
+        window_weights = np.full(len(starts), float(window_size))
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        weighted = sentence_embeddings * weights[:, None]
+        weight_sums = np.concatenate([[0.0], np.cumsum(weights)])
+        window_weights = weight_sums[starts + window_size] - weight_sums[starts]
+        window_weights[window_weights == 0] = 1.0
+
+    sums = np.zeros((len(sentence_embeddings) + 1, sentence_embeddings.shape[1]), dtype=np.float64)
+    np.cumsum(weighted, axis=0, out=sums[1:])
+    chunk_sums = sums[starts + window_size] - sums[starts]
+    return (chunk_sums / window_weights[:, None]).astype(np.float32)
+
+
+def token_counts(texts):
+    """
+    Cheap whitespace token counts, used as pooling weights so long sentences count for more.
+    """
+    return np.array([max(1, len(text.split())) for text in texts], dtype=np.float64)
+
+
+def split_into_paragraphs(sentences, sentences_per_paragraph=5):
+    """
+    Group sentences into fixed-size pseudo-paragraphs, for transcripts that only exist as plain text
+    (same grouping as splitIntoParagraphs in the node test helpers).
+    """
+    return [" ".join(sentences[i:i+sentences_per_paragraph]) for i in range(0, len(sentences), sentences_per_paragraph)]
@@ -1,15 +1,14 @@
-from pydantic import BaseModel
+import argparse
+
 import assemblyai as aai
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-import requests
+import metrics
+from model_registry import sent_tokenize
 
 # Replace with your API token
-aai.settings.api_key = f"KEY"
+API_KEY = "KEY"
 lemur_endpoint = "https://api.assemblyai.com/lemur/v3/generate/task"
 headers = {
-    "Authorization": "KEY"
+    "Authorization": API_KEY
 }
 
 # URL of the file to transcribe
@@ -18,28 +17,15 @@ FILE_URL = "https://github.com/AssemblyAI-Examples/audio-examples/raw/main/20230
 
 placeholder_id = "6mg1zsu0yw-0d73-45a2-a631-acc347ec210b" #empty file (hello, how are you...)
 canadian_wildfires_transcript = "6mzwnvtu5k-8724-4bd5-8bd1-62dd2175ed09" #id of the transcribed file url
-# transcriber = aai.Transcriber()
-# transcript = transcriber.transcribe(FILE_URL)
-transcript = aai.Transcript.get_by_id(canadian_wildfires_transcript)
-placeholder_transcript = aai.Transcript.get_by_id(placeholder_id)
-
-lemur_summary = transcript.lemur.summarize(
-    context="Please summarize this transcript as though I were a 10 year old",
-    answer_format="paragaraphs",
-    final_model="basic"
-)
-
-# Split the summary into sentences
-# summary_sentences = lemur_summary.response.split(". ")
-summary_sentences = nltk.sent_tokenize(lemur_summary.response)
-
-print("ZERO SHOT SUMMARY")
-print(lemur_summary.response)
-print("**************************")
-
-#we get better results when using the underlying transcript itself, but this is still not bad using the placeholder and it saves $$$
-verification_questions = placeholder_transcript.lemur.task(
-    prompt=f"""
+
+SUMMARY_CONTEXT = "Please summarize this transcript as though I were a 10 year old"
+SUMMARY_ANSWER_FORMAT = "paragaraphs"
+FINAL_MODEL = "basic"
+VALIDATION_MODEL = "infgrad/stella-base-en-v2"
+
+
+def verification_questions_prompt(summary_sentences):
+    return f"""
     Please identify a series of questions that we can ask to verify the accuracy of this summary. You should focus entirely on the content of the summary, not the style or grammar.
     If a claim is made within the summary, you should generate a question that would help us verify that the claim came directly from underlying source material. For example:
 
@@ -50,63 +36,114 @@ verification_questions = placeholder_transcript.lemur.task(
     Please go through each sentence of the transcript summary, and generate a question that would help us verify that the summary is accurate:
 
     {summary_sentences}
-    """,
-    final_model="basic"
-)
-
-# verification_questions = transcript.lemur.task(
-#     prompt=f"""
-#     Please identify a series of questions that we can ask to verify the accuracy of this summary. You should focus entirely on the content of the summary, not the style or grammar.
-#     If a claim is made within the summary, you should generate a question that would help us verify that the claim came directly from underlying source material. For example:
+    """
 
-#     For example, if in your summary you state that 'Barack Obama is from Utah,' we should generate a verification question that asks 'Where is Barack Obama from?'
 
-#     These questions should scrutinize the summary so that we can be confident that it is accurate.
-
-#     Please go through each sentence of the transcript summary, and generate a question that would help us verify that the summary is accurate:
-
-#     {summary_sentences}
-#     """,
-#     final_model="basic"
-# )
-
-print("VERIFICATION QUESTIONS")
-print(verification_questions.response)
-print("**************************")
-
-#it may be worth using default model to answer these questions
-answer_verifcation_questions = transcript.lemur.task(
-    prompt=f"""
+def answer_verification_questions_prompt(verification_questions):
+    return f"""
     Please use the transcript to answer each of the following questions:
 
-    {verification_questions.response}
+    {verification_questions}
 
     Please answer each question with detail where possible. Format your responses as: Question: Answer \n
-    """,
-    final_model="basic"
-)
+    """
 
-print("ANSWER VERIFICATION QUESTIONS")
-print(answer_verifcation_questions.response)
-print("**************************")
 
-second_shot = transcript.lemur.task(
-    prompt=f"""
+def second_shot_prompt(summary, answered_questions):
+    return f"""
     In addition to the transcript, you have been provided with an initial summary of the transcript as well as a series of questions that can be used to verify the accuracy of the transcript.
 
     Here is your initial summary:
 
-    {lemur_summary.response} \n
+    {summary} \n
 
     Here are the questions you answered about the initial summary:
 
-    {answer_verifcation_questions.response}
+    {answered_questions}
 
     Please generate a new summary that is fully accurate based on the transcript and the questions that you have answered about it.
-    """,
-    final_model="basic"
-)
-
-print("SECOND SHOT")
-print(second_shot.response)
-print("**************************")
\ No newline at end of file
+    """
+
+
+def main(validate=False):
+    aai.settings.api_key = API_KEY
+    # transcriber = aai.Transcriber()
+    # transcript = transcriber.transcribe(FILE_URL)
+    with metrics.span("transcript_fetch", stage="get_by_id"):
+        transcript = aai.Transcript.get_by_id(canadian_wildfires_transcript)
+        placeholder_transcript = aai.Transcript.get_by_id(placeholder_id)
+
+    with metrics.span("lemur", stage="summary"):
+        lemur_summary = transcript.lemur.summarize(
+            context=SUMMARY_CONTEXT,
+            answer_format=SUMMARY_ANSWER_FORMAT,
+            final_model=FINAL_MODEL
+        )
+
+    # Split the summary into sentences
+    # summary_sentences = lemur_summary.response.split(". ")
+    summary_sentences = sent_tokenize(lemur_summary.response)
+
+    print("ZERO SHOT SUMMARY")
+    print(lemur_summary.response)
+    print("**************************")
+
+    #we get better results when using the underlying transcript itself, but this is still not bad using the placeholder and it saves $$$
+    with metrics.span("lemur", stage="verification_questions"):
+        verification_questions = placeholder_transcript.lemur.task(
+            prompt=verification_questions_prompt(summary_sentences),
+            final_model=FINAL_MODEL
+        )
+
+    # verification_questions = transcript.lemur.task(
+    #     prompt=verification_questions_prompt(summary_sentences),
+    #     final_model=FINAL_MODEL
+    # )
+
+    print("VERIFICATION QUESTIONS")
+    print(verification_questions.response)
+    print("**************************")
+
+    #it may be worth using default model to answer these questions
+    with metrics.span("lemur", stage="answers"):
+        answer_verifcation_questions = transcript.lemur.task(
+            prompt=answer_verification_questions_prompt(verification_questions.response),
+            final_model=FINAL_MODEL
+        )
+
+    print("ANSWER VERIFICATION QUESTIONS")
+    print(answer_verifcation_questions.response)
+    print("**************************")
+
+    with metrics.span("lemur", stage="second_shot"):
+        second_shot = transcript.lemur.task(
+            prompt=second_shot_prompt(lemur_summary.response, answer_verifcation_questions.response),
+            final_model=FINAL_MODEL
+        )
+
+    print("SECOND SHOT")
+    print(second_shot.response)
+    print("**************************")
+
+    if validate:
+        # Only imported here: embedding validation loads the sentence transformer
+        from incremental_validation import validate_summary_versions
+
+        # The second shot repeats most zero-shot sentences, so only its new sentences are encoded and scored
+        zero_shot_result, second_shot_result = validate_summary_versions(
+            [lemur_summary.response, second_shot.response], canadian_wildfires_transcript, VALIDATION_MODEL
+        )
+        print("ZERO SHOT FILTERED SENTENCES")
+        print(zero_shot_result["filtered"])
+        print("SECOND SHOT FILTERED SENTENCES")
+        print(second_shot_result["filtered"])
+        print(f"second shot: {second_shot_result['stats']['scored']} sentences scored, {second_shot_result['stats']['reused']} reused")
+        print("**************************")
+    metrics.dump()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Chain-of-Verification flow on the example transcript.")
+    parser.add_argument("--validate", action="store_true",
+                        help=f"also ground the zero shot and the second shot with {VALIDATION_MODEL}")
+    main(parser.parse_args().validate)
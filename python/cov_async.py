@@ -0,0 +1,260 @@
+"""
+Concurrent Chain-of-Verification runner.
+
+Runs the same four LeMUR stages as cov.py (summarize -> verification questions -> answers ->
+second shot) for many transcripts at once. Every HTTP call goes through one LemurClient, which
+bounds the number of in-flight requests, applies a per-request timeout, retries transient
+failures with exponential backoff and pauses all requests when LeMUR answers 429.
+
+    python cov_async.py <transcript_id> [<transcript_id> ...]
+"""
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import metrics
+from cov import (
+    FINAL_MODEL,
+    SUMMARY_ANSWER_FORMAT,
+    SUMMARY_CONTEXT,
+    answer_verification_questions_prompt,
+    placeholder_id,
+    second_shot_prompt,
+    verification_questions_prompt,
+)
+from model_registry import sent_tokenize
+
+API_BASE_URL = "https://api.assemblyai.com"
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header: delay-seconds or an HTTP-date (RFC 9110).
+
+    Returns None when the header is missing or unparseable, so the caller falls back to its backoff.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class LemurError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class LemurClient:
+    """
+    Minimal asyncio client for the LeMUR and transcript endpoints.
+
+    Args:
+    - api_key (str): AssemblyAI API key.
+    - base_url (str): API root; point it at a local stub server in tests.
+    - max_concurrency (int): maximum number of requests in flight across all transcripts.
+    - timeout (float): seconds allowed for a single HTTP attempt, enforced on the worker thread itself.
+    - max_retries (int): retries after the first attempt for timeouts, connection errors, 429 and 5xx.
+    - backoff (float): base delay in seconds; attempt n waits backoff * 2**n plus jitter.
+    """
+
+    def __init__(self, api_key, base_url=API_BASE_URL, max_concurrency=8, timeout=120.0, max_retries=4, backoff=1.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Monotonic time before which nobody may send: set from Retry-After on a 429
+        self._paused_until = 0.0
+
+    def _send(self, method, path, payload, cancelled):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers={"Authorization": self.api_key, "Content-Type": "application/json"},
+        )
+        # Transcript ids are dropped from the label so every transcript lands in the same series
+        endpoint = "/v2/transcript" if path.startswith("/v2/transcript/") else path
+        # The socket timeout bounds every blocking call; the deadline bounds a body that trickles in
+        deadline = time.monotonic() + self.timeout
+        try:
+            with metrics.span("lemur_request", method=method, endpoint=endpoint), \
+                    urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = bytearray()
+                while True:
+                    if cancelled.is_set():
+                        raise LemurError(f"{method} {path} was cancelled")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"{method} {path} took longer than {self.timeout}s")
+                    block = response.read1(65536)
+                    if not block:
+                        break
+                    body += block
+                return json.loads(body.decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            error = LemurError(f"{method} {path} failed with HTTP {e.code}: {e.read().decode('utf-8', 'replace')}", e.code)
+            error.retry_after = parse_retry_after(retry_after)
+            raise error
+
+    async def _attempt(self, method, path, payload):
+        """
+        Run one HTTP attempt on a worker thread and wait for that thread to finish.
+
+        The thread enforces the timeout itself, so a timed-out attempt has really stopped by the
+        time its semaphore slot is released. When the caller is cancelled, the thread is told to
+        stop and the slot is still held until it has.
+        """
+        cancelled = threading.Event()
+        attempt = asyncio.ensure_future(asyncio.to_thread(self._send, method, path, payload, cancelled))
+        # Retrieve the outcome even when nobody awaits it any more, so it is never logged as unhandled
+        attempt.add_done_callback(lambda future: future.cancelled() or future.exception())
+        try:
+            return await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            cancelled.set()
+            await asyncio.wait([attempt])
+            raise
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    async def _wait_for_rate_limit(self):
+        # Loop: another request may extend the pause while this one sleeps
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+
+    async def request(self, method, path, payload=None):
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                # Checked with the slot held: requests queued on the semaphore before a 429 must honour its pause too
+                await self._wait_for_rate_limit()
+                try:
+                    return await self._attempt(method, path, payload)
+                except LemurError as e:
+                    if e.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        raise
+                    delay = self._delay(attempt, getattr(e, "retry_after", None))
+                    metrics.incr("lemur_retries", status=e.status)
+                    if e.status == 429:
+                        # Back off globally, not just this request, so the rest of the batch stops hammering the API
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                except (urllib.error.URLError, OSError) as e:
+                    if attempt == self.max_retries:
+                        raise LemurError(f"{method} {path} failed after {attempt + 1} attempts: {e!r}") from e
+                    delay = self._delay(attempt)
+                    metrics.incr("lemur_retries", status="network")
+            await asyncio.sleep(delay)
+
+    async def task(self, transcript_ids, prompt, final_model=FINAL_MODEL):
+        response = await self.request("POST", "/lemur/v3/generate/task", {
+            "transcript_ids": transcript_ids,
+            "prompt": prompt,
+            "final_model": final_model,
+        })
+        return response["response"]
+
+    async def summarize(self, transcript_ids, context=SUMMARY_CONTEXT, answer_format=SUMMARY_ANSWER_FORMAT, final_model=FINAL_MODEL):
+        response = await self.request("POST", "/lemur/v3/generate/summary", {
+            "transcript_ids": transcript_ids,
+            "context": context,
+            "answer_format": answer_format,
+            "final_model": final_model,
+        })
+        return response["response"]
+
+    async def get_transcript(self, transcript_id):
+        return await self.request("GET", f"/v2/transcript/{transcript_id}")
+
+
+async def run_cov(client, transcript_id, placeholder_transcript_id=placeholder_id, split_sentences=sent_tokenize):
+    """
+    Run the Chain-of-Verification flow for one transcript.
+
+    Fetching the real transcript is independent of the summary and of the placeholder question
+    generation, so it runs concurrently with them and is only awaited before the stages that need it.
+
+    Returns:
+    - dict: transcript_id, transcript (API JSON), summary, verification_questions, answers, second_shot.
+    """
+    transcript_task = asyncio.create_task(client.get_transcript(transcript_id))
+    try:
+        summary = await client.summarize([transcript_id])
+        # The placeholder transcript keeps the question-generation call cheap, as in cov.py
+        verification_questions = await client.task(
+            [placeholder_transcript_id], verification_questions_prompt(split_sentences(summary))
+        )
+        transcript = await transcript_task
+    except BaseException:
+        transcript_task.cancel()
+        raise
+    if transcript.get("status") != "completed":
+        raise LemurError(f"Transcript {transcript_id} is not completed (status: {transcript.get('status')})")
+
+    answers = await client.task([transcript_id], answer_verification_questions_prompt(verification_questions))
+    second_shot = await client.task([transcript_id], second_shot_prompt(summary, answers))
+    return {
+        "transcript_id": transcript_id,
+        "transcript": transcript,
+        "summary": summary,
+        "verification_questions": verification_questions,
+        "answers": answers,
+        "second_shot": second_shot,
+    }
+
+
+async def run_cov_many(client, transcript_ids, **kwargs):
+    """
+    Run the CoV flow for every transcript concurrently; concurrency is bounded by the client.
+
+    A failure for one transcript does not stop the others: its entry holds {"transcript_id", "error"}.
+    """
+    async def run_one(transcript_id):
+        try:
+            return await run_cov(client, transcript_id, **kwargs)
+        except Exception as e:
+            return {"transcript_id": transcript_id, "error": str(e)}
+
+    return await asyncio.gather(*(run_one(transcript_id) for transcript_id in transcript_ids))
+
+
+async def main(transcript_ids):
+    client = LemurClient(os.environ.get("assemblyai_key"))
+    for result in await run_cov_many(client, transcript_ids):
+        print("***************************")
+        print(result["transcript_id"])
+        if "error" in result:
+            print(f"ERROR: {result['error']}")
+            continue
+        print("SECOND SHOT")
+        print(result["second_shot"])
+    metrics.dump()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
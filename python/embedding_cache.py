@@ -0,0 +1,288 @@
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import metrics
+from chunking import ChunkTexts, pooled_chunk_embeddings, token_counts
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "LLM_VALIDATION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "llm-validation", "embeddings"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("LLM_VALIDATION_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+ENCODE_BATCH_SIZE = int(os.environ.get("LLM_VALIDATION_ENCODE_BATCH_SIZE", 256))
+
+
+def _digest(*parts):
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def encode_in_batches(texts, encode, n=None, batch_size=ENCODE_BATCH_SIZE, allocate=None):
+    """
+    Encode texts batch_size at a time into one preallocated float32 array.
+
+    Besides the output, peak memory is one batch of texts and one batch of vectors, whatever the
+    transcript length. The output is allocated once the first batch reveals the embedding dimension.
+
+    Args:
+    - texts (iterable of str): consumed lazily, so a generator or ChunkTexts never materializes.
+    - encode (callable): list of str -> embeddings array.
+    - n (int): number of texts; defaults to len(texts).
+    - batch_size (int): texts per encode call.
+    - allocate (callable): shape -> array to fill, e.g. a np.lib.format.open_memmap; defaults to np.empty.
+
+    Returns:
+    - array [n, dim]: the filled output of allocate.
+    """
+    n = len(texts) if n is None else n
+    if n == 0:
+        # Encoders return shape (0,) for no texts; keep the result 2-D
+        empty = np.asarray(encode([]), dtype=np.float32)
+        return empty.reshape(0, empty.shape[1] if empty.ndim == 2 else 0)
+    if allocate is None:
+        allocate = lambda shape: np.empty(shape, dtype=np.float32)
+    iterator = iter(texts)
+    output = None
+    row = 0
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            break
+        vectors = np.asarray(encode(batch), dtype=np.float32)
+        if output is None:
+            output = allocate((n, vectors.shape[1]))
+        output[row:row + len(batch)] = vectors
+        row += len(batch)
+        metrics.incr("encode_batches")
+    if row != n:
+        raise ValueError(f"Expected {n} texts to encode, got {row}")
+    return output
+
+
+class TranscriptEmbeddingCache:
+    """
+    On-disk cache of transcript segments and their embeddings.
+
+    Embeddings are keyed by (transcript_id, model_name, granularity, window_size) and stored
+    as float32 .npy files that are reopened with mmap_mode="r", so a cache hit costs no copy
+    and no encoder call. The segment texts are stored once per transcript id so a hit also
+    skips the AssemblyAI fetch.
+
+    Eviction is least-recently-used by file mtime: every hit touches the file, and every
+    write trims the oldest files until the directory is back under max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _embeddings_path(self, transcript_id, model_name, granularity, window_size):
+        return os.path.join(self.cache_dir, _digest(transcript_id, model_name, granularity, window_size) + ".npy")
+
+    def _segments_path(self, transcript_id):
+        return os.path.join(self.cache_dir, _digest("segments", transcript_id) + ".json")
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _atomic_write(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_embeddings(self, transcript_id, model_name, granularity, window_size=1):
+        path = self._embeddings_path(transcript_id, model_name, granularity, window_size)
+        if not os.path.exists(path):
+            return None
+        self._touch(path)
+        return np.load(path, mmap_mode="r")
+
+    def put_embeddings(self, transcript_id, model_name, granularity, embeddings, window_size=1):
+        path = self._embeddings_path(transcript_id, model_name, granularity, window_size)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._atomic_write(path, lambda f: np.save(f, embeddings))
+        self.evict()
+        if not os.path.exists(path):
+            # Larger than the whole cache budget; hand back the in-memory copy
+            return embeddings
+        return np.load(path, mmap_mode="r")
+
+    def put_embeddings_streaming(self, transcript_id, model_name, granularity, texts, encode, window_size=1,
+                                 batch_size=ENCODE_BATCH_SIZE):
+        """
+        Encode texts with encode_in_batches straight into a memmapped .npy file and cache it.
+
+        Unlike put_embeddings, the full embeddings array never sits in memory: each batch is
+        written to a temporary .npy that replaces the cache entry once complete.
+        """
+        if len(texts) == 0:
+            return self.put_embeddings(transcript_id, model_name, granularity, encode_in_batches(texts, encode), window_size)
+        path = self._embeddings_path(transcript_id, model_name, granularity, window_size)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            embeddings = encode_in_batches(
+                texts, encode, batch_size=batch_size,
+                allocate=lambda shape: np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=shape),
+            )
+            embeddings.flush()
+            del embeddings
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        embeddings = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        if embeddings is None:
+            # Larger than the whole cache budget; the file is gone, so encode again into memory
+            embeddings = encode_in_batches(texts, encode, batch_size=batch_size)
+        return embeddings
+
+    def has_segments(self, transcript_id):
+        return os.path.exists(self._segments_path(transcript_id))
+
+    def get_segments(self, transcript_id):
+        path = self._segments_path(transcript_id)
+        if not os.path.exists(path):
+            return None
+        self._touch(path)
+        with open(path, encoding="utf-8") as f:
+            segments = json.load(f)
+        return segments["paragraphs"], segments["sentences"]
+
+    def put_segments(self, transcript_id, paragraphs, sentences):
+        payload = json.dumps({"paragraphs": list(paragraphs), "sentences": list(sentences)}).encode("utf-8")
+        self._atomic_write(self._segments_path(transcript_id), lambda f: f.write(payload))
+        self.evict()
+
+    def size_bytes(self):
+        return sum(os.path.getsize(path) for path, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith((".npy", ".json")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((path, os.stat(path)))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+
+
+def encode_segments(paragraphs, sentences, encode, window_size=3, stride=1, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Uncached load_transcript_embeddings for transcripts given as text: encode each granularity
+    in fixed-size batches, with offset-only chunk texts.
+    """
+    texts = {"sentence": sentences, "paragraph": paragraphs, "chunk": ChunkTexts(sentences, window_size, stride)}
+    return texts, {granularity: encode_in_batches(items, encode, batch_size=batch_size) for granularity, items in texts.items()}
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranscriptEmbeddingCache()
+    return _default_cache
+
+
+def load_transcript_embeddings(transcript_id, model_name, fetch_segments, encode, cache=None, window_size=3,
+                               stride=1, chunk_mode="exact", token_weighted=False, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Return the transcript segments and their embeddings, using the cache where possible.
+
+    Args:
+    - transcript_id (str): AssemblyAI transcript id.
+    - model_name (str): name of the sentence transformer, part of the cache key.
+    - fetch_segments (callable): returns (paragraphs, sentences) for the transcript; only called on a miss.
+    - encode (callable): list of str -> embeddings array; only called for missing granularities.
+    - cache (TranscriptEmbeddingCache): defaults to the shared on-disk cache. Pass False to bypass it.
+    - window_size (int): sentences per sliding-window chunk.
+    - stride (int): sentences between the starts of consecutive chunks.
+    - chunk_mode (str): "exact" encodes every chunk's text; "pooled" averages the sentence embeddings
+      of each window instead, so chunks cost no encoder work at all.
+    - token_weighted (bool): in pooled mode, weight each sentence by its token count instead of a plain mean.
+    - batch_size (int): texts per encode call. Misses are encoded batch by batch into a memmapped
+      cache file (or a preallocated array without a cache), so memory stays bounded on long transcripts.
+
+    Returns:
+    - (dict, dict): granularity -> list of texts, granularity -> embeddings array. The chunk texts
+      are a ChunkTexts, which keeps only the chunk offsets into the sentences.
+    """
+    if cache is None:
+        cache = get_default_cache()
+
+    segments = cache.get_segments(transcript_id) if cache else None
+    if segments is None:
+        metrics.incr("segment_cache_misses")
+        with metrics.span("transcript_fetch"):
+            paragraphs, sentences = fetch_segments()
+        # A TranscriptLoader fetch has already stored them in the shared cache
+        if cache and not cache.has_segments(transcript_id):
+            cache.put_segments(transcript_id, paragraphs, sentences)
+    else:
+        metrics.incr("segment_cache_hits")
+        paragraphs, sentences = segments
+
+    if chunk_mode not in ("exact", "pooled"):
+        raise ValueError(f"Unknown chunk_mode {chunk_mode!r}, expected 'exact' or 'pooled'")
+
+    texts = {
+        "sentence": sentences,
+        "paragraph": paragraphs,
+        "chunk": ChunkTexts(sentences, window_size, stride),
+    }
+    embeddings = {}
+    for granularity, granularity_texts in texts.items():
+        if granularity == "chunk" and chunk_mode == "pooled":
+            weights = token_counts(sentences) if token_weighted else None
+            with metrics.span("chunk_pooling"):
+                embeddings[granularity] = pooled_chunk_embeddings(embeddings["sentence"], window_size, stride, weights)
+            continue
+        key_window = 1
+        if granularity == "chunk":
+            key_window = window_size if stride == 1 else f"{window_size}/{stride}"
+        cached = cache.get_embeddings(transcript_id, model_name, granularity, key_window) if cache else None
+        if cached is None or len(cached) != len(granularity_texts):
+            metrics.incr("embedding_cache_misses", granularity=granularity)
+            with metrics.span("transcript_encode", granularity=granularity):
+                if cache:
+                    cached = cache.put_embeddings_streaming(transcript_id, model_name, granularity, granularity_texts,
+                                                            encode, key_window, batch_size)
+                else:
+                    cached = encode_in_batches(granularity_texts, encode, batch_size=batch_size)
+        else:
+            metrics.incr("embedding_cache_hits", granularity=granularity)
+        embeddings[granularity] = cached
+    return texts, embeddings
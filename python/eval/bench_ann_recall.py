@@ -0,0 +1,57 @@
+"""
+Recall@k and query-latency benchmark of the IVF grounding index against brute force.
+
+Builds clustered random embeddings sized like sentence lists of long meeting recordings
+(a multi-hour meeting is several thousand sentences), queries them with noisy copies of
+transcript vectors, and compares the top-k with the exact results.
+
+    python eval/bench_ann_recall.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from grounding_index import ExactIndex, IVFIndex
+
+DIM = 768
+K = 3
+
+
+def make_transcript(n, rng, n_topics=64):
+    # Meeting sentences cluster around topics; pure noise would make every index look bad
+    topics = rng.standard_normal((n_topics, DIM)).astype(np.float32)
+    return topics[rng.integers(0, n_topics, n)] + 0.8 * rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def recall_at_k(exact_indices, approx_indices):
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact_indices, approx_indices))
+    return hits / exact_indices.size
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n_queries = 200
+    print(f"{'items':>7} {'index':>14} {'build (s)':>10} {'query (ms/q)':>13} {'recall@' + str(K):>9} {'top-1 agree':>12}")
+    for n in (5000, 20000, 60000):
+        embeddings = make_transcript(n, rng)
+        queries = embeddings[rng.integers(0, n, n_queries)] + 0.3 * rng.standard_normal((n_queries, DIM)).astype(np.float32)
+
+        build_time, exact = timed(ExactIndex, embeddings)
+        query_time, (exact_indices, _) = timed(exact.search, queries, K)
+        print(f"{n:>7} {'exact':>14} {build_time:>10.3f} {1000 * query_time / n_queries:>13.3f} {1.0:>9.3f} {1.0:>12.3f}")
+
+        for n_probe in (4, 8, 16):
+            build_time, ivf = timed(lambda: IVFIndex(embeddings, n_probe=n_probe))
+            query_time, (ivf_indices, _) = timed(ivf.search, queries, K)
+            top1 = float(np.mean(ivf_indices[:, 0] == exact_indices[:, 0]))
+            label = f"ivf {ivf.n_lists}/{n_probe}"
+            print(f"{n:>7} {label:>14} {build_time:>10.3f} {1000 * query_time / n_queries:>13.3f} {recall_at_k(exact_indices, ivf_indices):>9.3f} {top1:>12.3f}")
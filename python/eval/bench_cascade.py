@@ -0,0 +1,118 @@
+"""
+End-to-end speed and accuracy of cascade grounding against the large model alone.
+
+For every record of the node test set, summaries (clean and hallucinated) and QA answers are
+validated twice:
+- "slow": stella-base encodes the transcript and every output, as filter_summary_sentences and
+  process_lemur_qa do today;
+- "cascade": all-MiniLM-L6-v2 scores everything and stella-base only re-scores the outputs within
+  --band of the fast thresholds. stella-base encodes the transcript only if something escalates.
+
+Both modes start every record with empty sentence memos so neither reuses the other's vectors.
+Reports precision/recall of hallucination filtering, the escalated fraction and the speedup.
+Both models must be available locally; no AssemblyAI access.
+
+    python eval/bench_cascade.py [--band 0.05] [--limit N] [--model NAME] [--fast-model NAME]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cascade import DEFAULT_BAND, FAST_MODEL
+from grounding import FusedIndex
+from harness import DEFAULT_MODEL, _count, load_testset, matches_label, precision_recall, segment_transcript
+from model_registry import get_encoder, sent_tokenize, warm
+from qa_embeddings_citations import process_lemur_qa_batch, process_lemur_qa_batch_cascade
+from summary_embeddings_citations import filter_summary_sentences_cascade, filter_summary_sentences_local
+
+MODES = ("slow", "cascade")
+
+
+def transcript_index(model_name, texts):
+    encoder = get_encoder(model_name)
+    return FusedIndex({granularity: encoder.encode(items) for granularity, items in texts.items()})
+
+
+class LazyIndex:
+    """Zero-argument callable that builds once, so the summary and QA stages share one slow index."""
+
+    def __init__(self, build):
+        self.build = build
+        self.index = None
+
+    def __call__(self):
+        if self.index is None:
+            self.index = self.build()
+        return self.index
+
+
+def run_record(record, mode, model_name, fast_model_name, band, counts, escalation):
+    texts = segment_transcript(record["transcript_text"])
+    summaries = ((record["summary_success"], []), (record["summary_hallucinated"], record["summary_hallucinated_label"]))
+    qa_jobs_labels = [(record["qa_success"], []), (record["qa_hallucinated"], [item["answer"] for item in record["qa_hallucinated_label"]])]
+
+    if mode == "slow":
+        index = transcript_index(model_name, texts)
+        for summary, labels in summaries:
+            _, filtered = filter_summary_sentences_local(summary, index, model_name)
+            filtered = set(filtered)
+            for sentence in dict.fromkeys(sent_tokenize(summary)):
+                _count(counts["summary"], sentence in filtered, matches_label(sentence, labels))
+        qa_results = process_lemur_qa_batch([(texts, index, qa) for qa, _ in qa_jobs_labels], model_name=model_name)
+    else:
+        fast_index = transcript_index(fast_model_name, texts)
+        slow_index = LazyIndex(lambda: transcript_index(model_name, texts))
+        for summary, labels in summaries:
+            _, filtered, stats = filter_summary_sentences_cascade(
+                summary, fast_index, slow_index, model_name, band=band, fast_model_name=fast_model_name
+            )
+            escalation["items"] += stats["items"]
+            escalation["escalated"] += stats["escalated"]
+            filtered = set(filtered)
+            for sentence in dict.fromkeys(sent_tokenize(summary)):
+                _count(counts["summary"], sentence in filtered, matches_label(sentence, labels))
+        qa_results, stats = process_lemur_qa_batch_cascade(
+            [(texts, slow_index, qa, fast_index) for qa, _ in qa_jobs_labels], model_name=model_name, band=band, fast_model_name=fast_model_name
+        )
+        escalation["items"] += stats["items"]
+        escalation["escalated"] += stats["escalated"]
+        escalation["slow_transcripts"] += int(slow_index.index is not None)
+
+    for results, (_, labels) in zip(qa_results, qa_jobs_labels):
+        for result in results:
+            _count(counts["qa"], not result["grounding_threshold_passed"], matches_label(result["answer"], labels))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--fast-model", default=FAST_MODEL)
+    parser.add_argument("--band", type=float, default=DEFAULT_BAND)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    records = load_testset()[:args.limit]
+    warm(args.model, args.fast_model)
+    seconds = dict.fromkeys(MODES, 0.0)
+    counts = {mode: {output: {"tp": 0, "fp": 0, "fn": 0, "tn": 0} for output in ("summary", "qa")} for mode in MODES}
+    escalation = {"items": 0, "escalated": 0, "slow_transcripts": 0}
+    for record in records:
+        for mode in MODES:
+            get_encoder(args.model).clear()
+            get_encoder(args.fast_model).clear()
+            start = time.perf_counter()
+            run_record(record, mode, args.model, args.fast_model, args.band, counts[mode], escalation)
+            seconds[mode] += time.perf_counter() - start
+
+    print(f"{len(records)} records, band ±{args.band}, {args.fast_model} -> {args.model}\n")
+    print(f"{'mode':<8} {'seconds':>9} {'summary P':>10} {'summary R':>10} {'qa P':>7} {'qa R':>7}")
+    for mode in MODES:
+        summary_p, summary_r = precision_recall(counts[mode]["summary"])
+        qa_p, qa_r = precision_recall(counts[mode]["qa"])
+        print(f"{mode:<8} {seconds[mode]:>9.2f} {summary_p:>10.3f} {summary_r:>10.3f} {qa_p:>7.3f} {qa_r:>7.3f}")
+    fraction = escalation["escalated"] / escalation["items"] if escalation["items"] else 0.0
+    print(f"\nescalated to {args.model}: {escalation['escalated']}/{escalation['items']} outputs ({fraction:.1%}), "
+          f"{escalation['slow_transcripts']}/{len(records)} transcripts encoded with it")
+    print(f"speedup: {seconds['slow'] / seconds['cascade']:.2f}x" if seconds["cascade"] else "")
@@ -0,0 +1,79 @@
+"""
+Peak memory of building the grounding index of a long transcript from cached embeddings.
+
+A synthetic transcript of --sentences sentences is encoded by a fake encoder (random vectors,
+--dim wide) into a temporary embedding cache, so every granularity comes back memmapped as it
+does on a cache hit. The peak traced memory of each index construction is then reported next to
+the size of the index it produces:
+- "normalize+vstack": a normalized copy per granularity, then a stacked copy (the old FusedIndex);
+- "FusedIndex": every granularity normalized block by block into one preallocated matrix;
+- "CompactFusedIndex float16/int8": quantized block by block, no float32 stack.
+
+No model and no AssemblyAI access needed.
+
+    python eval/bench_index_memory.py [--sentences 200000] [--dim 768]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from chunking import split_into_paragraphs
+from embedding_cache import TranscriptEmbeddingCache, load_transcript_embeddings
+from grounding import FusedIndex, normalize_rows
+from quantization import CompactFusedIndex
+
+
+def traced_peak(build):
+    """
+    Returns:
+    - (object, int): what build() returned, and the peak traced bytes allocated while it ran.
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def normalize_and_vstack(granularity_embeddings):
+    return np.vstack([normalize_rows(embeddings) for embeddings in granularity_embeddings.values()])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sentences = [f"Sentence number {i} of a very long recording." for i in range(args.sentences)]
+
+    def encode(texts):
+        return rng.standard_normal((len(texts), args.dim)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TranscriptEmbeddingCache(cache_dir, max_bytes=2**40)
+        _, embeddings = load_transcript_embeddings(
+            "long", "fake", lambda: (split_into_paragraphs(sentences), sentences), encode, cache
+        )
+        rows = sum(len(matrix) for matrix in embeddings.values())
+        print(f"{rows} transcript rows x {args.dim} ({rows * args.dim * 4 / 2**20:.0f} MB as float32), memmapped\n")
+        print(f"{'construction':<32} {'index MB':>9} {'peak MB':>9} {'peak / index':>13}")
+        builds = (
+            ("normalize+vstack", lambda: normalize_and_vstack(embeddings), lambda matrix: matrix.nbytes),
+            ("FusedIndex", lambda: FusedIndex(embeddings), lambda index: index.matrix.nbytes),
+            ("CompactFusedIndex float16", lambda: CompactFusedIndex(embeddings, "float16"), lambda index: index.nbytes),
+            ("CompactFusedIndex int8", lambda: CompactFusedIndex(embeddings, "int8"), lambda index: index.nbytes),
+        )
+        for name, build, size in builds:
+            result, peak = traced_peak(build)
+            index_bytes = size(result)
+            print(f"{name:<32} {index_bytes / 2**20:>9.1f} {peak / 2**20:>9.1f} {peak / index_bytes:>13.2f}")
+            del result
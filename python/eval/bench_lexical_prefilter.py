@@ -0,0 +1,90 @@
+"""
+Query throughput and agreement of the BM25-prefiltered "lexical" grounding index against brute force.
+
+Builds long synthetic transcripts whose sentences are drawn from a Zipf-distributed vocabulary and
+embedded as sums of random word vectors plus noise, so lexical overlap and cosine similarity agree
+the way they roughly do for real claims. The claims are partial copies of transcript sentences with
+a few words swapped, plus a share of paraphrases that reuse none of the words (these take the
+full-scan fallback).
+
+    python eval/bench_lexical_prefilter.py [--queries 200] [--paraphrases 0.1] [--candidates 64]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from grounding_index import ExactIndex
+from lexical_index import LexicalIndex
+
+DIM = 768
+K = 3
+VOCABULARY_SIZE = 20000
+WORDS_PER_SENTENCE = 14
+
+
+def make_transcript(n, rng, word_vectors):
+    ranks = np.minimum(rng.zipf(1.3, (n, WORDS_PER_SENTENCE)), VOCABULARY_SIZE) - 1
+    # Shuffle the Zipf ranks over the vocabulary so frequent words are not just the first ids
+    words = rng.permutation(VOCABULARY_SIZE)[ranks]
+    texts = [" ".join(f"w{word}" for word in row) for row in words]
+    embeddings = 0.2 * rng.standard_normal((n, DIM)).astype(np.float32)
+    for start in range(0, n, 2048):
+        # Summed in blocks: gathering every word vector at once would need n * 14 * DIM floats
+        embeddings[start:start + 2048] += word_vectors[words[start:start + 2048]].sum(axis=1)
+    return texts, words, embeddings
+
+
+def make_claims(n_queries, paraphrase_fraction, rng, words, embeddings, word_vectors):
+    sources = rng.integers(0, len(words), n_queries)
+    texts, vectors = [], []
+    for row, source in enumerate(sources):
+        claim = words[source].copy()
+        if row < paraphrase_fraction * n_queries:
+            # Same meaning, no shared words: close in embedding space, invisible to BM25
+            texts.append(" ".join(f"p{i}" for i in range(WORDS_PER_SENTENCE)))
+            vectors.append(embeddings[source] + 0.15 * rng.standard_normal(DIM))
+            continue
+        swapped = rng.choice(WORDS_PER_SENTENCE, 3, replace=False)
+        claim[swapped] = rng.integers(0, VOCABULARY_SIZE, 3)
+        texts.append(" ".join(f"w{word}" for word in claim))
+        vectors.append(word_vectors[claim].sum(axis=0) + 0.2 * rng.standard_normal(DIM))
+    return texts, np.array(vectors, dtype=np.float32), sources
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--paraphrases", type=float, default=0.1)
+    parser.add_argument("--candidates", type=int, default=64)
+    parser.add_argument("--hybrid-weight", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    word_vectors = rng.standard_normal((VOCABULARY_SIZE, DIM)).astype(np.float32) / np.sqrt(WORDS_PER_SENTENCE)
+    print(f"{'items':>7} {'index':>8} {'build (s)':>10} {'query (ms/q)':>13} {'top-1 agree':>12} {'source hit':>11} {'full scans':>11}")
+    for n in (5000, 20000, 60000):
+        texts, words, embeddings = make_transcript(n, rng, word_vectors)
+        claim_texts, claims, sources = make_claims(args.queries, args.paraphrases, rng, words, embeddings, word_vectors)
+
+        build_time, exact = timed(ExactIndex, embeddings)
+        exact_time, (exact_indices, _) = timed(exact.search, claims, K)
+        hit = float(np.mean(exact_indices[:, 0] == sources))
+        print(f"{n:>7} {'exact':>8} {build_time:>10.3f} {1000 * exact_time / args.queries:>13.3f} {1.0:>12.3f} {hit:>11.3f} {'-':>11}")
+
+        build_time, lexical = timed(LexicalIndex, texts, embeddings, n_candidates=args.candidates, hybrid_weight=args.hybrid_weight)
+        query_time, (indices, _) = timed(lexical.search, claims, K, query_texts=claim_texts)
+        top1 = float(np.mean(indices[:, 0] == exact_indices[:, 0]))
+        hit = float(np.mean(indices[:, 0] == sources))
+        print(f"{n:>7} {'lexical':>8} {build_time:>10.3f} {1000 * query_time / args.queries:>13.3f} {top1:>12.3f} {hit:>11.3f} "
+              f"{lexical.full_scans / lexical.queries:>11.1%}")
+        print(f"{'':>7} speedup {exact_time / query_time:.2f}x")
@@ -0,0 +1,79 @@
+"""
+Startup-time and per-call-latency benchmark for the shared model registry.
+
+Startup: imports each validator module in a fresh interpreter and compares it with
+what an import used to cost (sentence_transformers import + punkt check + model load).
+
+Per call: compares building a new SentenceTransformer on every call (the old
+filter_summary_sentences / get_sentence_transformer_embeddings behaviour) with
+model_registry.get_model. Needs sentence_transformers and the model available locally.
+
+    python eval/bench_model_loading.py [model_name]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(PYTHON_DIR)
+
+VALIDATORS = ["summary_embeddings_citations", "qa_embeddings_citations", "action_items_embeddings_citations"]
+SAMPLE = ["Smoke from the fires is traveling through the sky.", "The air quality index is unhealthy today."]
+
+
+def time_in_subprocess(code, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=PYTHON_DIR, check=True, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def startup_benchmark(model_name):
+    baseline = time_in_subprocess("pass")
+    print(f"{'startup':<40} {'seconds':>10}")
+    for module in VALIDATORS:
+        seconds = time_in_subprocess(f"import {module}") - baseline
+        print(f"{'import ' + module:<40} {seconds:>10.3f}")
+    old_import = (
+        "import nltk; nltk.download('punkt'); "
+        f"from sentence_transformers import SentenceTransformer; SentenceTransformer({model_name!r})"
+    )
+    try:
+        seconds = time_in_subprocess(old_import, repeats=1) - baseline
+        print(f"{'old import-time work (per module)':<40} {seconds:>10.3f}")
+    except subprocess.CalledProcessError:
+        print("old import-time work: sentence_transformers or the model is not available")
+
+
+def per_call_benchmark(model_name, calls=5):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("per-call benchmark skipped: sentence_transformers is not installed")
+        return
+    from model_registry import get_model
+
+    def old_call():
+        return SentenceTransformer(model_name).encode(SAMPLE)
+
+    def new_call():
+        return get_model(model_name).encode(SAMPLE)
+
+    print(f"\n{'per call':<40} {'p50 (s)':>10} {'max (s)':>10}")
+    for label, fn in (("new SentenceTransformer per call", old_call), ("model_registry.get_model", new_call)):
+        timings = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        print(f"{label:<40} {statistics.median(timings):>10.3f} {max(timings):>10.3f}")
+
+
+if __name__ == "__main__":
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "infgrad/stella-base-en-v2"
+    startup_benchmark(model_name)
+    per_call_benchmark(model_name)
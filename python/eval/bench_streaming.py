@@ -0,0 +1,72 @@
+"""
+Latency benchmark: streaming grounding filter vs the batch path.
+
+Replays the hallucinated summaries of node/src/test/testset_nov_12_2023.json as a simulated
+LeMUR token stream (default 40 words/s) and records when the first and the last keep/filter
+verdicts become available. The batch path has to wait for the whole response before scoring.
+Needs the sentence transformer available locally; no AssemblyAI access.
+
+    python eval/bench_streaming.py [model_name] [words_per_second] [n_records]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from chunking import sliding_window, split_into_paragraphs
+from grounding import score_granularities, passes_thresholds
+from model_registry import get_model, sent_tokenize
+from streaming_filter import StreamingGroundingFilter, timed_verdicts
+from summary_embeddings_citations import SUMMARY_THRESHOLDS
+
+TESTSET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "node", "src", "test", "testset_nov_12_2023.json")
+
+
+def token_stream(text, words_per_second):
+    for word in text.split(" "):
+        time.sleep(1 / words_per_second)
+        yield word + " "
+
+
+def batch_path(model, text, embeddings, words_per_second):
+    start = time.perf_counter()
+    full = "".join(token_stream(text, words_per_second))
+    sentences = sent_tokenize(full)
+    passes_thresholds(score_granularities(model.encode(sentences), embeddings), SUMMARY_THRESHOLDS)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def streaming_path(streaming_filter, text, words_per_second):
+    verdicts = list(timed_verdicts(streaming_filter.filter(token_stream(text, words_per_second))))
+    return verdicts[0]["elapsed"], verdicts[-1]["elapsed"]
+
+
+if __name__ == "__main__":
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "infgrad/stella-base-en-v2"
+    words_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 40.0
+    n_records = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    model = get_model(model_name)
+    with open(TESTSET) as f:
+        records = json.load(f)[:n_records]
+
+    timings = {"batch": ([], []), "streaming": ([], [])}
+    for record in records:
+        sentences = sent_tokenize(record["transcript_text"])
+        texts = {"sentence": sentences, "paragraph": split_into_paragraphs(sentences), "chunk": sliding_window(sentences)}
+        embeddings = {granularity: model.encode(items) for granularity, items in texts.items()}
+        streaming_filter = StreamingGroundingFilter(model, texts, embeddings, SUMMARY_THRESHOLDS)
+
+        for path, (first, last) in (
+            ("batch", batch_path(model, record["summary_hallucinated"], embeddings, words_per_second)),
+            ("streaming", streaming_path(streaming_filter, record["summary_hallucinated"], words_per_second)),
+        ):
+            timings[path][0].append(first)
+            timings[path][1].append(last)
+
+    print(f"{len(records)} summaries streamed at {words_per_second:g} words/s\n")
+    print(f"{'path':<10} {'first verdict p50 (s)':>22} {'last verdict p50 (s)':>21}")
+    for path, (first, last) in timings.items():
+        print(f"{path:<10} {statistics.median(first):>22.3f} {statistics.median(last):>21.3f}")
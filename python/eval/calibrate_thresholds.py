@@ -0,0 +1,228 @@
+"""
+Calibrate the grounding thresholds per output type against the labelled node test set.
+
+A threshold decision (passes_thresholds) only looks at the best similarity per granularity. The
+sufficient statistics are therefore one [items, 3] matrix of top sentence/paragraph/chunk
+similarities per output type, plus a hallucination label per item. These are computed once per
+model (encode + similarity, the slow part) and cached as .npz. The cache is keyed by the model
+and the test set contents.
+
+The sweep covers every (sentence, paragraph, chunk) combination of the threshold grid at once. An
+item is filtered at (a, b, c) when all three of its similarities fall below grid[a], grid[b]
+and grid[c]. That is a 3-D dominance count: histogram each item at its per-granularity grid rank,
+then take cumulative sums along the three axes. Counting every combination costs O(grid^3),
+whatever the number of items, and a full sweep takes well under a second.
+
+QA answers pass only on a strictly positive margin (grounding.citations), so for QA an item at
+exactly a threshold counts as filtered; summaries and action items keep it (>=).
+
+Reports, per output type ("positive" = hallucinated = filtered):
+- the F1-optimal thresholds;
+- the ROC-optimal thresholds (maximum Youden's J = TPR - FPR);
+- the current thresholds' precision/recall, for comparison.
+
+    python eval/calibrate_thresholds.py [--model NAME] [--grid-start 0.5 --grid-stop 0.95 --grid-step 0.01]
+                                        [--limit N] [--save thresholds.json] [--refresh]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from action_items_embeddings_citations import ACTION_ITEM_THRESHOLDS, parse_action_items
+from embedding_cache import DEFAULT_CACHE_DIR
+from grounding import GRANULARITIES, FusedIndex, top_similarities
+from harness import DEFAULT_MODEL, OUTPUT_TYPES, TESTSET, load_testset, matches_label, segment_transcript
+from model_registry import get_encoder, sent_tokenize
+from qa_embeddings_citations import GRANULARITY_THRESHOLDS
+from summary_embeddings_citations import SUMMARY_THRESHOLDS
+
+CURRENT_THRESHOLDS = {"summary": SUMMARY_THRESHOLDS, "qa": GRANULARITY_THRESHOLDS, "action_items": ACTION_ITEM_THRESHOLDS}
+# Output types whose production rule is citations() with strict=True: pass only when similarity > threshold
+STRICT_OUTPUT_TYPES = {"qa"}
+
+
+def record_items(record):
+    """
+    (output type, text, hallucinated) for every output item of a test set record, labelled as the harness does.
+    """
+    items = []
+    for summary, labels in ((record["summary_success"], []), (record["summary_hallucinated"], record["summary_hallucinated_label"])):
+        items += [("summary", sentence, matches_label(sentence, labels)) for sentence in dict.fromkeys(sent_tokenize(summary))]
+    qa_labels = [item["answer"] for item in record["qa_hallucinated_label"]]
+    for qa, labels in ((record["qa_success"], []), (record["qa_hallucinated"], qa_labels)):
+        items += [("qa", item["answer"], matches_label(item["answer"], labels)) for item in qa]
+    for action_items, labels in ((record["action_items_success"], []), (record["action_items_hallucinated"], record["action_items_hallucinated_label"])):
+        items += [("action_items", bullet, matches_label(bullet, labels)) for bullet in parse_action_items(action_items).bullets]
+    return items
+
+
+def score_matrices(records, model_name):
+    """
+    Returns:
+    - dict: output type -> (array [items, 3] of top similarity per granularity, bool array [items] of labels).
+    """
+    encoder = get_encoder(model_name)
+    similarities = {output_type: [] for output_type in OUTPUT_TYPES}
+    labels = {output_type: [] for output_type in OUTPUT_TYPES}
+    for record in records:
+        texts = segment_transcript(record["transcript_text"])
+        index = FusedIndex({granularity: encoder.encode(items) for granularity, items in texts.items()})
+        items = record_items(record)
+        if not items:
+            continue
+        scores = index.search(encoder.encode([text for _, text, _ in items]), 1)
+        top = top_similarities(scores, GRANULARITIES)
+        for row, (output_type, _, hallucinated) in enumerate(items):
+            similarities[output_type].append(top[row])
+            labels[output_type].append(hallucinated)
+    return {
+        output_type: (np.array(similarities[output_type], dtype=np.float32).reshape(-1, len(GRANULARITIES)),
+                      np.array(labels[output_type], dtype=bool))
+        for output_type in OUTPUT_TYPES
+    }
+
+
+def cache_path(model_name, testset_path, limit):
+    with open(testset_path, "rb") as f:
+        digest = hashlib.sha1(f.read() + f"\x1f{model_name}\x1f{limit}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DEFAULT_CACHE_DIR, f"calibration-{digest}.npz")
+
+
+def load_score_matrices(model_name=DEFAULT_MODEL, testset_path=TESTSET, limit=None, refresh=False):
+    """
+    score_matrices for the test set, read from the .npz cache unless refresh is set or it is missing.
+    """
+    path = cache_path(model_name, testset_path, limit)
+    if os.path.exists(path) and not refresh:
+        with np.load(path) as cached:
+            return {output_type: (cached[f"{output_type}_similarities"], cached[f"{output_type}_labels"]) for output_type in OUTPUT_TYPES}
+    matrices = score_matrices(load_testset(testset_path)[:limit], model_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {}
+    for output_type, (similarities, labels) in matrices.items():
+        arrays[f"{output_type}_similarities"] = similarities
+        arrays[f"{output_type}_labels"] = labels
+    np.savez(path, **arrays)
+    return matrices
+
+
+def filtered_counts(similarities, grid, strict=False):
+    """
+    Number of items filtered at every threshold combination.
+
+    Returns:
+    - array [len(grid)] * 3: entry (a, b, c) counts the items whose sentence, paragraph and chunk
+      similarities are all below grid[a], grid[b] and grid[c] respectively. With strict=True
+      (the QA rule) a similarity equal to its threshold counts as filtered too.
+    """
+    size = len(grid) + 1
+    # rank r = number of grid values <= similarity (< with strict); the item is filtered at index a iff a >= r
+    ranks = np.searchsorted(grid, similarities, side="left" if strict else "right")
+    histogram = np.bincount(np.ravel_multi_index(ranks.T, (size,) * 3), minlength=size ** 3).reshape((size,) * 3)
+    return histogram.cumsum(0).cumsum(1).cumsum(2)[:-1, :-1, :-1]
+
+
+def sweep(similarities, labels, grid, strict=False):
+    """
+    Confusion counts and rates for every threshold combination of grid (strict as in filtered_counts).
+
+    Returns:
+    - dict of arrays [len(grid)] * 3: tp, fp, precision, recall (= TPR), fpr, f1.
+    """
+    tp = filtered_counts(similarities[labels], grid, strict)
+    fp = filtered_counts(similarities[~labels], grid, strict)
+    positives, negatives = labels.sum(), (~labels).sum()
+    precision = np.divide(tp, tp + fp, out=np.ones(tp.shape), where=(tp + fp) > 0)
+    recall = tp / positives if positives else np.ones(tp.shape)
+    fpr = fp / negatives if negatives else np.zeros(fp.shape)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(tp.shape), where=(precision + recall) > 0)
+    return {"tp": tp, "fp": fp, "precision": precision, "recall": recall, "fpr": fpr, "f1": f1}
+
+
+def _point(results, position, grid):
+    return {
+        "thresholds": {granularity: round(float(grid[index]), 4) for granularity, index in zip(GRANULARITIES, position)},
+        "precision": float(results["precision"][position]),
+        "recall": float(results["recall"][position]),
+        "fpr": float(results["fpr"][position]),
+        "f1": float(results["f1"][position]),
+    }
+
+
+def calibrate(matrices, grid, current=CURRENT_THRESHOLDS):
+    """
+    F1- and ROC-optimal thresholds per output type, plus the current thresholds' operating point.
+    """
+    report = {}
+    for output_type, (similarities, labels) in matrices.items():
+        if not len(labels) or labels.all() or not labels.any():
+            # Nothing to separate (e.g. no labelled action items in the subset)
+            continue
+        strict = output_type in STRICT_OUTPUT_TYPES
+        results = sweep(similarities, labels, grid, strict)
+        best_f1 = np.unravel_index(np.argmax(results["f1"]), results["f1"].shape)
+        best_j = np.unravel_index(np.argmax(results["recall"] - results["fpr"]), results["f1"].shape)
+        # The current thresholds may be off the grid, so evaluate them directly
+        threshold_vector = np.array([current[output_type][granularity] for granularity in GRANULARITIES])
+        filtered = ((similarities <= threshold_vector) if strict else (similarities < threshold_vector)).all(axis=1)
+        tp, fp = int((filtered & labels).sum()), int((filtered & ~labels).sum())
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / labels.sum()
+        report[output_type] = {
+            "items": int(len(labels)),
+            "hallucinated": int(labels.sum()),
+            "f1_optimal": _point(results, best_f1, grid),
+            "roc_optimal": _point(results, best_j, grid),
+            "current": {
+                "thresholds": dict(current[output_type]),
+                "precision": precision,
+                "recall": recall,
+                "fpr": fp / (~labels).sum(),
+                "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            },
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'output':<13} {'point':<12} {'sentence':>9} {'paragraph':>10} {'chunk':>7} {'P':>6} {'R':>6} {'FPR':>6} {'F1':>6}")
+    for output_type, entry in report.items():
+        for name in ("current", "f1_optimal", "roc_optimal"):
+            point = entry[name]
+            thresholds = point["thresholds"]
+            print(f"{output_type:<13} {name:<12} {thresholds['sentence']:>9.2f} {thresholds['paragraph']:>10.2f} {thresholds['chunk']:>7.2f} "
+                  f"{point['precision']:>6.3f} {point['recall']:>6.3f} {point['fpr']:>6.3f} {point['f1']:>6.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--grid-start", type=float, default=0.5)
+    parser.add_argument("--grid-stop", type=float, default=0.95)
+    parser.add_argument("--grid-step", type=float, default=0.01)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--refresh", action="store_true", help="recompute the cached score matrices")
+    parser.add_argument("--save", default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matrices = load_score_matrices(args.model, limit=args.limit, refresh=args.refresh)
+    scored = time.perf_counter()
+    grid = np.round(np.arange(args.grid_start, args.grid_stop + args.grid_step / 2, args.grid_step), 4)
+    report = calibrate(matrices, grid)
+    swept = time.perf_counter()
+
+    print(f"{args.model}: {sum(len(labels) for _, labels in matrices.values())} items, "
+          f"{len(grid) ** 3} threshold combinations per output type")
+    print(f"score matrices {scored - start:.2f}s, sweep {swept - scored:.3f}s\n")
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"model": args.model, "grid": grid.tolist(), "calibration": report}, f, indent=2)
@@ -0,0 +1,95 @@
+"""
+Accuracy comparison of pooled chunk embeddings against the exact-encode path.
+
+For every record in node/src/test/testset_nov_12_2023.json this segments transcript_text
+locally, builds chunk embeddings both ways and reports:
+- how close the pooled chunk vectors are to the exact ones (cosine),
+- how often the keep/filter decision of a summary sentence changes,
+- how many labelled hallucinations each mode filters out,
+- the encoder time spent on chunks.
+
+Needs the sentence transformer available locally; no AssemblyAI access.
+
+    python eval/compare_pooled_chunks.py [model_name] [window_size] [stride]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from chunking import sliding_window, pooled_chunk_embeddings, split_into_paragraphs, token_counts
+from grounding import normalize_rows, score_granularities, passes_thresholds
+from harness import load_testset, matches_label
+from model_registry import get_model, sent_tokenize
+from summary_embeddings_citations import SENTENCE_THRESHOLD, PARAGRAPH_THRESHOLD, CHUNK_THRESHOLD
+
+THRESHOLDS = {"sentence": SENTENCE_THRESHOLD, "paragraph": PARAGRAPH_THRESHOLD, "chunk": CHUNK_THRESHOLD}
+
+
+def decisions(model, summary_sentences, granularity_embeddings):
+    scores = score_granularities(model.encode(summary_sentences), granularity_embeddings)
+    return passes_thresholds(scores, THRESHOLDS)
+
+
+if __name__ == "__main__":
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "infgrad/stella-base-en-v2"
+    window_size = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    stride = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    model = get_model(model_name)
+    records = load_testset()
+
+    modes = ("exact", "pooled", "pooled_tokens")
+    chunk_seconds = dict.fromkeys(modes, 0.0)
+    caught = dict.fromkeys(modes, 0)
+    flips = dict.fromkeys(modes[1:], 0)
+    similarities = {mode: [] for mode in modes[1:]}
+    n_summary_sentences = 0
+    n_hallucinations = 0
+
+    for record in records:
+        sentences = sent_tokenize(record["transcript_text"])
+        paragraphs = split_into_paragraphs(sentences)
+        sentence_embeddings = model.encode(sentences)
+        paragraph_embeddings = model.encode(paragraphs)
+
+        chunks = {}
+        start = time.perf_counter()
+        chunks["exact"] = model.encode(sliding_window(sentences, window_size, stride))
+        chunk_seconds["exact"] += time.perf_counter() - start
+        start = time.perf_counter()
+        chunks["pooled"] = pooled_chunk_embeddings(sentence_embeddings, window_size, stride)
+        chunk_seconds["pooled"] += time.perf_counter() - start
+        start = time.perf_counter()
+        chunks["pooled_tokens"] = pooled_chunk_embeddings(sentence_embeddings, window_size, stride, token_counts(sentences))
+        chunk_seconds["pooled_tokens"] += time.perf_counter() - start
+
+        summary_sentences = sent_tokenize(record["summary_hallucinated"])
+        labels = record["summary_hallucinated_label"]
+        is_hallucinated = np.array([matches_label(sentence, labels) for sentence in summary_sentences], dtype=bool)
+        n_summary_sentences += len(summary_sentences)
+        n_hallucinations += int(is_hallucinated.sum())
+
+        per_mode = {}
+        for mode in modes:
+            per_mode[mode] = decisions(model, summary_sentences, {
+                "sentence": sentence_embeddings,
+                "paragraph": paragraph_embeddings,
+                "chunk": chunks[mode],
+            })
+            caught[mode] += int((~per_mode[mode] & is_hallucinated).sum())
+        for mode in modes[1:]:
+            flips[mode] += int((per_mode[mode] != per_mode["exact"]).sum())
+            cosines = np.sum(normalize_rows(chunks["exact"]) * normalize_rows(chunks[mode]), axis=1)
+            similarities[mode].extend(cosines.tolist())
+
+    print(f"{len(records)} transcripts, {n_summary_sentences} summary sentences, {n_hallucinations} labelled hallucinations")
+    print(f"window_size={window_size} stride={stride}\n")
+    print(f"{'mode':<15} {'chunk time (s)':>15} {'hallucinations filtered':>24} {'decision flips':>15} {'mean cos to exact':>18} {'min cos':>8}")
+    for mode in modes:
+        flip = "-" if mode == "exact" else flips[mode]
+        mean_cos = "-" if mode == "exact" else f"{np.mean(similarities[mode]):.4f}"
+        min_cos = "-" if mode == "exact" else f"{np.min(similarities[mode]):.4f}"
+        print(f"{mode:<15} {chunk_seconds[mode]:>15.3f} {caught[mode]:>24} {flip:>15} {mean_cos:>18} {min_cos:>8}")
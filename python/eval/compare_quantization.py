@@ -0,0 +1,69 @@
+"""
+Decision flips and memory of compact (float16 / int8) transcript embeddings against float32.
+
+For every record in node/src/test/testset_nov_12_2023.json this segments transcript_text
+locally, encodes it once and scores:
+- every summary sentence (clean and hallucinated summaries) at the filter_summary_sentences thresholds,
+- every QA answer (clean and hallucinated) at GRANULARITY_THRESHOLDS,
+against the float32 FusedIndex and the float16 / int8 CompactFusedIndex. It reports how many
+keep/filter decisions and cited granularities flip, the largest score error and the index size.
+
+Needs the sentence transformer available locally; no AssemblyAI access.
+
+    python eval/compare_quantization.py [model_name] [limit]
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from harness import load_testset, segment_transcript
+from model_registry import get_model, sent_tokenize
+from qa_embeddings_citations import GRANULARITY_THRESHOLDS
+from quantization import decision_flips
+from summary_embeddings_citations import SUMMARY_THRESHOLDS
+
+DTYPES = ("float16", "int8")
+
+
+def _accumulate(totals, report):
+    totals["queries"] += report["queries"]
+    totals["float32_bytes"] += report["float32_bytes"]
+    for dtype in DTYPES:
+        for metric in ("keep_filter_flips", "citation_flips", "bytes"):
+            totals[dtype][metric] += report[dtype][metric]
+        totals[dtype]["max_abs_score_error"] = max(totals[dtype]["max_abs_score_error"], report[dtype]["max_abs_score_error"])
+
+
+if __name__ == "__main__":
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "infgrad/stella-base-en-v2"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    model = get_model(model_name)
+    records = load_testset()[:limit]
+
+    totals = {
+        output_type: {
+            "queries": 0,
+            "float32_bytes": 0,
+            **{dtype: {"keep_filter_flips": 0, "citation_flips": 0, "max_abs_score_error": 0.0, "bytes": 0} for dtype in DTYPES},
+        }
+        for output_type in ("summary", "qa")
+    }
+    for record in records:
+        texts = segment_transcript(record["transcript_text"])
+        embeddings = {granularity: model.encode(items) for granularity, items in texts.items()}
+
+        summary_sentences = list(dict.fromkeys(sent_tokenize(record["summary_success"]) + sent_tokenize(record["summary_hallucinated"])))
+        if summary_sentences:
+            _accumulate(totals["summary"], decision_flips(model.encode(summary_sentences), embeddings, SUMMARY_THRESHOLDS, dtypes=DTYPES))
+        answers = [item["answer"] for item in record["qa_success"] + record["qa_hallucinated"]]
+        if answers:
+            _accumulate(totals["qa"], decision_flips(model.encode(answers), embeddings, GRANULARITY_THRESHOLDS, dtypes=DTYPES))
+
+    print(f"{len(records)} transcripts, model {model_name}\n")
+    print(f"{'output':<8} {'dtype':<8} {'queries':>8} {'keep/filter flips':>18} {'citation flips':>15} {'max score err':>14} {'index MB':>9}")
+    for output_type, total in totals.items():
+        print(f"{output_type:<8} {'float32':<8} {total['queries']:>8} {'-':>18} {'-':>15} {'-':>14} {total['float32_bytes'] / 1024 ** 2:>9.2f}")
+        for dtype in DTYPES:
+            metrics = total[dtype]
+            print(f"{output_type:<8} {dtype:<8} {total['queries']:>8} {metrics['keep_filter_flips']:>18} {metrics['citation_flips']:>15} "
+                  f"{metrics['max_abs_score_error']:>14.5f} {metrics['bytes'] / 1024 ** 2:>9.2f}")
@@ -0,0 +1,279 @@
+"""
+Offline evaluation and benchmark harness for the Python validators.
+
+Loads node/src/test/testset_nov_12_2023.json, segments every transcript_text locally (no
+AssemblyAI access) and runs the summary, QA and action-item grounding logic against it.
+Reports precision/recall of hallucination filtering per output type together with throughput
+(output sentences/sec), p50/p99 per-record latency and peak RSS. No memory tracing runs during
+the timed loop, so the throughput figures are not skewed by allocation hooks.
+
+The sentence transformer must already be in the local Hugging Face cache; set HF_HUB_OFFLINE=1
+to guarantee no network access.
+
+    python eval/harness.py [--model NAME] [--limit N] [--save report.json] [--baseline report.json]
+                           [--stages] [--profile out.prof]
+
+With --baseline the run fails (exit code 1) when recall, precision or throughput regress by
+more than the allowed tolerances. --stages adds the per-stage metrics spans and counters
+(encode, similarity, validate...) to the report; --profile runs the evaluation under cProfile.
+"""
+import argparse
+import ast
+import difflib
+import json
+import os
+import re
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import metrics
+from chunking import sliding_window, split_into_paragraphs
+from action_items_embeddings_citations import validate_action_items
+from embedding_cache import encode_segments
+from grounding import FusedIndex
+from model_registry import get_encoder, sent_tokenize
+from qa_embeddings_citations import process_lemur_qa_batch
+from summary_embeddings_citations import filter_summary_sentences_local
+
+TESTSET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "node", "src", "test", "testset_nov_12_2023.json")
+DEFAULT_MODEL = "infgrad/stella-base-en-v2"
+OUTPUT_TYPES = ("summary", "qa", "action_items")
+
+_QA_ITEM = re.compile(r"""['"]question['"]\s*:\s*(['"])(.*?)\1\s*,\s*['"]answer['"]\s*:\s*(['"])(.*?)\3\s*}""", re.S)
+
+
+def _unquote(item):
+    if len(item) >= 2 and item[0] == item[-1] and item[0] in "'\"":
+        return item[1:-1]
+    return item
+
+
+def parse_string_list(value):
+    """
+    Parse the Python-repr string lists of the test set, e.g. "['a', 'b']".
+
+    Several entries contain unescaped apostrophes ("GitLab's"), which literal_eval rejects,
+    so fall back to splitting on quote-comma-quote boundaries. A few are bracketed but unquoted
+    ("[First sentence., Second one.]"), split after sentence-ending punctuation, and one is a
+    bare sentence without brackets.
+    """
+    if not value:
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+        if isinstance(parsed, list):
+            return [str(item) for item in parsed]
+    except (ValueError, SyntaxError):
+        pass
+    text = value.strip()
+    if not (text.startswith("[") and text.endswith("]")):
+        return [text]
+    inner = text[1:-1].strip()
+    if not inner:
+        return []
+    separator = r"""(?<=['"])\s*,\s*(?=['"])""" if inner[0] in "'\"" else r"(?<=[.!?])\s*,\s*"
+    return [_unquote(item.strip()) for item in re.split(separator, inner)]
+
+
+def parse_qa_list(value):
+    """
+    Parse the QA lists of the test set ("[{'question': ..., 'answer': ...}, ...]") into dicts.
+    """
+    if not value:
+        return []
+    return [{"question": match.group(2), "answer": match.group(4)} for match in _QA_ITEM.finditer(value)]
+
+
+def load_testset(path=TESTSET):
+    with open(path) as f:
+        records = json.load(f)
+    for record in records:
+        record["summary_hallucinated_label"] = parse_string_list(record["summary_hallucinated_label"])
+        for key in ("qa_success", "qa_hallucinated", "qa_hallucinated_label"):
+            record[key] = parse_qa_list(record[key])
+        for key in ("action_items_success", "action_items_hallucinated", "action_items_hallucinated_label"):
+            record[key] = parse_string_list(record[key])
+    return records
+
+
+def segment_transcript(transcript_text, window_size=3):
+    """
+    Local stand-in for extract_paragraphs_and_sentences + sliding_window on a plain-text transcript.
+    """
+    sentences = sent_tokenize(transcript_text)
+    return {"sentence": sentences, "paragraph": split_into_paragraphs(sentences), "chunk": sliding_window(sentences, window_size)}
+
+
+def _normalize(text):
+    return re.sub(r"[^a-z0-9 ]", "", text.lower()).strip()
+
+
+def matches_label(text, labels, min_ratio=0.8):
+    """
+    True when text is one of the labelled hallucinations. Labels in the test set are hand-copied and
+    sometimes clipped or merged, so compare normalized text with a fuzzy ratio or containment.
+    """
+    text = _normalize(text)
+    for label in labels:
+        label = _normalize(label)
+        if not label:
+            continue
+        if text == label or (len(text) > 20 and text in label):
+            return True
+        if difflib.SequenceMatcher(None, text, label).ratio() >= min_ratio:
+            return True
+    return False
+
+
+def precision_recall(counts):
+    tp, fp, fn = counts["tp"], counts["fp"], counts["fn"]
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+
+def _count(counts, filtered, hallucinated):
+    # "Positive" means flagged as hallucinated, i.e. filtered out / not grounded
+    if filtered and hallucinated:
+        counts["tp"] += 1
+    elif filtered:
+        counts["fp"] += 1
+    elif hallucinated:
+        counts["fn"] += 1
+    else:
+        counts["tn"] += 1
+
+
+def evaluate(records, model_name=DEFAULT_MODEL, k=3):
+    # The production encode path: memoized, batched encoder shared with the validators
+    encoder = get_encoder(model_name)
+    counts = {output_type: {"tp": 0, "fp": 0, "fn": 0, "tn": 0} for output_type in OUTPUT_TYPES}
+    latencies = []
+    n_items = 0
+    prep_seconds = 0.0
+    validate_seconds = 0.0
+
+    for record in records:
+        start = time.perf_counter()
+        sentences = sent_tokenize(record["transcript_text"])
+        texts, embeddings = encode_segments(split_into_paragraphs(sentences), sentences, encoder.encode)
+        index = FusedIndex(embeddings)
+        prep_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        record_items = 0
+
+        # Summaries: every sentence of the clean summary should be kept, labelled ones filtered
+        for summary, labels in ((record["summary_success"], []), (record["summary_hallucinated"], record["summary_hallucinated_label"])):
+            _, filtered = filter_summary_sentences_local(summary, index, model_name, k)
+            filtered = set(filtered)
+            for sentence in dict.fromkeys(sent_tokenize(summary)):
+                _count(counts["summary"], sentence in filtered, matches_label(sentence, labels))
+                record_items += 1
+
+        # QA: the clean answers should pass grounding, the labelled ones should fail
+        qa_jobs = [(texts, index, record["qa_success"]), (texts, index, record["qa_hallucinated"])]
+        qa_labels = [[], [item["answer"] for item in record["qa_hallucinated_label"]]]
+        for results, labels in zip(process_lemur_qa_batch(qa_jobs, k, model_name), qa_labels):
+            for result in results:
+                _count(counts["qa"], not result["grounding_threshold_passed"], matches_label(result["answer"], labels))
+                record_items += 1
+
+        # Action items (not every record has them)
+        for items, labels in ((record["action_items_success"], []), (record["action_items_hallucinated"], record["action_items_hallucinated_label"])):
+            if not items:
+                continue
+            for result in validate_action_items(items, texts, index, model_name, k)["action_items"]:
+                _count(counts["action_items"], not result["grounding_threshold_passed"], matches_label(result["action_item"], labels))
+                record_items += 1
+
+        elapsed = time.perf_counter() - start
+        validate_seconds += elapsed
+        latencies.append(elapsed)
+        n_items += record_items
+
+    report = {"model": model_name, "records": len(records), "k": k, "accuracy": {}}
+    for output_type, output_counts in counts.items():
+        precision, recall = precision_recall(output_counts)
+        report["accuracy"][output_type] = {**output_counts, "precision": precision, "recall": recall}
+    report["performance"] = {
+        "items_scored": n_items,
+        "sentences_per_sec": n_items / validate_seconds if validate_seconds else 0.0,
+        "latency_p50_s": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "latency_p99_s": float(np.percentile(latencies, 99)) if latencies else 0.0,
+        "transcript_prep_s": prep_seconds,
+        # ru_maxrss is KiB on Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    return report
+
+
+def regressions(report, baseline, max_accuracy_drop=0.02, max_slowdown=1.25):
+    problems = []
+    for output_type in OUTPUT_TYPES:
+        for metric in ("precision", "recall"):
+            before = baseline["accuracy"][output_type][metric]
+            after = report["accuracy"][output_type][metric]
+            if after < before - max_accuracy_drop:
+                problems.append(f"{output_type} {metric} dropped from {before:.3f} to {after:.3f}")
+    before = baseline["performance"]["sentences_per_sec"]
+    after = report["performance"]["sentences_per_sec"]
+    if after * max_slowdown < before:
+        problems.append(f"throughput dropped from {before:.1f} to {after:.1f} sentences/sec")
+    return problems
+
+
+def print_report(report):
+    print(f"model: {report['model']}  records: {report['records']}  k: {report['k']}\n")
+    print(f"{'output':<14} {'tp':>4} {'fp':>4} {'fn':>4} {'tn':>5} {'precision':>10} {'recall':>8}")
+    for output_type, scores in report["accuracy"].items():
+        print(f"{output_type:<14} {scores['tp']:>4} {scores['fp']:>4} {scores['fn']:>4} {scores['tn']:>5} "
+              f"{scores['precision']:>10.3f} {scores['recall']:>8.3f}")
+    print()
+    for metric, value in report["performance"].items():
+        print(f"{metric:<20} {value:>12.3f}" if isinstance(value, float) else f"{metric:<20} {value:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--testset", default=TESTSET)
+    parser.add_argument("--limit", type=int, default=None, help="only evaluate the first N records")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="compare against a saved report and fail on regressions")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02)
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--stages", action="store_true", help="collect per-stage metrics into the report")
+    parser.add_argument("--profile", help="write a cProfile profile of the evaluation to this file")
+    args = parser.parse_args()
+
+    records = load_testset(args.testset)[:args.limit]
+    if args.stages:
+        metrics.enable()
+    if args.profile:
+        with metrics.profile(args.profile):
+            report = evaluate(records, args.model, args.k)
+    else:
+        report = evaluate(records, args.model, args.k)
+    if args.stages:
+        report["stages"] = metrics.snapshot()
+    print_report(report)
+    if args.stages:
+        print()
+        for entry in report["stages"]["spans"]:
+            labels = ",".join(f"{key}={value}" for key, value in entry["labels"].items())
+            print(f"{entry['name'] + ('[' + labels + ']' if labels else ''):<44} {entry['count']:>7} {entry['total_s']:>10.3f}s")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(report, json.load(f), args.max_accuracy_drop, args.max_slowdown)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,98 @@
+"""
+Load test for validation_service.py: throughput and tail latency under concurrent clients.
+
+Jobs come from a bulk_validate manifest (--manifest) or, by default, from the node test set. Each
+record becomes one /v1/validate job with its transcript text, both summaries, both QA lists and
+both action-item lists. Every client thread sends jobs back to back for --requests requests in
+total. 503 answers are counted as rejected, not retried.
+
+Start the service first, e.g. python validation_service.py --max-batch 64 --max-wait-ms 5
+
+    python eval/load_test_service.py [--url http://127.0.0.1:8765] [--concurrency 16] [--requests 200] [--manifest jobs.jsonl]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bulk_validate import read_manifest
+from harness import load_testset
+
+
+def testset_jobs():
+    jobs = []
+    for position, record in enumerate(load_testset()):
+        for variant in ("success", "hallucinated"):
+            jobs.append({
+                "id": f"{position}-{variant}",
+                "transcript_text": record["transcript_text"],
+                "summary": record[f"summary_{variant}"],
+                "qa": record[f"qa_{variant}"],
+                "action_items": record[f"action_items_{variant}"],
+            })
+    return jobs
+
+
+def run(url, jobs, concurrency, n_requests, timeout=120):
+    """
+    Returns:
+    - (list of float, dict, float): latency in seconds of every 200 answer, counts per status, wall time.
+    """
+    job_cycle = itertools.cycle(jobs)
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    local = threading.local()
+
+    def send(_):
+        with lock:
+            job = next(job_cycle)
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            status = local.session.post(url + "/v1/validate", json=job, timeout=timeout).status_code
+        except requests.RequestException:
+            status = "error"
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, range(n_requests)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--manifest", default=None)
+    parser.add_argument("--warmup", type=int, default=None, help="requests sent first and not measured (default: one per job)")
+    args = parser.parse_args()
+
+    jobs = read_manifest(args.manifest) if args.manifest else testset_jobs()
+    health = requests.get(args.url + "/health", timeout=10).json()
+    print(f"service: {health['model']}, max_in_flight {health['max_in_flight']}")
+    # The first request per transcript pays its encoding; warm up so the measurement is steady state
+    run(args.url, jobs, args.concurrency, len(jobs) if args.warmup is None else args.warmup)
+
+    latencies, statuses, seconds = run(args.url, jobs, args.concurrency, args.requests)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {seconds:.2f}s")
+    print(f"statuses: {json.dumps({str(status): count for status, count in sorted(statuses.items(), key=str)})}")
+    print(f"throughput: {len(latencies) / seconds:.1f} req/s")
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        print(f"latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {max(latencies) * 1000:.1f}")
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+from action_items_embeddings_citations import ACTION_ITEM_THRESHOLDS, parse_action_items, validate_action_items
+from grounding import FusedIndex, passes_thresholds, score_granularities
+from test_bulk_validate import SENTENCES, BagOfWordsEncoder
+
+RESPONSE = """
+Here are the action items I would suggest based on the transcript:
+
+**Air Quality**
+- Officials told residents to stay indoors.
+- Book a venue in Lisbon for the engineering offsite.
+
+**Health**
+1. Fine particulate matter can get deep into the lungs.
+"""
+
+
+class RecordingEncoder(BagOfWordsEncoder):
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return super().encode(texts)
+
+
+def transcript(encoder):
+    texts = {"sentence": SENTENCES, "paragraph": [" ".join(SENTENCES)], "chunk": [" ".join(SENTENCES[i:i + 3]) for i in range(len(SENTENCES) - 2)]}
+    return texts, {granularity: encoder.encode(items) for granularity, items in texts.items()}
+
+
+def test_parse_action_items():
+    parsed = parse_action_items(RESPONSE)
+    assert parsed.headers == ["Air Quality", "Health"]
+    assert parsed.bullets[1] == "Book a venue in Lisbon for the engineering offsite."
+    assert parsed.bullets[2] == "Fine particulate matter can get deep into the lungs."
+    assert parsed.sections.tolist() == [0, 0, 1]
+    # A plain list is one untitled section
+    assert parse_action_items(["a", " ", "b"]).headers == [""]
+    assert len(parse_action_items("No action items were found.")) == 0
+
+
+def test_bullets_are_grounded_one_by_one(monkeypatch):
+    encoder = RecordingEncoder()
+    monkeypatch.setitem(model_registry._models, "bow-items", encoder)
+    texts, embeddings = transcript(encoder)
+    model_registry.get_encoder("bow-items").clear()
+    encoder.calls.clear()
+
+    result = validate_action_items(RESPONSE, texts, FusedIndex(embeddings), "bow-items")
+    assert encoder.calls == [parse_action_items(RESPONSE).bullets]
+    assert [item["grounding_threshold_passed"] for item in result["action_items"]] == [True, False, True]
+    assert result["action_items"][0]["citation"]["reference"] == SENTENCES[4]
+    assert result["action_items"][1]["section"] == "Air Quality"
+    assert result["sections"] == [
+        {"header": "Air Quality", "action_items": 2, "grounded_action_items": 1, "grounding_threshold_passed": False},
+        {"header": "Health", "action_items": 1, "grounded_action_items": 1, "grounding_threshold_passed": True},
+    ]
+    assert result["filtered_action_items"] == ["Book a venue in Lisbon for the engineering offsite."]
+    assert result["new_action_items"] == (
+        "**Air Quality**\n- Officials told residents to stay indoors.\n\n**Health**\n- Fine particulate matter can get deep into the lungs."
+    )
+
+    # Same verdicts as scoring each item with the plain threshold check
+    items = parse_action_items(RESPONSE).bullets
+    expected = passes_thresholds(score_granularities(encoder.encode(items), embeddings), ACTION_ITEM_THRESHOLDS)
+    listed = validate_action_items(items, texts, embeddings, "bow-items")
+    assert np.array_equal([item["grounding_threshold_passed"] for item in listed["action_items"]], expected)
+    assert validate_action_items("", texts, embeddings, "bow-items")["action_items"] == []
+
+
+def test_empty_section_is_not_grounded(monkeypatch):
+    encoder = BagOfWordsEncoder()
+    monkeypatch.setitem(model_registry._models, "bow-empty", encoder)
+    texts, embeddings = transcript(encoder)
+    response = "**Air Quality**\n- Officials told residents to stay indoors.\n\n**Follow-ups**\n"
+    result = validate_action_items(response, texts, FusedIndex(embeddings), "bow-empty")
+    assert result["sections"][1] == {"header": "Follow-ups", "action_items": 0, "grounded_action_items": 0, "grounding_threshold_passed": False}
+    assert result["sections"][0]["grounding_threshold_passed"]
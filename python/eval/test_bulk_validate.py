@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+from bulk_validate import bulk_validate, completed_ids, transcript_key
+
+
+class BagOfWordsEncoder:
+    """Deterministic encoder: hashed bag of words, so paraphrases of transcript text score high."""
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        return vectors
+
+
+SENTENCES = [
+    "Smoke from the Canadian wildfires drifted into New York.",
+    "Air quality alerts were issued across the Northeast.",
+    "Peter DiCarlo is an associate professor at Johns Hopkins University.",
+    "Fine particulate matter can get deep into the lungs.",
+    "Officials told residents to stay indoors.",
+]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="relies on fork to share the test encoder with workers")
+def test_bulk_validate_writes_results_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setitem(model_registry._models, "bow", BagOfWordsEncoder())
+    manifest = tmp_path / "manifest.jsonl"
+    output = tmp_path / "results.jsonl"
+    jobs = [
+        {"id": "qa-1", "transcript_sentences": SENTENCES,
+         "qa": [{"question": "Who was interviewed?", "answer": "Peter DiCarlo is an associate professor at Johns Hopkins University."},
+                {"question": "What is the budget?", "answer": "Quarterly revenue grew by twelve percent in Berlin."}]},
+        {"id": "ai-1", "transcript_sentences": SENTENCES,
+         "action_items": ["Officials told residents to stay indoors.", "Schedule a offsite in Lisbon for engineering managers."]},
+        {"id": "qa-2", "transcript_sentences": SENTENCES[:4],
+         "qa": [{"question": "Where did smoke go?", "answer": "Smoke from the Canadian wildfires drifted into New York."}]},
+    ]
+    manifest.write_text("\n".join(json.dumps(job) for job in jobs) + "\n")
+
+    # A torn line left behind by a crash must not break the resume
+    output.write_text(json.dumps({"id": "qa-2", "transcript": "x", "qa": []}) + "\n" + '{"id": "ai-1", "trans')
+    assert completed_ids(str(output)) == {"qa-2"}
+
+    stats = bulk_validate(str(manifest), str(output), "bow", workers=2, wave_size=1, mp_context="fork")
+    assert stats == {"done": 2, "skipped": 1, "failed": 0}
+
+    results = {}
+    for line in output.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        results[record["id"]] = record
+    assert [item["grounding_threshold_passed"] for item in results["qa-1"]["qa"]] == [True, False]
+    assert results["qa-1"]["qa"][0]["citation"]["reference"] == SENTENCES[2]
+    assert [item["grounding_threshold_passed"] for item in results["ai-1"]["action_items"]] == [True, False]
+
+    assert bulk_validate(str(manifest), str(output), "bow", workers=2, mp_context="fork") == {"done": 0, "skipped": 3, "failed": 0}
+
+
+def test_transcript_key_covers_paragraphs():
+    job = {"transcript_sentences": SENTENCES}
+    split = {**job, "transcript_paragraphs": [" ".join(SENTENCES[:2]), " ".join(SENTENCES[2:])]}
+    assert transcript_key(job) != transcript_key(split)
+    assert transcript_key(split) == transcript_key(dict(split))
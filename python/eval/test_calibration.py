@@ -0,0 +1,58 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from calibrate_thresholds import calibrate, filtered_counts, sweep
+from grounding import citations, passes_thresholds
+
+
+def test_filtered_counts_match_brute_force():
+    rng = np.random.default_rng(2)
+    similarities = rng.uniform(0.4, 1.0, (200, 3)).astype(np.float32)
+    # Some similarities exactly on a grid value: passes_thresholds keeps those (>=)
+    similarities[:10, 0] = 0.7
+    grid = np.round(np.arange(0.5, 0.96, 0.05), 4)
+    counts = filtered_counts(similarities, grid)
+    for a, b, c in itertools.product(range(len(grid)), repeat=3):
+        thresholds = {"sentence": grid[a], "paragraph": grid[b], "chunk": grid[c]}
+        scores = {granularity: (None, similarities[:, [column]]) for column, granularity in enumerate(thresholds)}
+        assert counts[a, b, c] == (~passes_thresholds(scores, thresholds)).sum()
+
+
+def test_strict_counts_match_qa_citations():
+    rng = np.random.default_rng(4)
+    grid = np.round(np.arange(0.6, 0.91, 0.1), 4)
+    similarities = rng.uniform(0.5, 1.0, (60, 3))
+    # Exactly on a threshold: QA (strict) filters these, the >= rule keeps them
+    similarities[:10] = grid[1]
+    counts = filtered_counts(similarities, grid, strict=True)
+    texts = {granularity: ["reference"] for granularity in ("sentence", "paragraph", "chunk")}
+    for a, b, c in itertools.product(range(len(grid)), repeat=3):
+        thresholds = {"sentence": grid[a], "paragraph": grid[b], "chunk": grid[c]}
+        scores = {granularity: (np.zeros((60, 1), dtype=int), similarities[:, [column]]) for column, granularity in enumerate(thresholds)}
+        assert counts[a, b, c] == sum(not passed for _, _, passed in citations(scores, thresholds, texts))
+    assert counts[1, 1, 1] == filtered_counts(similarities, grid)[1, 1, 1] + 10
+
+
+def test_calibrate_finds_the_separating_thresholds():
+    rng = np.random.default_rng(3)
+    grounded = rng.uniform(0.82, 1.0, (300, 3))
+    # Hallucinations stay below 0.8 at sentence level, and under 0.7 elsewhere
+    hallucinated = np.column_stack([rng.uniform(0.5, 0.79, 60), rng.uniform(0.4, 0.69, 60), rng.uniform(0.4, 0.69, 60)])
+    similarities = np.vstack([grounded, hallucinated]).astype(np.float32)
+    labels = np.arange(360) >= 300
+    grid = np.round(np.arange(0.5, 0.951, 0.01), 4)
+
+    current = {"qa": {"sentence": 0.9, "paragraph": 0.9, "chunk": 0.9}}
+    report = calibrate({"qa": (similarities, labels)}, grid, current)["qa"]
+    best = report["f1_optimal"]
+    assert best["f1"] == 1.0 and best["precision"] == 1.0 and best["recall"] == 1.0
+    assert 0.78 < best["thresholds"]["sentence"] <= 0.82
+    assert report["roc_optimal"]["recall"] - report["roc_optimal"]["fpr"] == 1.0
+    # 0.9 everywhere filters a good share of the grounded items too
+    assert report["current"]["recall"] == 1.0 and report["current"]["precision"] < 1.0
+    assert sweep(similarities, labels, grid)["tp"].shape == (len(grid),) * 3
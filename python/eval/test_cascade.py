@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+from cascade import escalation_mask
+from grounding import FusedIndex
+from qa_embeddings_citations import GRANULARITY_THRESHOLDS, process_lemur_qa_batch, process_lemur_qa_batch_cascade
+from test_qa_batch import DIM, LookupEncoder, make_transcript
+
+
+def setup_encoders(monkeypatch, band_rng_seed=3):
+    rng = np.random.default_rng(band_rng_seed)
+    texts, embeddings = make_transcript(rng, "t")
+    qa = [{"question": f"q {i}?", "answer": f"answer {i}"} for i in range(12)]
+    vectors = {}
+    for i, item in enumerate(qa):
+        # From near-copies of a transcript sentence to unrelated text, so margins spread across the band
+        noise = [0.02, 0.3, 0.5, 3.0][i % 4]
+        vectors[item["answer"]] = embeddings["sentence"][i] + noise * rng.standard_normal(DIM)
+    for granularity, items in texts.items():
+        vectors.update(zip(items, embeddings[granularity]))
+    fast, slow = LookupEncoder(vectors), LookupEncoder(vectors)
+    monkeypatch.setitem(model_registry._models, "fast", fast)
+    monkeypatch.setitem(model_registry._models, "slow", slow)
+    return texts, embeddings, qa, fast, slow
+
+
+def test_only_borderline_answers_reach_the_slow_model(monkeypatch):
+    texts, embeddings, qa, fast, slow = setup_encoders(monkeypatch)
+    slow_index_builds = []
+
+    def slow_index():
+        slow_index_builds.append(1)
+        return embeddings
+
+    expected = process_lemur_qa_batch([(texts, embeddings, qa)], model_name="slow")[0]
+    slow.calls.clear()
+    # Forget the memoized answer vectors so every slow-model encode shows up in slow.calls
+    model_registry.get_encoder("slow").clear()
+    # Same vectors and thresholds for both models, so the cascade must agree with the slow model alone
+    results, stats = process_lemur_qa_batch_cascade(
+        [(texts, slow_index, qa)], model_name="slow", band=0.1, fast_model_name="fast", fast_thresholds=GRANULARITY_THRESHOLDS,
+    )
+    assert results[0] == expected
+
+    fast_scores = FusedIndex(embeddings).search(np.array([fast.vectors[item["answer"]] for item in qa]), 3)
+    borderline = [item["answer"] for item, escalate in zip(qa, escalation_mask(fast_scores, GRANULARITY_THRESHOLDS, 0.1)) if escalate]
+    assert 0 < len(borderline) < len(qa)
+    assert slow.calls == [borderline]
+    assert stats == {"items": 12, "escalated": len(borderline), "escalated_fraction": len(borderline) / 12}
+    assert slow_index_builds == [1]
+
+
+def test_zero_band_never_builds_the_slow_index(monkeypatch):
+    texts, embeddings, qa, fast, slow = setup_encoders(monkeypatch)
+
+    def slow_index():
+        raise AssertionError("slow index should not be built")
+
+    results, stats = process_lemur_qa_batch_cascade(
+        [(texts, slow_index, qa), (texts, slow_index, [])], model_name="slow", band=0.0, fast_model_name="fast",
+        fast_thresholds=GRANULARITY_THRESHOLDS,
+    )
+    assert stats["escalated"] == 0 and slow.calls == []
+    assert results[1] == [] and len(results[0]) == len(qa)
+
+
+def test_prebuilt_fast_index_skips_transcript_encoding(monkeypatch):
+    texts, embeddings, qa, fast, slow = setup_encoders(monkeypatch)
+    model_registry.get_encoder("fast").clear()
+    jobs = [(texts, embeddings, qa[:6]), (texts, embeddings, qa[6:])]
+    expected, _ = process_lemur_qa_batch_cascade(jobs, model_name="slow", band=0.1, fast_model_name="fast",
+                                                 fast_thresholds=GRANULARITY_THRESHOLDS)
+    # Without a fast index the transcript is encoded once for both jobs sharing it
+    transcript_texts = {text for items in texts.values() for text in items}
+    assert sum(len(transcript_texts.intersection(call)) > 0 for call in fast.calls) == 3
+
+    fast.calls.clear()
+    model_registry.get_encoder("fast").clear()
+    results, _ = process_lemur_qa_batch_cascade([job + (FusedIndex(embeddings),) for job in jobs], model_name="slow", band=0.1,
+                                                fast_model_name="fast", fast_thresholds=GRANULARITY_THRESHOLDS)
+    assert results == expected
+    assert [answer for call in fast.calls for answer in call] == [item["answer"] for item in qa]
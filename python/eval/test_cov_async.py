@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import email.utils
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cov import placeholder_id
+from cov_async import LemurClient, LemurError, parse_retry_after, run_cov_many
+
+
+class StubLemur:
+    """Local stand-in for the LeMUR and transcript endpoints."""
+
+    def __init__(self, delay=0.05, rate_limited_requests=0):
+        self.delay = delay
+        self.rate_limited_requests = rate_limited_requests
+        self.retry_after = "0.05"
+        self.requests = []
+        self.request_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self, body):
+                with stub.lock:
+                    stub.requests.append((self.command, self.path, body))
+                    stub.request_times.append(time.monotonic())
+                    if stub.rate_limited_requests > 0:
+                        stub.rate_limited_requests -= 1
+                        return self._reply(429, {"error": "slow down"}, {"Retry-After": stub.retry_after})
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                finally:
+                    # Stop counting before replying: once the client has the response it may
+                    # legitimately send its next request before this handler thread resumes
+                    with stub.lock:
+                        stub.in_flight -= 1
+                if self.path.startswith("/v2/transcript/"):
+                    transcript_id = self.path.rsplit("/", 1)[1]
+                    status = "error" if transcript_id == "broken" else "completed"
+                    return self._reply(200, {"id": transcript_id, "status": status, "text": "Hello there."})
+                if self.path == "/lemur/v3/generate/summary":
+                    return self._reply(200, {"response": f"Summary of {body['transcript_ids'][0]}. It is short."})
+                if self.path == "/lemur/v3/generate/task":
+                    if "Please generate a new summary" in body["prompt"]:
+                        return self._reply(200, {"response": f"Second shot for {body['transcript_ids'][0]}."})
+                    return self._reply(200, {"response": f"Task for {body['transcript_ids'][0]}."})
+                return self._reply(404, {"error": "not found"})
+
+            def do_GET(self):
+                self._handle(None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._handle(json.loads(self.rfile.read(length)))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        # Timed-out clients hang up mid-response; that is expected here
+        self.server.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubLemur()
+    yield server
+    server.close()
+
+
+def split_sentences(text):
+    return [sentence.strip() + "." for sentence in text.split(".") if sentence.strip()]
+
+
+def test_runs_many_transcripts_with_bounded_concurrency(stub):
+    client = LemurClient("key", base_url=stub.url, max_concurrency=3, timeout=5)
+    ids = [f"t{i}" for i in range(6)] + ["broken"]
+    results = asyncio.run(run_cov_many(client, ids, split_sentences=split_sentences))
+
+    assert [result["transcript_id"] for result in results] == ids
+    for result in results[:-1]:
+        assert result["second_shot"] == f"Second shot for {result['transcript_id']}."
+        assert result["transcript"]["status"] == "completed"
+    assert "not completed" in results[-1]["error"]
+    assert stub.max_in_flight <= 3
+    # Question generation goes to the placeholder transcript, as in cov.py
+    question_calls = [body for _, _, body in stub.requests if body and "identify a series of questions" in body.get("prompt", "")]
+    assert len(question_calls) == len(ids)
+    assert all(body["transcript_ids"] == [placeholder_id] for body in question_calls)
+
+
+def test_retries_after_rate_limit(stub):
+    stub.rate_limited_requests = 2
+    client = LemurClient("key", base_url=stub.url, timeout=5, backoff=0.01)
+    assert asyncio.run(client.summarize(["t1"])) == "Summary of t1. It is short."
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.rate_limited_requests = 10
+    client = LemurClient("key", base_url=stub.url, timeout=5, max_retries=1, backoff=0.01)
+    with pytest.raises(LemurError) as error:
+        asyncio.run(client.summarize(["t1"]))
+    assert error.value.status == 429
+
+
+def test_per_request_timeout_is_retried_then_raised(stub):
+    stub.delay = 0.5
+    client = LemurClient("key", base_url=stub.url, timeout=0.1, max_retries=1, backoff=0.01)
+    with pytest.raises(LemurError):
+        asyncio.run(client.get_transcript("t1"))
+    assert len(stub.requests) == 2
+
+
+def test_cancelled_request_keeps_its_slot_until_the_thread_stops(stub):
+    stub.delay = 0.3
+    client = LemurClient("key", base_url=stub.url, max_concurrency=1, timeout=5)
+
+    async def cancel_then_send():
+        first = asyncio.create_task(client.summarize(["t1"]))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await client.summarize(["t2"])
+
+    assert asyncio.run(cancel_then_send()) == "Summary of t2. It is short."
+    # The second request only went out once the abandoned one had finished on the server
+    assert stub.max_in_flight == 1
+
+
+def test_queued_requests_wait_out_a_rate_limit_pause(stub):
+    stub.delay = 0.0
+    stub.rate_limited_requests = 1
+    stub.retry_after = "0.2"
+    client = LemurClient("key", base_url=stub.url, max_concurrency=1, timeout=5)
+
+    async def send_four():
+        return await asyncio.gather(*(client.summarize([f"t{i}"]) for i in range(4)))
+
+    assert len(asyncio.run(send_four())) == 4
+    # The first request got the 429; nothing may reach the server inside its pause window
+    assert len(stub.request_times) == 5
+    assert all(sent >= stub.request_times[0] + 0.2 for sent in stub.request_times[1:])
+
+
+def test_retry_after_accepts_http_dates():
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert 50 < parse_retry_after(email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+
+def test_http_date_retry_after_is_retried(stub):
+    stub.rate_limited_requests = 1
+    stub.retry_after = "Wed, 21 Oct 2015 07:28:00 GMT"
+    client = LemurClient("key", base_url=stub.url, timeout=5, backoff=0.01)
+    assert asyncio.run(client.summarize(["t1"])) == "Summary of t1. It is short."
+    assert len(stub.requests) == 2
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from chunking import ChunkTexts, iter_sliding_window, sliding_window
+from embedding_cache import TranscriptEmbeddingCache, encode_in_batches, load_transcript_embeddings
+
+PARAGRAPHS = ["First sentence. Second sentence.", "Third sentence. Fourth sentence."]
+SENTENCES = ["First sentence.", "Second sentence.", "Third sentence.", "Fourth sentence."]
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.array([[len(text), i, 1.0] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def test_repeat_validation_skips_fetch_and_encoder(tmp_path):
+    cache = TranscriptEmbeddingCache(str(tmp_path))
+    encoder = CountingEncoder()
+    fetches = []
+
+    def fetch_segments():
+        fetches.append(1)
+        return PARAGRAPHS, SENTENCES
+
+    texts, embeddings = load_transcript_embeddings("abc", "model-a", fetch_segments, encoder.encode, cache)
+    assert len(fetches) == 1 and encoder.calls == 3
+    assert texts["chunk"] == ["First sentence. Second sentence. Third sentence.", "Second sentence. Third sentence. Fourth sentence."]
+
+    texts_again, embeddings_again = load_transcript_embeddings("abc", "model-a", fetch_segments, encoder.encode, cache)
+    assert len(fetches) == 1 and encoder.calls == 3
+    assert texts_again == texts
+    for granularity in embeddings:
+        assert isinstance(embeddings_again[granularity], np.memmap)
+        assert embeddings_again[granularity].dtype == np.float32
+        assert np.array_equal(embeddings_again[granularity], embeddings[granularity])
+
+    # A different model or window size is a different key
+    load_transcript_embeddings("abc", "model-b", fetch_segments, encoder.encode, cache)
+    assert len(fetches) == 1 and encoder.calls == 6
+    load_transcript_embeddings("abc", "model-a", fetch_segments, encoder.encode, cache, window_size=2)
+    assert encoder.calls == 7
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = TranscriptEmbeddingCache(str(tmp_path), max_bytes=10_000)
+    block = np.ones((10, 100), dtype=np.float32)  # ~4KB per entry
+    cache.put_embeddings("t1", "m", "sentence", block)
+    cache.put_embeddings("t2", "m", "sentence", block)
+    old = os.path.getmtime(cache._embeddings_path("t1", "m", "sentence", 1)) - 100
+    os.utime(cache._embeddings_path("t2", "m", "sentence", 1), (old, old))
+    cache.put_embeddings("t3", "m", "sentence", block)
+
+    assert cache.get_embeddings("t2", "m", "sentence") is None
+    assert cache.get_embeddings("t1", "m", "sentence") is not None
+    assert cache.get_embeddings("t3", "m", "sentence") is not None
+    assert cache.size_bytes() <= 10_000
+
+
+def test_cache_can_be_bypassed():
+    encoder = CountingEncoder()
+    _, embeddings = load_transcript_embeddings("abc", "m", lambda: (PARAGRAPHS, SENTENCES), encoder.encode, cache=False)
+    assert encoder.calls == 3
+    assert not isinstance(embeddings["sentence"], np.memmap)
+
+
+def test_pooled_chunk_mode_skips_chunk_encoding(tmp_path):
+    encoder = CountingEncoder()
+    texts, embeddings = load_transcript_embeddings(
+        "abc", "m", lambda: (PARAGRAPHS, SENTENCES), encoder.encode, TranscriptEmbeddingCache(str(tmp_path)),
+        chunk_mode="pooled",
+    )
+    assert encoder.calls == 2
+    assert len(texts["chunk"]) == len(embeddings["chunk"]) == 2
+
+
+def test_long_transcripts_are_encoded_in_bounded_batches(tmp_path):
+    sentences = [f"Sentence number {i}." for i in range(42)]
+    chunks = ChunkTexts(sentences)
+    assert chunks == sliding_window(sentences) and list(iter_sliding_window(sentences, 4, 2)) == sliding_window(sentences, 4, 2)
+    assert chunks[-1] == " ".join(sentences[-3:]) and chunks[1:3] == sliding_window(sentences)[1:3]
+
+    batches = []
+
+    def encode(texts):
+        batches.append(len(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    expected = encode(list(chunks))
+    batches.clear()
+    # A generator works too, as long as the length is given
+    assert np.array_equal(encode_in_batches(iter(chunks), encode, n=len(chunks), batch_size=16), expected)
+    assert batches == [16, 16, 8]
+
+    batches.clear()
+    texts, embeddings = load_transcript_embeddings(
+        "long", "m", lambda: ([" ".join(sentences)], sentences), encode, TranscriptEmbeddingCache(str(tmp_path)), batch_size=8
+    )
+    assert max(batches) == 8 and isinstance(texts["chunk"], ChunkTexts)
+    assert isinstance(embeddings["chunk"], np.memmap) and np.array_equal(embeddings["chunk"], expected)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
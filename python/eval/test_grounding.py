@@ -0,0 +1,267 @@
+import os
+import sys
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from grounding import NO_REFERENCE, citations, normalize_rows, top_k, score_granularities, passes_thresholds
+
+THRESHOLDS = {"sentence": 0.80, "paragraph": 0.73, "chunk": 0.78}
+
+
+def legacy_compare(embedding, embeddings_list, k):
+    similarities = cosine_similarity([embedding], embeddings_list)[0]
+    top_k_indices = similarities.argsort()[-k:][::-1]
+    return top_k_indices, similarities[top_k_indices]
+
+
+def test_top_k_matches_argsort():
+    rng = np.random.default_rng(1)
+    similarities = rng.random((5, 50))
+    indices, scores = top_k(similarities, 3)
+    for row, expected in enumerate(similarities):
+        assert list(indices[row]) == list(expected.argsort()[-3:][::-1])
+        assert np.allclose(scores[row], np.sort(expected)[-3:][::-1])
+
+
+def test_top_k_with_fewer_items_than_k():
+    indices, scores = top_k(np.array([[0.2, 0.9]]), 3)
+    assert indices.tolist() == [[1, 0]]
+    assert np.allclose(scores, [[0.9, 0.2]])
+
+
+def test_batched_decisions_match_per_sentence_loop():
+    rng = np.random.default_rng(2)
+    transcript = {
+        "sentence": rng.standard_normal((120, 32)),
+        "paragraph": rng.standard_normal((15, 32)),
+        "chunk": rng.standard_normal((118, 32)),
+    }
+    grounded = transcript["sentence"][:10] + 0.05 * rng.standard_normal((10, 32))
+    summary = np.vstack([grounded, rng.standard_normal((10, 32))])
+
+    scores = score_granularities(summary, transcript, k=3)
+    passed = passes_thresholds(scores, THRESHOLDS)
+
+    for i, embedding in enumerate(summary):
+        expected = False
+        for granularity, embeddings in transcript.items():
+            top_k_indices, similarities = legacy_compare(embedding, embeddings, 3)
+            assert list(scores[granularity][0][i]) == list(top_k_indices)
+            assert np.allclose(scores[granularity][1][i], similarities, atol=1e-5)
+            expected = expected or any(sim >= THRESHOLDS[granularity] for sim in similarities)
+        assert passed[i] == expected
+    assert passed[:10].all() and not passed[10:].any()
+
+
+
+def test_citations_agree_with_passes_thresholds_unless_strict():
+    thresholds = {"sentence": 0.8, "paragraph": 0.7, "chunk": 0.75}
+    # Query 0 sits exactly on the sentence threshold, query 1 below every threshold
+    scores = {
+        "sentence": (np.array([[2], [0]]), np.array([[0.8], [0.5]])),
+        "paragraph": (np.array([[0], [0]]), np.array([[0.6], [0.5]])),
+        "chunk": (np.array([[1], [1]]), np.array([[0.7], [0.5]])),
+    }
+    texts = {"sentence": ["s0", "s1", "s2"], "paragraph": ["p0"], "chunk": ["c0", "c1"]}
+    assert passes_thresholds(scores, thresholds).tolist() == [True, False]
+    kept, dropped = citations(scores, thresholds, texts, strict=False)
+    assert kept == ("s2", 0.8, True)
+    assert dropped[0] == NO_REFERENCE and np.isclose(dropped[1], -0.2) and not dropped[2]
+    assert citations(scores, thresholds, texts)[0] == (NO_REFERENCE, 0.0, False)
+
+def test_normalize_rows_leaves_zero_rows():
+    normalized = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert np.allclose(normalized, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_pooled_chunks_match_explicit_window_means():
+    from chunking import pooled_chunk_embeddings, sliding_window
+
+    rng = np.random.default_rng(3)
+    sentence_embeddings = rng.standard_normal((11, 8)).astype(np.float32)
+    unit = normalize_rows(sentence_embeddings)
+    weights = rng.integers(1, 20, 11).astype(float)
+
+    for window_size, stride in ((3, 1), (4, 2), (5, 3)):
+        starts = range(0, 11 - window_size + 1, stride)
+        assert len(sliding_window([str(i) for i in range(11)], window_size, stride)) == len(starts)
+
+        pooled = pooled_chunk_embeddings(sentence_embeddings, window_size, stride)
+        expected = np.array([unit[s:s + window_size].mean(axis=0) for s in starts])
+        assert np.allclose(pooled, expected, atol=1e-5)
+
+        weighted = pooled_chunk_embeddings(sentence_embeddings, window_size, stride, weights)
+        expected = np.array([np.average(unit[s:s + window_size], axis=0, weights=weights[s:s + window_size]) for s in starts])
+        assert np.allclose(weighted, expected, atol=1e-5)
+
+    assert pooled_chunk_embeddings(sentence_embeddings[:2], 3).shape == (0, 8)
+
+
+def test_ivf_index_recall_and_exact_fallback():
+    from grounding_index import ExactIndex, IVFIndex, build_index
+
+    rng = np.random.default_rng(4)
+    topics = rng.standard_normal((16, 32))
+    embeddings = topics[rng.integers(0, 16, 3000)] + 0.5 * rng.standard_normal((3000, 32))
+    queries = embeddings[:50] + 0.05 * rng.standard_normal((50, 32))
+
+    exact_indices, exact_scores = ExactIndex(embeddings).search(queries, 3)
+    ivf_indices, ivf_scores = IVFIndex(embeddings, n_lists=32, n_probe=8).search(queries, 3)
+    assert np.mean(ivf_indices[:, 0] == exact_indices[:, 0]) >= 0.95
+    assert np.array_equal(exact_indices[:, 0], np.arange(50))
+
+    # A single probed cell with fewer than k members falls back to brute force
+    tiny = IVFIndex(embeddings[:40], n_lists=20, n_probe=1)
+    indices, scores = tiny.search(queries[:5], 3)
+    assert (indices >= 0).all() and np.isfinite(scores).all()
+
+    assert build_index(embeddings[:100], "auto").backend == "exact"
+    assert build_index(embeddings, "auto").backend == "ivf"
+
+
+def test_lexical_index_prefilters_and_falls_back():
+    from grounding_index import ExactIndex, build_index
+    from lexical_index import LexicalIndex
+
+    rng = np.random.default_rng(5)
+    vocabulary = [f"word{i}" for i in range(400)]
+    word_vectors = dict(zip(vocabulary, rng.standard_normal((400, 32))))
+    texts = [" ".join(rng.choice(vocabulary, 8)) for _ in range(2000)]
+    embed = lambda text: np.sum([word_vectors[word] for word in text.split() if word in word_vectors], axis=0)
+    embeddings = np.array([embed(text) for text in texts])
+    # Claims that repeat most of a transcript sentence, and one with no word in common with it
+    query_texts = [" ".join(text.split()[:6]) for text in texts[:20]] + ["unrelated paraphrase"]
+    queries = np.array([embed(text) for text in query_texts[:20]] + [embeddings[20]])
+
+    exact_indices, exact_scores = ExactIndex(embeddings).search(queries, 3)
+    index = LexicalIndex(texts, embeddings, n_candidates=32)
+    indices, scores = index.search(queries, 3, query_texts=query_texts)
+    assert np.array_equal(indices[:, 0], exact_indices[:, 0])
+    assert np.allclose(scores[:, 0], exact_scores[:, 0], atol=1e-5)
+    # Only the query without lexical overlap needed the full scan
+    assert index.full_scans == 1 and indices[20, 0] == 20
+
+    # Without the query texts it is a plain exact search
+    indices, scores = index.search(queries, 3)
+    assert np.array_equal(indices, exact_indices) and index.full_scans == 22
+
+    hybrid_indices, hybrid_scores = LexicalIndex(texts, embeddings, hybrid_weight=0.5).search(queries[:20], 3, query_texts[:20])
+    assert np.array_equal(hybrid_indices[:, 0], np.arange(20)) and (hybrid_scores <= 1 + 1e-6).all()
+    assert build_index(embeddings, "lexical", texts=texts).backend == "lexical"
+
+
+def test_fused_index_matches_separate_granularities():
+    from grounding import FusedIndex
+
+    rng = np.random.default_rng(7)
+    transcript = {
+        "sentence": rng.standard_normal((40, 16)),
+        "paragraph": rng.standard_normal((2, 16)),
+        "chunk": np.empty((0, 16)),
+    }
+    queries = rng.standard_normal((6, 16))
+    index = FusedIndex(transcript)
+    assert index.offsets.tolist() == [0, 40, 42, 42]
+    assert index.matrix.flags["C_CONTIGUOUS"]
+
+    scores = index.search(queries, 3)
+    for granularity in ("sentence", "paragraph"):
+        expected_indices, expected_scores = top_k(normalize_rows(queries) @ normalize_rows(transcript[granularity]).T, 3)
+        assert np.array_equal(scores[granularity][0], expected_indices)
+        assert np.allclose(scores[granularity][1], expected_scores)
+    assert scores["chunk"][0].shape == (6, 0)
+    assert passes_thresholds(scores, {**THRESHOLDS, "sentence": -1.0}).all()
+
+
+def test_compact_index_close_to_float32():
+    from grounding import FusedIndex
+    from quantization import CompactFusedIndex, decision_flips, quantize
+
+    rng = np.random.default_rng(11)
+    transcript = {
+        "sentence": rng.standard_normal((300, 64)),
+        "paragraph": rng.standard_normal((20, 64)),
+        "chunk": rng.standard_normal((298, 64)),
+    }
+    queries = transcript["sentence"][:30] + 0.3 * rng.standard_normal((30, 64))
+    reference = FusedIndex(transcript).search(queries, 3)
+    for dtype, tolerance in (("float16", 1e-3), ("int8", 2e-2)):
+        index = CompactFusedIndex(transcript, dtype)
+        assert index.matrix.dtype == np.dtype(dtype)
+        scores = index.search(queries, 3)
+        assert np.array_equal(scores["sentence"][0][:, 0], reference["sentence"][0][:, 0])
+        for granularity in ("sentence", "paragraph", "chunk"):
+            assert np.allclose(scores[granularity][1], reference[granularity][1], atol=tolerance)
+
+    compact = quantize(transcript["sentence"], "int8")
+    assert compact.nbytes < normalize_rows(transcript["sentence"]).nbytes / 3
+
+    report = decision_flips(queries, transcript, THRESHOLDS)
+    assert report["queries"] == 30
+    assert report["int8"]["bytes"] < report["float16"]["bytes"] < report["float32_bytes"]
+    assert report["float16"]["max_abs_score_error"] < 1e-3
+
+
+def test_index_construction_peaks_near_the_index_size(tmp_path):
+    import tracemalloc
+
+    from grounding import FusedIndex
+    from quantization import CompactFusedIndex
+
+    rng = np.random.default_rng(13)
+    transcript = {}
+    for granularity, rows in (("sentence", 20000), ("paragraph", 2000), ("chunk", 19998)):
+        path = str(tmp_path / f"{granularity}.npy")
+        np.save(path, rng.standard_normal((rows, 64)).astype(np.float32))
+        transcript[granularity] = np.load(path, mmap_mode="r")
+    # float32 rows, or int8 rows plus one float32 scale each
+    builds = ((lambda: FusedIndex(transcript), 42000 * 64 * 4), (lambda: CompactFusedIndex(transcript, "int8"), 42000 * (64 + 4)))
+    for build, index_bytes in builds:
+        tracemalloc.start()
+        try:
+            build()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # The index itself plus a few normalized blocks, never a second full copy
+        assert peak < index_bytes + 4 * 4096 * 64 * 4
+    assert np.allclose(FusedIndex(transcript).matrix[:20000], normalize_rows(transcript["sentence"]))
+
+
+def test_short_transcripts_with_no_chunks(monkeypatch):
+    import model_registry
+    import summary_embeddings_citations
+    from action_items_embeddings_citations import validate_action_items
+    from embedding_cache import encode_segments
+    from grounding import FusedIndex
+    from grounding_index import build_index, search_granularities
+    from qa_embeddings_citations import process_lemur_qa_batch
+    from quantization import CompactFusedIndex
+    from summary_embeddings_citations import filter_summary_sentences_local
+    from test_bulk_validate import BagOfWordsEncoder
+
+    class ShapedEncoder(BagOfWordsEncoder):
+        # SentenceTransformer.encode([]) returns shape (0,), not (0, dim)
+        def encode(self, texts):
+            return np.zeros((0,), dtype=np.float32) if len(texts) == 0 else super().encode(texts)
+
+    encoder = ShapedEncoder()
+    monkeypatch.setitem(model_registry._models, "shaped", encoder)
+    monkeypatch.setattr(summary_embeddings_citations, "sent_tokenize", lambda text: [text])
+    for sentences in (["Smoke drifted into New York."], ["Smoke drifted into New York.", "Officials told residents to stay indoors."]):
+        texts, embeddings = encode_segments([" ".join(sentences)], sentences, encoder.encode)
+        assert embeddings["chunk"].shape == (0, 0) and len(texts["chunk"]) == 0
+        index = FusedIndex(embeddings)
+        assert index.matrix.shape == (len(sentences) + 1, 64)
+        assert CompactFusedIndex(embeddings).search(encoder.encode(sentences[:1]), 3)["chunk"][0].shape == (1, 0)
+        indexes = {granularity: build_index(matrix, "exact") for granularity, matrix in embeddings.items()}
+        assert search_granularities(encoder.encode(sentences[:1]), indexes, 3)["sentence"][1][0, 0] > 0.99
+
+        _, filtered = filter_summary_sentences_local(sentences[0], index, "shaped")
+        assert filtered == []
+        qa = process_lemur_qa_batch([(texts, index, [{"question": "Where?", "answer": sentences[0]}])], 3, "shaped")[0]
+        assert qa[0]["grounding_threshold_passed"]
+        assert validate_action_items([sentences[-1]], texts, index, "shaped")["action_items"][0]["grounding_threshold_passed"]
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from harness import load_testset, matches_label, parse_qa_list, parse_string_list, precision_recall, regressions
+
+
+def test_parsers_tolerate_unescaped_apostrophes():
+    assert parse_string_list("['They discussed GitLab's product.', 'Another one.']") == ["They discussed GitLab's product.", "Another one."]
+    assert parse_string_list(None) == []
+    assert parse_qa_list("[{'question': 'Who's there?', 'answer': 'GitLab's team.'}]") == [{"question": "Who's there?", "answer": "GitLab's team."}]
+
+
+def test_parse_string_list_keeps_unquoted_labels_whole():
+    assert parse_string_list("[Drones allow police to act remotely.]") == ["Drones allow police to act remotely."]
+    assert parse_string_list("[Conversions are limited, cities adapt., San Francisco cuts offices.]") == [
+        "Conversions are limited, cities adapt.", "San Francisco cuts offices."
+    ]
+    assert parse_string_list("Although there are benefits, it is worse in the office.") == ["Although there are benefits, it is worse in the office."]
+
+
+def test_load_testset_parses_every_record():
+    records = load_testset()
+    assert len(records) == 25
+    assert all(record["summary_hallucinated_label"] for record in records)
+    assert all(record["qa_success"] and record["qa_hallucinated_label"] for record in records)
+
+
+def test_matches_label_is_fuzzy_but_not_loose():
+    labels = ["They suggested checking Grafana charts, reviewing recent migration job logs, escalating to developers to fix any issues."]
+    assert matches_label("They suggested checking Grafana charts, reviewing recent migration job logs, and escalating to developers to fix any issues.", labels)
+    assert not matches_label("The group agreed recurring sessions would be valuable.", labels)
+
+
+def test_precision_recall_and_regression_gate():
+    assert precision_recall({"tp": 3, "fp": 1, "fn": 3}) == (0.75, 0.5)
+    baseline = {"accuracy": {t: {"precision": 0.8, "recall": 0.6} for t in ("summary", "qa", "action_items")},
+                "performance": {"sentences_per_sec": 100.0}}
+    same = {"accuracy": {t: dict(v) for t, v in baseline["accuracy"].items()}, "performance": {"sentences_per_sec": 90.0}}
+    assert regressions(same, baseline) == []
+    same["accuracy"]["qa"]["recall"] = 0.5
+    same["performance"]["sentences_per_sec"] = 50.0
+    assert len(regressions(same, baseline)) == 2
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+import summary_embeddings_citations
+from incremental_validation import IncrementalSummaryValidator
+from summary_embeddings_citations import filter_summary_sentences_local
+from test_qa_batch import DIM, LookupEncoder, make_transcript
+
+
+def split_sentences(text):
+    return [sentence.strip() + "." for sentence in text.split(".") if sentence.strip()]
+
+
+def test_second_shot_only_scores_new_sentences(monkeypatch):
+    rng = np.random.default_rng(8)
+    texts, embeddings = make_transcript(rng, "t")
+    claims = [f"Claim number {i} is here." for i in range(6)]
+    vectors = {}
+    for i, claim in enumerate(claims):
+        # Even claims restate a transcript sentence, odd ones are unsupported
+        vectors[claim] = embeddings["sentence"][i] + 0.01 * rng.standard_normal(DIM) if i % 2 == 0 else rng.standard_normal(DIM)
+    encoder = LookupEncoder(vectors)
+    monkeypatch.setitem(model_registry._models, "incremental", encoder)
+    model_registry.get_encoder("incremental").clear()
+
+    zero_shot = " ".join(claims[:4])
+    # Keeps claims 0, 1 and 3, replaces claim 2 with claim 4 and appends claim 5
+    second_shot = " ".join([claims[0], claims[1], claims[4], claims[3], claims[5]])
+    validator = IncrementalSummaryValidator("incremental", texts, embeddings, tokenize=split_sentences)
+    first = validator.validate(zero_shot)
+    encoder.calls.clear()
+    second = validator.validate(second_shot)
+
+    assert encoder.calls == [[claims[4], claims[5]]]
+    assert second["stats"] == {"sentences": 5, "changed": 2, "scored": 2, "reused": 3}
+    assert [verdict["changed"] for verdict in second["verdicts"]] == [False, False, True, False, True]
+    assert first["filtered"] == [claims[1], claims[3]]
+    assert second["filtered"] == [claims[1], claims[3], claims[5]]
+    assert second["verdicts"][0]["citation"]["reference"] == texts["sentence"][0]
+
+    # Same verdicts as validating the second shot from scratch
+    fresh = IncrementalSummaryValidator("incremental", texts, embeddings, tokenize=split_sentences).validate(second_shot)
+    assert [{**verdict, "changed": False} for verdict in second["verdicts"]] == [{**verdict, "changed": False} for verdict in fresh["verdicts"]]
+    monkeypatch.setattr(summary_embeddings_citations, "sent_tokenize", split_sentences)
+    for version, result in ((zero_shot, first), (second_shot, second)):
+        assert filter_summary_sentences_local(version, embeddings, "incremental") == (result["summary"], result["filtered"])
+
+    # Restoring a sentence from an earlier version reuses its verdict
+    encoder.calls.clear()
+    third = validator.validate(zero_shot)
+    assert encoder.calls == [] and third["stats"]["scored"] == 0 and third["filtered"] == first["filtered"]
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import metrics
+import model_registry
+from qa_embeddings_citations import process_lemur_qa_batch
+
+
+def _by_name(entries, name):
+    return [entry for entry in entries if entry["name"] == name]
+
+
+def test_disabled_collects_nothing_and_stays_cheap(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    metrics.reset()
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with metrics.span("encode"):
+            pass
+        metrics.incr("items_encoded")
+    elapsed = time.perf_counter() - start
+    assert metrics.snapshot() == {"spans": [], "counters": [], "observations": []}
+    # A few hundred nanoseconds per span + counter; generous bound for slow CI machines
+    assert elapsed < 1.0
+
+
+def test_spans_counters_and_prometheus_export(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset()
+    for _ in range(3):
+        with metrics.span("similarity", backend="fused"):
+            time.sleep(0.001)
+    metrics.incr("embedding_cache_hits", granularity="sentence")
+    metrics.incr("embedding_cache_hits", 2, granularity="sentence")
+    metrics.observe("encode_batch_size", 8)
+    metrics.observe("encode_batch_size", 2)
+
+    data = metrics.snapshot()
+    (span,) = data["spans"]
+    assert span["count"] == 3 and span["labels"] == {"backend": "fused"} and span["total_s"] >= 0.003
+    assert data["counters"] == [{"name": "embedding_cache_hits", "labels": {"granularity": "sentence"}, "value": 3}]
+    assert data["observations"][0]["mean"] == 5 and data["observations"][0]["max"] == 8
+
+    text = metrics.to_prometheus()
+    assert "# TYPE llm_validation_similarity_seconds summary" in text
+    assert 'llm_validation_similarity_seconds_count{backend="fused"} 3' in text
+    assert 'llm_validation_embedding_cache_hits_total{granularity="sentence"} 3' in text
+    assert "llm_validation_encode_batch_size_sum 10" in text
+    metrics.reset()
+
+
+def test_validators_report_stages(monkeypatch):
+    rng = np.random.default_rng(0)
+
+    class RandomEncoder:
+        def encode(self, texts):
+            return rng.standard_normal((len(texts), 8)).astype(np.float32)
+
+    monkeypatch.setattr(metrics, "_enabled", True)
+    monkeypatch.setitem(model_registry._models, "random-metrics", RandomEncoder())
+    metrics.reset()
+    texts = {"sentence": ["a.", "b."], "paragraph": ["a. b."], "chunk": ["a. b."]}
+    embeddings = {granularity: rng.standard_normal((len(items), 8)) for granularity, items in texts.items()}
+    qa = [{"question": "q?", "answer": "first"}, {"question": "q?", "answer": "second"}, {"question": "q?", "answer": "first"}]
+    process_lemur_qa_batch([(texts, embeddings, qa)], model_name="random-metrics")
+
+    data = metrics.snapshot()
+    assert _by_name(data["spans"], "validate")[0]["labels"] == {"output": "qa"}
+    assert _by_name(data["spans"], "similarity")[0]["count"] == 1
+    counters = {(entry["name"], tuple(entry["labels"].items())): entry["value"] for entry in data["counters"]}
+    assert counters[("items_validated", (("output", "qa"),))] == 3
+    # The repeated answer is served by the sentence memo
+    assert counters[("items_encoded", (("model", "random-metrics"),))] == 2
+    assert counters[("sentence_memo_hits", (("model", "random-metrics"),))] == 1
+    metrics.reset()
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+import types
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+
+
+def test_each_model_loads_once_across_threads(monkeypatch):
+    loads = []
+
+    class SlowSentenceTransformer:
+        def __init__(self, model_name):
+            loads.append(model_name)
+            time.sleep(0.05)
+            self.model_name = model_name
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=SlowSentenceTransformer))
+    monkeypatch.setattr(model_registry, "_models", {})
+    monkeypatch.setattr(model_registry, "_model_locks", {})
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(model_registry.get_model("model-a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["model-a"]
+    assert all(model is results[0] for model in results)
+    assert model_registry.get_model("model-b").model_name == "model-b"
+    assert loads == ["model-a", "model-b"]
+
+
+def test_sentence_memo_only_encodes_unseen_text(tmp_path):
+    import numpy as np
+    from sentence_memo import SentenceEmbeddingMemo
+
+    class CountingEncoder:
+        def __init__(self):
+            self.encoded = []
+
+        def encode(self, sentences):
+            self.encoded.extend(sentences)
+            return np.array([[len(sentence), sentence.count("a")] for sentence in sentences], dtype=np.float32)
+
+    encoder = CountingEncoder()
+    memo = SentenceEmbeddingMemo(encoder, "counting", max_entries=2, store_path=str(tmp_path / "memo.sqlite"))
+    first = memo.encode(["Awesome.", "Thanks all for joining", "Awesome."])
+    assert encoder.encoded == ["Awesome.", "Thanks all for joining"]
+    assert np.array_equal(first[0], first[2])
+
+    # Whitespace differences hit the same entry
+    again = memo.encode(["  Thanks all   for joining ", "Awesome."])
+    assert encoder.encoded == ["Awesome.", "Thanks all for joining"]
+    assert np.array_equal(again[1], first[0])
+
+    memo.encode(["Bye now"])
+    assert memo.stats()["entries"] == 2
+    # Evicted from the LRU but still on disk; a fresh memo (new process) reads from the store too
+    memo.encode(["Thanks all for joining"])
+    fresh = SentenceEmbeddingMemo(encoder, "counting", store_path=str(tmp_path / "memo.sqlite"))
+    fresh.encode(["Bye now"])
+    assert encoder.encoded == ["Awesome.", "Thanks all for joining", "Bye now"]
+    assert memo.stats()["disk_hits"] == 1 and fresh.stats()["disk_hits"] == 1
+
+    stats = memo.stats()
+    assert (stats["hits"], stats["misses"]) == (4, 3)
+
+    # Another model never sees these vectors
+    SentenceEmbeddingMemo(encoder, "other").encode(["Awesome."])
+    assert encoder.encoded[-1] == "Awesome."
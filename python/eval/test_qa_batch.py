@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+from grounding import normalize_rows
+from qa_embeddings_citations import GRANULARITY_THRESHOLDS, process_lemur_qa, process_lemur_qa_batch
+
+DIM = 16
+
+
+class LookupEncoder:
+    """Deterministic encoder: every distinct text gets its own random vector."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+
+def make_transcript(rng, name, n=30):
+    sentences = [f"{name} sentence {i}." for i in range(n)]
+    paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, n, 5)]
+    chunks = [" ".join(sentences[i:i + 3]) for i in range(n - 2)]
+    texts = {"sentence": sentences, "paragraph": paragraphs, "chunk": chunks}
+    embeddings = {granularity: rng.standard_normal((len(items), DIM)).astype(np.float32) for granularity, items in texts.items()}
+    return texts, embeddings
+
+
+def legacy_citation(answer_embedding, texts, embeddings, k=3):
+    # The original per-answer if/elif margin logic
+    top = {}
+    for granularity in ("sentence", "paragraph", "chunk"):
+        similarities = normalize_rows(embeddings[granularity]) @ normalize_rows(answer_embedding)[0]
+        indices = similarities.argsort()[-k:][::-1]
+        top[granularity] = (indices, similarities[indices])
+    margins = {granularity: top[granularity][1][0] - GRANULARITY_THRESHOLDS[granularity] for granularity in top}
+    max_margin = max(margins.values())
+    for granularity in ("sentence", "paragraph", "chunk"):
+        if max_margin == margins[granularity] and margins[granularity] > 0:
+            return texts[granularity][top[granularity][0][0]], True
+    return "No reference met the threshold.", False
+
+
+def test_batch_matches_single_job_and_legacy_logic(monkeypatch):
+    rng = np.random.default_rng(5)
+    transcript_a = make_transcript(rng, "a")
+    transcript_b = make_transcript(rng, "b")
+    qa_a = [{"question": f"qa {i}?", "answer": f"a answer {i}"} for i in range(6)]
+    qa_b = [{"question": f"qb {i}?", "answer": f"b answer {i}"} for i in range(4)]
+
+    vectors = {}
+    for i, item in enumerate(qa_a):
+        # Half the answers paraphrase a transcript sentence, half are unrelated
+        base = transcript_a[1]["sentence"][i] if i % 2 == 0 else rng.standard_normal(DIM)
+        vectors[item["answer"]] = base + 0.05 * rng.standard_normal(DIM)
+    for item in qa_b:
+        vectors[item["answer"]] = rng.standard_normal(DIM)
+    encoder = LookupEncoder(vectors)
+    monkeypatch.setitem(model_registry._models, "lookup", encoder)
+
+    batch = process_lemur_qa_batch([(*transcript_a, qa_a), (*transcript_b, qa_b), (*transcript_b, [])], model_name="lookup")
+    assert len(encoder.calls) == 1 and len(encoder.calls[0]) == 10
+    assert batch[2] == []
+
+    for (texts, embeddings), qa, results in ((transcript_a, qa_a, batch[0]), (transcript_b, qa_b, batch[1])):
+        for item, result in zip(qa, results):
+            reference, passed = legacy_citation(vectors[item["answer"]], texts, embeddings)
+            assert result["question"] == item["question"]
+            assert result["citation"]["reference"] == reference
+            assert result["grounding_threshold_passed"] == passed
+
+    assert [result["grounding_threshold_passed"] for result in batch[0]] == [True, False] * 3
+    texts, embeddings = transcript_a
+    single = process_lemur_qa(qa_a, embeddings["sentence"], embeddings["paragraph"], embeddings["chunk"], model_name="lookup",
+                              sentences=texts["sentence"], paragraphs=texts["paragraph"], sentence_chunks=texts["chunk"])
+    assert single == batch[0]
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from streaming_filter import IncrementalSentenceSplitter, StreamingGroundingFilter
+
+THRESHOLDS = {"sentence": 0.80, "paragraph": 0.73, "chunk": 0.78}
+
+
+def simple_tokenize(text):
+    # Stand-in for punkt: split after ., ! or ? followed by whitespace
+    return [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+", text.strip()) if sentence.strip()]
+
+
+class LookupEncoder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts):
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+
+def pieces(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_splitter_releases_sentences_only_once_complete():
+    splitter = IncrementalSentenceSplitter(simple_tokenize)
+    assert splitter.feed("Smoke is trav") == []
+    assert splitter.feed("elling south. The air") == ["Smoke is travelling south."]
+    assert splitter.feed(" is bad. ") == []
+    assert splitter.feed("Stay") == ["The air is bad."]
+    assert splitter.flush() == ["Stay"]
+
+
+def test_streaming_verdicts_match_batch_decisions():
+    rng = np.random.default_rng(6)
+    transcript = [f"Transcript sentence {i}." for i in range(20)]
+    texts = {"sentence": transcript, "paragraph": [" ".join(transcript[i:i + 5]) for i in range(0, 20, 5)],
+             "chunk": [" ".join(transcript[i:i + 3]) for i in range(18)]}
+    embeddings = {granularity: rng.standard_normal((len(items), 16)) for granularity, items in texts.items()}
+    summary = ["The smoke spread far.", "Kids should stay inside.", "Aliens started the fire."]
+    vectors = {
+        summary[0]: embeddings["sentence"][3] + 0.01 * rng.standard_normal(16),
+        summary[1]: embeddings["sentence"][11] + 0.01 * rng.standard_normal(16),
+        summary[2]: rng.standard_normal(16),
+    }
+    streaming_filter = StreamingGroundingFilter(LookupEncoder(vectors), texts, embeddings, THRESHOLDS, tokenize=simple_tokenize)
+
+    verdicts = list(streaming_filter.filter(pieces(" ".join(summary))))
+    assert [verdict["sentence"] for verdict in verdicts] == summary
+    assert [verdict["keep"] for verdict in verdicts] == [True, True, False]
+    assert verdicts[0]["citations"]["sentence"]["reference"] == "Transcript sentence 3."
+
+    async def stream():
+        for piece in pieces(" ".join(summary)):
+            yield piece
+
+    async def collect():
+        return [verdict async for verdict in streaming_filter.afilter(stream())]
+
+    assert [verdict["keep"] for verdict in asyncio.run(collect())] == [True, True, False]
+
+
+class SlowEncoder(LookupEncoder):
+    def encode(self, texts):
+        time.sleep(0.1)
+        return super().encode(texts)
+
+
+def test_afilter_does_not_block_the_event_loop():
+    rng = np.random.default_rng(7)
+    texts = {"sentence": ["Transcript sentence."], "paragraph": ["Transcript sentence."], "chunk": []}
+    embeddings = {"sentence": rng.standard_normal((1, 16)), "paragraph": rng.standard_normal((1, 16)), "chunk": np.zeros((0, 16))}
+    summary = ["One claim.", "Another claim."]
+    encoder = SlowEncoder({sentence: rng.standard_normal(16) for sentence in summary})
+    streaming_filter = StreamingGroundingFilter(encoder, texts, embeddings, THRESHOLDS, tokenize=simple_tokenize)
+
+    async def stream():
+        yield " ".join(summary)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        verdicts = [verdict async for verdict in streaming_filter.afilter(stream())]
+        task.cancel()
+        return verdicts, ticks
+
+    verdicts, ticks = asyncio.run(run())
+    assert [verdict["sentence"] for verdict in verdicts] == summary
+    # Two 0.1 s encodes: a blocked loop would not tick at all while they run
+    assert ticks >= 10
@@ -2,7 +2,7 @@ import pytest
 import sys
 import assemblyai as aai
 import os
-sys.path.append('/Users/sam_flamini/devPortfolio/llm-validation/python/')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 from summary_embeddings_citations import filter_summary_sentences
 
 aai.settings.api_key = os.environ.get("assemblyai_key")
@@ -12,6 +12,7 @@ aai.settings.api_key = os.environ.get("assemblyai_key")
 #we need to check our function to see how good we can get it at remaining truthful to source
 #then we need to apply the same methodology to the qa and action items sections
 #qa may need some additional data validation to ensure proper json output
+@pytest.mark.skipif(not os.environ.get("assemblyai_key"), reason="needs live AssemblyAI access; use eval/harness.py offline")
 def test_filter_summary_sentences():
     # Given
     lemur_summary = "Wildfires in Canada are making the air dirty in many places in the US. Smoke from the fires is traveling through the sky and making it hard to breathe in places like New York and Baltimore. The smoke has tiny pieces in it that can get inside your lungs if you breathe them. This can make you sick, especially kids and older adults. The pieces in the smoke are much more than normal and that's why the air is unhealthy. More people could get sick until the weather changes and moves the smoke away. Fires might happen more often in the future because of climate change, so dirty air could affect more places."
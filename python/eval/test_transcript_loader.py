@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from embedding_cache import TranscriptEmbeddingCache
+from transcript_loader import TranscriptLoader
+
+
+class FakeTranscriptAPI:
+    """Local stand-in for GET /v2/transcript/{id}/paragraphs and /sentences."""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                with api.lock:
+                    api.requests.append((self.path, self.headers.get("Authorization")))
+                    api.in_flight += 1
+                    api.max_in_flight = max(api.max_in_flight, api.in_flight)
+                try:
+                    time.sleep(api.delay)
+                    _, _, _, transcript_id, kind = self.path.split("/")
+                    if transcript_id == "missing":
+                        return self._reply(404, {"error": "transcript not found"})
+                    texts = [f"{transcript_id} {kind[:-1]} {i}." for i in range(3)]
+                    return self._reply(200, {"id": transcript_id, kind: [{"text": text, "start": 0, "end": 1} for text in texts]})
+                finally:
+                    with api.lock:
+                        api.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def api():
+    server = FakeTranscriptAPI()
+    yield server
+    server.close()
+
+
+def test_fetches_concurrently_and_reads_back_from_the_segment_cache(api, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    loader = TranscriptLoader("key", base_url=api.url, cache=TranscriptEmbeddingCache(cache_dir), max_workers=8)
+    ids = [f"t{i}" for i in range(4)]
+
+    start = time.perf_counter()
+    segments = loader.load_many(ids + ["t0"])
+    elapsed = time.perf_counter() - start
+
+    assert list(segments) == ids
+    assert segments["t2"] == (["t2 paragraph 0.", "t2 paragraph 1.", "t2 paragraph 2."],
+                              ["t2 sentence 0.", "t2 sentence 1.", "t2 sentence 2."])
+    assert len(api.requests) == 8 and all(auth == "key" for _, auth in api.requests)
+    # 8 requests of 0.1 s each; serially that would be 0.8 s
+    assert api.max_in_flight > 2
+    assert elapsed < 0.6
+
+    # A new loader (a later run) finds everything on disk
+    again = TranscriptLoader("key", base_url=api.url, cache=TranscriptEmbeddingCache(cache_dir))
+    assert again.load("t2") == segments["t2"]
+    assert len(api.requests) == 8
+
+
+def test_errors_are_raised_or_returned_per_transcript(api, tmp_path):
+    cache = TranscriptEmbeddingCache(str(tmp_path / "cache"))
+    loader = TranscriptLoader("key", base_url=api.url, cache=cache, max_retries=0)
+    with pytest.raises(requests.HTTPError):
+        loader.load("missing")
+
+    results = loader.load_many(["t1", "missing"], return_exceptions=True)
+    assert isinstance(results["missing"], requests.HTTPError)
+    assert results["t1"][1][0] == "t1 sentence 0."
+    assert cache.has_segments("t1") and not cache.has_segments("missing")
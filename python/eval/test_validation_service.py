@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import metrics
+import model_registry
+from validation_service import MicroBatcher, ValidationService, make_server
+
+SENTENCES = [
+    "The wildfires in Canada sent smoke across the border.",
+    "Air quality in New York reached unhealthy levels.",
+    "Children and older adults are most at risk.",
+    "The smoke should clear when the wind changes.",
+    "Experts expect more fires as the climate warms.",
+    "Officials advised people to stay indoors.",
+]
+
+
+class WordHashEncoder:
+    """Bag-of-words encoder: texts sharing words get similar vectors. Records every batch."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row] += np.random.default_rng(abs(hash(word)) % 2**32).standard_normal(64)
+        return vectors
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    servers = []
+
+    def start(encoder, **kwargs):
+        monkeypatch.setitem(model_registry._models, "service", encoder)
+        monkeypatch.setitem(model_registry._encoders, "service", None)
+        max_in_flight = kwargs.pop("max_in_flight", 64)
+        server = make_server(ValidationService("service", max_in_flight=max_in_flight), port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        model_registry._encoders["service"].close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_concurrent_requests_share_encoder_batches(serve):
+    encoder = WordHashEncoder()
+    url = serve(encoder, max_wait=0.2, max_batch=1000)
+    job = {"transcript_sentences": SENTENCES}
+    # Index the transcript first, so the concurrent requests below only encode answers
+    assert post(url + "/v1/qa", job)[0] == 200
+    encoder.calls.clear()
+
+    jobs = [{**job, "id": str(i), "qa": [{"question": "Why?", "answer": SENTENCES[i % 6] if i % 2 == 0 else f"Made up claim {i}"}]}
+            for i in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda body: post(url + "/v1/qa", body), jobs))
+    assert all(status == 200 for status, _ in results)
+    for i, (_, result) in enumerate(results):
+        assert result["id"] == str(i)
+        assert result["qa"][0]["grounding_threshold_passed"] == (i % 2 == 0)
+    # Answers repeating a transcript sentence come from the sentence memo; the rest share batches
+    assert len(encoder.calls) < 4
+    assert sorted(text for call in encoder.calls for text in call) == [f"Made up claim {i}" for i in (1, 3, 5, 7)]
+
+    status, result = post(url + "/v1/action_items", {**job, "action_items": [SENTENCES[1], "Buy a boat"]})
+    assert status == 200
+    assert [item["grounding_threshold_passed"] for item in result["action_items"]] == [True, False]
+    assert post(url + "/v1/qa", {"qa": []})[0] == 400
+
+
+def test_rejects_requests_beyond_max_in_flight(serve):
+    url = serve(WordHashEncoder(delay=0.3), max_in_flight=1, max_wait=0.0)
+    job = {"transcript_sentences": SENTENCES, "qa": [{"question": "Why?", "answer": SENTENCES[0]}]}
+    with ThreadPoolExecutor(4) as pool:
+        statuses = sorted(status for status, _ in pool.map(lambda _: post(url + "/v1/qa", job), range(4)))
+    assert statuses[0] == 200 and statuses[-1] == 503
+
+    with urllib.request.urlopen(url + "/health", timeout=5) as response:
+        health = json.loads(response.read())
+    assert health["status"] == "ok" and health["in_flight"] == 0 and health["transcripts_cached"] == 1
+    metrics.enable()
+    try:
+        metrics.incr("service_rejected")
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert "llm_validation_service_rejected_total" in response.read().decode("utf-8")
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+
+def test_microbatches_never_exceed_max_batch():
+    encoder = WordHashEncoder()
+    batcher = MicroBatcher(encoder, max_batch=5, max_wait=0.2)
+    calls = [[f"text {i} {j}" for j in range(size)] for i, size in enumerate([3, 3, 2, 4, 7])]
+    try:
+        with ThreadPoolExecutor(len(calls)) as pool:
+            results = list(pool.map(batcher.encode, calls))
+    finally:
+        batcher.close()
+    batches = list(encoder.calls)
+    # A call that does not fit waits for the next batch; only the 7-text call goes alone over the limit
+    assert all(len(batch) <= 5 or batch == calls[-1] for batch in batches)
+    assert sorted(text for batch in batches for text in batch) == sorted(text for texts in calls for text in texts)
+    for texts, embeddings in zip(calls, results):
+        assert np.allclose(embeddings, encoder.encode(texts))
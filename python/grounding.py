@@ -0,0 +1,219 @@
+import numpy as np
+
+import metrics
+
+# Order matters: when two granularities tie on margin the earlier one wins,
+# which mirrors the if/elif chain the validators have always used.
+GRANULARITIES = ("sentence", "paragraph", "chunk")
+# Rows normalized at a time when filling a stacked matrix
+NORMALIZE_BLOCK_ROWS = 4096
+
+
+def as_rows(embeddings):
+    """
+    embeddings as a 2D array, without copying (a memmap stays a memmap). A single vector becomes
+    one row; an empty 1-D array (what encoders return for no texts) becomes [0, 0].
+    """
+    embeddings = np.asarray(embeddings)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[None, :] if embeddings.size else embeddings.reshape(0, 0)
+    return embeddings
+
+
+def normalize_rows(embeddings):
+    """
+    L2-normalize a 2D array of embeddings so cosine similarity becomes a plain dot product.
+
+    Rows with zero norm are left as zeros (cosine_similarity treats them the same way). A single
+    vector becomes one row; an empty 1-D array (what encoders return for no texts) becomes [0, 0].
+    """
+    embeddings = as_rows(embeddings).astype(np.float32, copy=False)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def normalize_rows_into(embeddings, out, block_rows=NORMALIZE_BLOCK_ROWS):
+    """
+    normalize_rows written into a preallocated float32 array (e.g. one segment of a stacked matrix).
+
+    Works block_rows rows at a time, so a memmapped input is paged in block by block and the only
+    temporary is one normalized block.
+    """
+    embeddings = as_rows(embeddings)
+    for start in range(0, len(embeddings), block_rows):
+        out[start:start + block_rows] = normalize_rows(embeddings[start:start + block_rows])
+    return out
+
+
+def top_k(similarities, k):
+    """
+    Return the top-k column indices and scores for every row of a similarity matrix.
+
+    Uses argpartition so each row costs O(n) instead of a full O(n log n) argsort,
+    then sorts only the k survivors so index 0 is always the best match.
+    """
+    similarities = np.asarray(similarities)
+    n = similarities.shape[1]
+    k = min(k, n)
+    if k == 0:
+        empty = np.empty((similarities.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(similarities.dtype)
+    if k < n:
+        candidates = np.argpartition(similarities, n - k, axis=1)[:, n - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n), similarities.shape).copy()
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class FusedIndex:
+    """
+    All transcript granularities stacked into one contiguous, row-normalized matrix.
+
+    Searching costs a single matmul per query batch; each granularity's top-k is then taken from
+    its own column segment of the result. An offset table maps the stacked rows back to
+    (granularity, local index), so results are identical to scoring each granularity separately.
+    """
+
+    def __init__(self, granularity_embeddings):
+        matrices, dim = self._layout(granularity_embeddings)
+        # Each granularity is normalized block by block straight into its segment, so construction
+        # holds the stacked matrix plus one block rather than a normalized copy and a stacked copy
+        self.matrix = np.empty((self.offsets[-1], dim), dtype=np.float32)
+        for position, matrix in enumerate(matrices):
+            normalize_rows_into(matrix, self.matrix[self.offsets[position]:self.offsets[position + 1]])
+
+    def _layout(self, granularity_embeddings):
+        """
+        Set granularities, offsets and granularity_ids.
+
+        Returns:
+        - (list of arrays, int): each granularity as 2D rows (not copied), and the shared dimension.
+        """
+        self.granularities = list(granularity_embeddings)
+        matrices = [as_rows(embeddings) for embeddings in granularity_embeddings.values()]
+        # Empty granularities (e.g. no chunks in a 2-sentence transcript) may come without a dimension
+        dims = {matrix.shape[1] for matrix in matrices if matrix.size}
+        if len(dims) > 1:
+            raise ValueError(f"FusedIndex needs one embedding dimension, got {sorted(dims)}")
+        sizes = [len(matrix) for matrix in matrices]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        # Row -> granularity id, for callers that need to decode stacked positions
+        self.granularity_ids = np.repeat(np.arange(len(sizes)), sizes)
+        return matrices, dims.pop() if dims else 0
+
+    @classmethod
+    def from_stacked(cls, matrix, offsets, granularities=GRANULARITIES):
+        """
+        Wrap an already stacked, row-normalized matrix (e.g. one living in shared memory) without copying it.
+        """
+        index = cls.__new__(cls)
+        index.granularities = list(granularities)
+        index.matrix = matrix
+        index.offsets = np.asarray(offsets, dtype=np.int64)
+        index.granularity_ids = np.repeat(np.arange(len(index.granularities)), np.diff(index.offsets))
+        return index
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def search(self, query_embeddings, k=3):
+        """
+        Returns:
+        - dict: granularity name -> (top_k_indices, top_k_similarities), indices local to the granularity.
+        """
+        with metrics.span("similarity", backend="fused"):
+            similarities = normalize_rows(query_embeddings) @ self.matrix.T
+            scores = {}
+            for position, granularity in enumerate(self.granularities):
+                start, end = self.offsets[position], self.offsets[position + 1]
+                scores[granularity] = top_k(similarities[:, start:end], k)
+        return scores
+
+
+def score_granularities(query_embeddings, granularity_embeddings, k=3):
+    """
+    Score a batch of query embeddings against every transcript granularity at once.
+
+    Args:
+    - query_embeddings (array, shape [q, d]): embeddings of the generated text (summary sentences, answers...).
+    - granularity_embeddings (dict): granularity name -> array of transcript embeddings, shape [n, d].
+      A prebuilt FusedIndex is accepted too and saves re-stacking the transcript.
+    - k (int): number of nearest transcript items to keep per query.
+
+    Returns:
+    - dict: granularity name -> (top_k_indices, top_k_similarities), each of shape [q, k].
+    """
+    index = granularity_embeddings if isinstance(granularity_embeddings, FusedIndex) else FusedIndex(granularity_embeddings)
+    return index.search(query_embeddings, k)
+
+
+def top_similarities(scores, granularities):
+    """
+    [q, len(granularities)] matrix of each query's best similarity per granularity (-inf when a granularity is empty).
+    """
+    columns = []
+    for granularity in granularities:
+        similarities = scores[granularity][1]
+        if similarities.shape[1] == 0:
+            columns.append(np.full(similarities.shape[0], -np.inf))
+        else:
+            columns.append(similarities[:, 0].astype(np.float64))
+    return np.stack(columns, axis=1)
+
+
+def passes_thresholds(scores, thresholds):
+    """
+    Boolean mask of queries whose best match clears the threshold of at least one granularity.
+
+    Checking the best of the top-k is equivalent to the old any(sim >= threshold for sim in top_k).
+    """
+    granularities = list(scores)
+    threshold_vector = np.array([thresholds[granularity] for granularity in granularities])
+    return (top_similarities(scores, granularities) >= threshold_vector).any(axis=1)
+
+
+NO_REFERENCE = "No reference met the threshold."
+
+
+def best_granularity(scores, thresholds):
+    """
+    Pick, for every query, the granularity whose best match clears its threshold by the widest margin.
+
+    Returns:
+    - (array, array, array): index into GRANULARITIES of the winning granularity, its margin
+      (top similarity minus threshold) and its top similarity. A margin <= 0 means nothing passed.
+    """
+    best = top_similarities(scores, GRANULARITIES)
+    margins = best - np.array([thresholds[granularity] for granularity in GRANULARITIES])
+    # argmax returns the first maximum, so ties resolve sentence > paragraph > chunk
+    winners = np.argmax(margins, axis=1)
+    rows = np.arange(len(winners))
+    return winners, margins[rows, winners], best[rows, winners]
+
+
+def citations(scores, thresholds, texts, strict=True):
+    """
+    Build one citation per query from the winning granularity.
+
+    Returns a list of (reference, similarity_score, grounding_threshold_passed) tuples. When no
+    granularity passes, the reference is NO_REFERENCE and the score is the (negative) best margin,
+    matching what process_lemur_qa has always reported.
+
+    strict=True passes a query only on a positive margin, as process_lemur_qa always has;
+    strict=False also passes a margin of exactly 0, which is the passes_thresholds (>=) rule
+    the summary filter uses.
+    """
+    winners, margins, similarities = best_granularity(scores, thresholds)
+    results = []
+    for row, (winner, margin, similarity) in enumerate(zip(winners, margins, similarities)):
+        if margin > 0 or (not strict and margin == 0):
+            granularity = GRANULARITIES[winner]
+            reference = texts[granularity][scores[granularity][0][row, 0]]
+            results.append((reference, float(similarity), True))
+        else:
+            results.append((NO_REFERENCE, float(margin), False))
+    return results
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+import metrics
+from grounding import FusedIndex, normalize_rows, top_k
+from lexical_index import LexicalIndex
+
+# Below this many transcript items an approximate index is slower than a single matmul
+# and can only lose recall, so "auto" stays exact.
+IVF_MIN_ITEMS = 2000
+
+
+class ExactIndex:
+    """
+    Brute-force cosine index: one matmul against the normalized transcript matrix.
+    """
+
+    backend = "exact"
+
+    def __init__(self, embeddings):
+        self.embeddings = normalize_rows(embeddings)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def search(self, query_embeddings, k=3):
+        queries = normalize_rows(query_embeddings)
+        if not len(self.embeddings):
+            # An empty granularity may have no dimension to multiply against
+            return top_k(np.empty((len(queries), 0), dtype=np.float32), k)
+        return top_k(queries @ self.embeddings.T, k)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over normalized float32 vectors, using only numpy.
+
+    The vectors are clustered with spherical k-means into n_lists cells. A query is scored
+    exactly against the vectors of its n_probe closest cells only, so a search touches
+    roughly n_probe / n_lists of the transcript instead of all of it.
+    """
+
+    backend = "ivf"
+
+    def __init__(self, embeddings, n_lists=None, n_probe=None, n_iter=10, seed=0):
+        self.embeddings = normalize_rows(embeddings)
+        n = len(self.embeddings)
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        self.n_probe = max(1, min(self.n_lists, n_probe or max(4, self.n_lists // 10)))
+        self.centroids, assignments = self._train(n_iter, np.random.default_rng(seed))
+
+        # Store the vectors grouped by cell so every probed list is one contiguous slice
+        order = np.argsort(assignments, kind="stable")
+        self.ids = order
+        self.grouped = self.embeddings[order]
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def _train(self, n_iter, rng, points_per_list=64):
+        # k-means on a sample is plenty to place the cells; every vector is assigned at the end
+        data = self.embeddings
+        sample_size = min(len(data), self.n_lists * points_per_list)
+        sample = data[rng.choice(len(data), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            sums = np.zeros_like(centroids)
+            filled = counts > 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            # Re-seed empty cells with random points so no list is wasted
+            sums[~filled] = sample[rng.choice(sample_size, int((~filled).sum()), replace=False)]
+            centroids = normalize_rows(sums)
+        return centroids, np.argmax(data @ centroids.T, axis=1)
+
+    def search(self, query_embeddings, k=3):
+        queries = normalize_rows(query_embeddings)
+        k = min(k, len(self))
+        probes = top_k(queries @ self.centroids.T, self.n_probe)[0]
+
+        # Work cell by cell: every query probing a cell is scored against it in one matmul,
+        # and only each cell's local top-k survives into the per-query candidate pool.
+        candidate_ids = np.full((len(queries), self.n_probe * k), -1, dtype=np.int64)
+        candidate_scores = np.full((len(queries), self.n_probe * k), -np.inf, dtype=np.float32)
+        for cell in np.unique(probes):
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            rows, slots = np.nonzero(probes == cell)
+            local_indices, local_scores = top_k(queries[rows] @ self.grouped[start:end].T, k)
+            width = local_indices.shape[1]
+            columns = slots[:, None] * k + np.arange(width)
+            candidate_ids[rows[:, None], columns] = self.ids[start + local_indices]
+            candidate_scores[rows[:, None], columns] = local_scores
+
+        best, scores = top_k(candidate_scores, k)
+        indices = np.take_along_axis(candidate_ids, best, axis=1)
+        short = (indices < 0).any(axis=1)
+        if short.any():
+            # Too few vectors in the probed cells; fall back to the full matrix for those queries
+            indices[short], scores[short] = top_k(queries[short] @ self.embeddings.T, k)
+        return indices, scores
+
+
+BACKENDS = {"exact": ExactIndex, "ivf": IVFIndex, "lexical": LexicalIndex}
+
+
+def build_index(embeddings, backend="auto", texts=None, **kwargs):
+    """
+    Build a grounding index over one granularity of transcript embeddings.
+
+    backend is "exact", "ivf", "lexical", or "auto" (IVF only once the transcript is long enough to benefit).
+    "lexical" needs the transcript texts aligned with embeddings (see lexical_index.py).
+    """
+    if backend == "auto":
+        backend = "ivf" if len(embeddings) >= IVF_MIN_ITEMS else "exact"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown index backend {backend!r}, expected one of {sorted(BACKENDS)} or 'auto'")
+    if len(embeddings) == 0:
+        return ExactIndex(np.empty((0, np.asarray(embeddings).shape[-1]), dtype=np.float32))
+    if backend == "exact":
+        return ExactIndex(embeddings)
+    if backend == "lexical":
+        if texts is None:
+            raise ValueError("The lexical backend needs the transcript texts")
+        return LexicalIndex(texts, embeddings, **kwargs)
+    return IVFIndex(embeddings, **kwargs)
+
+
+def search_granularities(query_embeddings, indexes, k=3, query_texts=None):
+    """
+    Query every granularity index; same return shape as grounding.score_granularities.
+
+    query_texts (the generated text behind query_embeddings) is passed to the indexes that prefilter on it.
+    """
+    with metrics.span("similarity", backend="per_granularity"):
+        return {
+            granularity: index.search(query_embeddings, k, query_texts=query_texts)
+            if getattr(index, "uses_text", False) else index.search(query_embeddings, k)
+            for granularity, index in indexes.items()
+        }
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+INDEX_CACHE_SIZE = 32
+
+
+def get_transcript_indexes(key, granularity_embeddings, backend="auto", granularity_texts=None, **kwargs):
+    """
+    Build (or reuse) one index per granularity for a transcript.
+
+    key identifies the transcript embeddings, e.g. (transcript_id, model_name). Indexes are kept
+    in a small in-process LRU so every query against the same transcript reuses them.
+    granularity_texts (granularity -> texts) is required by the "lexical" backend.
+    """
+    return _cached((key, backend), lambda: {
+        granularity: build_index(
+            embeddings, backend, texts=granularity_texts[granularity] if granularity_texts else None, **kwargs
+        )
+        for granularity, embeddings in granularity_embeddings.items()
+    })
+
+
+def get_fused_index(key, granularity_embeddings, embedding_dtype="float32"):
+    """
+    Build (or reuse) the exact FusedIndex of a transcript, sharing the same LRU as get_transcript_indexes.
+
+    embedding_dtype "float16" or "int8" keeps the cached matrix in quantization's compact form.
+    """
+    if embedding_dtype == "float32":
+        return _cached((key, "fused"), lambda: FusedIndex(granularity_embeddings))
+    from quantization import CompactFusedIndex
+    return _cached((key, "fused", embedding_dtype), lambda: CompactFusedIndex(granularity_embeddings, embedding_dtype))
+
+
+def _cached(cache_key, build):
+    with _index_cache_lock:
+        index = _index_cache.get(cache_key)
+        if index is not None:
+            _index_cache.move_to_end(cache_key)
+            return index
+    index = build()
+    with _index_cache_lock:
+        _index_cache[cache_key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,129 @@
+"""
+Incremental re-validation of successive versions of a summary, e.g. a CoV zero-shot summary and
+its second shots.
+
+A second shot usually keeps most of the zero-shot sentences. IncrementalSummaryValidator diffs
+each new version against the previous one at sentence level (difflib). Sentences in unchanged
+runs take the previous version's verdicts as they are. Inserted or replaced sentences are looked
+up among the verdicts of earlier versions (a sentence restored from the zero shot), and only
+those never seen before are encoded and scored. A verdict depends only on the sentence text, the
+transcript index and the thresholds. A reused verdict is therefore exactly what re-scoring would
+have produced.
+"""
+import difflib
+
+import metrics
+from grounding import citations, score_granularities
+from grounding_index import get_fused_index, search_granularities
+from embedding_cache import load_transcript_embeddings
+from model_registry import get_encoder, sent_tokenize
+from summary_embeddings_citations import SUMMARY_THRESHOLDS, split_summary
+from transcript_loader import get_default_loader
+
+
+class IncrementalSummaryValidator:
+    """
+    Validates versions of a summary against one transcript, re-scoring only new sentences.
+
+    Args:
+    - model_name (str): sentence transformer used for the summary sentences (same as the transcript's).
+    - texts (dict): granularity -> list of transcript texts, for the citations.
+    - granularity_index: the transcript in any form filter_summary_sentences_local accepts
+      (dict of embeddings, FusedIndex, or dict of grounding_index indexes).
+    - thresholds (dict): granularity -> similarity threshold.
+    - k (int): nearest transcript items kept per granularity.
+    - tokenize (callable): sentence splitter.
+    """
+
+    def __init__(self, model_name, texts, granularity_index, thresholds=SUMMARY_THRESHOLDS, k=3, tokenize=sent_tokenize):
+        self.model_name = model_name
+        self.texts = texts
+        self.granularity_index = granularity_index
+        self.thresholds = thresholds
+        self.k = k
+        self.tokenize = tokenize
+        # sentence -> verdict, from every version validated so far
+        self.verdicts = {}
+        # verdicts of the previous version, in order
+        self.previous = []
+
+    def _score(self, sentences):
+        embeddings = get_encoder(self.model_name).encode(sentences)
+        index = self.granularity_index
+        if isinstance(index, dict) and any(hasattr(item, "search") for item in index.values()):
+            scores = search_granularities(embeddings, index, self.k, query_texts=sentences)
+        else:
+            scores = score_granularities(embeddings, index, self.k)
+        # The >= rule of filter_summary_sentences_local decides both the verdict and its citation
+        for sentence, (reference, similarity, keep) in zip(sentences, citations(scores, self.thresholds, self.texts, strict=False)):
+            self.verdicts[sentence] = {
+                "sentence": sentence,
+                "keep": keep,
+                "citation": {"reference": reference, "similarity_score": similarity},
+            }
+
+    def validate(self, summary):
+        """
+        Validate the next version of the summary.
+
+        Returns:
+        - dict:
+          - "summary" (str): the kept sentences;
+          - "filtered" (list of str): the dropped sentences;
+          - "verdicts" (list of dict): one {"sentence", "keep", "citation", "changed"} per sentence, in
+            order. "changed" is True for sentences that the diff against the previous version marks
+            as inserted or replaced;
+          - "stats" (dict): sentences, changed, scored (encoded this round) and reused counts.
+        """
+        with metrics.span("validate", output="summary_incremental"):
+            sentences = list(dict.fromkeys(self.tokenize(summary)))
+            matcher = difflib.SequenceMatcher(a=[verdict["sentence"] for verdict in self.previous], b=sentences, autojunk=False)
+            verdicts = [None] * len(sentences)
+            changed = []
+            for tag, previous_start, _, start, end in matcher.get_opcodes():
+                if tag == "equal":
+                    verdicts[start:end] = [{**verdict, "changed": False} for verdict in self.previous[previous_start:previous_start + end - start]]
+                elif tag in ("replace", "insert"):
+                    changed.extend(range(start, end))
+            # A changed sentence may still have a verdict, e.g. one moved or restored from an earlier version
+            to_score = [sentences[position] for position in changed if sentences[position] not in self.verdicts]
+            if to_score:
+                self._score(to_score)
+            for position in changed:
+                verdicts[position] = {**self.verdicts[sentences[position]], "changed": True}
+            self.previous = verdicts
+
+        # Joined exactly like filter_summary_sentences, so either path yields the same summary string
+        new_summary, filtered = split_summary(sentences, [verdict["keep"] for verdict in verdicts])
+        metrics.incr("items_validated", len(to_score), output="summary")
+        metrics.incr("items_filtered", sum(not self.verdicts[sentence]["keep"] for sentence in to_score), output="summary")
+        metrics.incr("incremental_reused", len(sentences) - len(to_score))
+        return {
+            "summary": new_summary,
+            "filtered": filtered,
+            "verdicts": verdicts,
+            "stats": {
+                "sentences": len(sentences),
+                "changed": len(changed),
+                "scored": len(to_score),
+                "reused": len(sentences) - len(to_score),
+            },
+        }
+
+
+def validate_summary_versions(summaries, transcript_id, model_name, k=3, cache=None, thresholds=SUMMARY_THRESHOLDS):
+    """
+    Validate successive versions of a summary of one transcript (zero shot first, then each refinement).
+
+    The transcript is segmented and encoded once (or read from the embedding cache) and every
+    version after the first only encodes its new sentences.
+
+    Returns:
+    - list of dict: one IncrementalSummaryValidator.validate result per version.
+    """
+    texts, granularity_embeddings = load_transcript_embeddings(
+        transcript_id, model_name, lambda: get_default_loader().load(transcript_id), get_encoder(model_name).encode, cache,
+    )
+    index = get_fused_index((transcript_id, model_name, "exact", 3, 1), granularity_embeddings)
+    validator = IncrementalSummaryValidator(model_name, texts, index, thresholds, k)
+    return [validator.validate(summary) for summary in summaries]
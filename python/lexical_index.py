@@ -0,0 +1,209 @@
+"""
+BM25 inverted-index prefilter for grounding search, using only numpy.
+
+A claim such as "Peter DiCarlo, an associate professor at Johns Hopkins University" usually
+shares words with the transcript sentence that supports it. LexicalIndex keeps an inverted index
+(term -> postings of BM25 weights) over the transcript texts of one granularity. For each query it
+takes the n_candidates best lexical matches and runs dense cosine similarity only on those.
+
+The lexical step can miss paraphrases, so a query falls back to a full dense scan when:
+- it has no indexed terms, or less than min_coverage of its terms occur in the transcript;
+- it has fewer than k lexical candidates;
+- the best dense similarity among its candidates is below fallback_below. A supporting item would
+  normally clear that score, so a low best candidate means the lexical step probably missed it.
+
+With hybrid_weight > 0 the returned score is (1 - w) * cosine + w * BM25 / max BM25 of the query.
+That changes the score scale, so thresholds must be calibrated for it. The default of 0 keeps
+plain cosine scores, comparable with the other backends.
+
+A full matmul is hard to beat on short transcripts; eval/bench_lexical_prefilter.py puts the
+break-even around 10-20k items per granularity, so "auto" never picks this backend.
+"""
+import re
+
+import numpy as np
+
+import metrics
+from grounding import normalize_rows, top_k
+
+# Just under the lowest grounding threshold in use (paragraph, 0.73): a candidate set whose best
+# match cannot reach it is rescanned instead of trusted
+LEXICAL_FALLBACK_SIMILARITY = 0.70
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have he her
+him his how i if in into is it its just like me more most my no not of on or our out over she so some than that
+the their them then there these they this to up us was we were what when where which who will with would you your
+yeah um uh okay oh right so really
+""".split())
+
+
+def tokenize(text, ngram=1):
+    """
+    Lowercased word tokens without stopwords; ngram=2 adds adjacent word pairs (from the unfiltered
+    token stream, so "head of state" still yields "head of" and "of state").
+    """
+    words = _TOKEN.findall(text.lower())
+    tokens = [word for word in words if word not in STOPWORDS]
+    if ngram >= 2:
+        tokens += [f"{first} {second}" for first, second in zip(words, words[1:])
+                   if first not in STOPWORDS or second not in STOPWORDS]
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Args:
+    - texts (list of str): transcript items of one granularity, aligned with embeddings.
+    - embeddings (array [n, d]): their dense embeddings.
+    - n_candidates (int): lexical candidates scored densely per query.
+    - hybrid_weight (float): weight of the normalized BM25 score in the returned score (0 = cosine only).
+    - min_coverage (float): fraction of a query's terms that must occur in the transcript to trust the prefilter.
+    - fallback_below (float or None): full scan when the best candidate's cosine is below this; None disables it.
+    - max_df (float): terms found in more than this fraction of the items are not used to pick candidates.
+    - k1, b (float): BM25 parameters.
+    - ngram (int): 1 for words, 2 to index word pairs as well.
+    """
+
+    backend = "lexical"
+    uses_text = True
+
+    def __init__(self, texts, embeddings, n_candidates=64, hybrid_weight=0.0, min_coverage=0.5,
+                 fallback_below=LEXICAL_FALLBACK_SIMILARITY, max_df=0.05, k1=1.2, b=0.75, ngram=1):
+        if len(texts) != len(embeddings):
+            raise ValueError(f"LexicalIndex needs one text per embedding, got {len(texts)} texts and {len(embeddings)} embeddings")
+        self.embeddings = normalize_rows(embeddings)
+        self.n_candidates = n_candidates
+        self.hybrid_weight = hybrid_weight
+        self.min_coverage = min_coverage
+        self.fallback_below = fallback_below
+        self.ngram = ngram
+        self.queries = 0
+        self.full_scans = 0
+
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text, ngram)
+            lengths[doc] = len(tokens)
+            for token in tokens:
+                doc_counts = postings.setdefault(token, {})
+                doc_counts[doc] = doc_counts.get(doc, 0) + 1
+
+        # CSR-style layout: the postings of term t are doc_ids/weights[term_offsets[t]:term_offsets[t + 1]]
+        n = len(texts)
+        average_length = lengths.mean() if n else 0.0
+        self.vocabulary = {}
+        doc_ids, weights, offsets = [], [], [0]
+        for term, doc_counts in postings.items():
+            self.vocabulary[term] = len(self.vocabulary)
+            docs = np.fromiter(doc_counts.keys(), dtype=np.int64, count=len(doc_counts))
+            tf = np.fromiter(doc_counts.values(), dtype=np.float32, count=len(doc_counts))
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * lengths[docs] / average_length)
+            doc_ids.append(docs)
+            weights.append(idf * tf * (k1 + 1) / (tf + norm))
+            offsets.append(offsets[-1] + len(docs))
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int64)
+        self.weights = np.concatenate(weights).astype(np.float32) if weights else np.empty(0, dtype=np.float32)
+        self.term_offsets = np.array(offsets, dtype=np.int64)
+        # Terms in more than max_df of the items are too common to narrow the candidates and would
+        # make every query touch most of the postings, so they are skipped when querying
+        self.common = np.diff(self.term_offsets) > max(max_df * n, n_candidates)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def _query_terms(self, text):
+        """
+        Returns:
+        - (list of int, float): ids of the query's discriminative indexed terms, and the fraction of its
+          distinct terms found in the index (terms too common to discriminate still count as found).
+        """
+        terms = set(tokenize(text, self.ngram))
+        found = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        coverage = len(found) / len(terms) if terms else 0.0
+        return [term_id for term_id in found if not self.common[term_id]], coverage
+
+    def bm25(self, term_ids):
+        """
+        Returns:
+        - (array, array): the transcript items containing any of term_ids, and their BM25 scores.
+        """
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        slices = [slice(self.term_offsets[term_id], self.term_offsets[term_id + 1]) for term_id in term_ids]
+        docs, inverse = np.unique(np.concatenate([self.doc_ids[part] for part in slices]), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate([self.weights[part] for part in slices]), minlength=len(docs))
+        return docs, scores.astype(np.float32)
+
+    def search(self, query_embeddings, k=3, query_texts=None):
+        """
+        Same return format as ExactIndex.search. Without query_texts every query is a full scan.
+        """
+        queries = normalize_rows(query_embeddings)
+        n = len(self.embeddings)
+        if query_texts is None or n == 0:
+            self.queries += len(queries)
+            self.full_scans += len(queries)
+            return top_k(queries @ self.embeddings.T, k)
+
+        out_k = min(k, n)
+        n_candidates = min(max(self.n_candidates, k), n)
+        # Padded [q, c] candidate ids and their BM25 normalized by the query's best; unused slots stay -1
+        candidates = np.full((len(queries), n_candidates), -1, dtype=np.int64)
+        candidate_lexical = np.zeros((len(queries), n_candidates), dtype=np.float32)
+        full_scan = np.zeros(len(queries), dtype=bool)
+        matches = []
+        for row, text in enumerate(query_texts):
+            term_ids, coverage = self._query_terms(text)
+            docs, scores = self.bm25(term_ids)
+            matches.append((docs, scores))
+            if coverage < self.min_coverage or len(docs) < out_k:
+                full_scan[row] = True
+                continue
+            if len(docs) > n_candidates:
+                best = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+                docs, scores = docs[best], scores[best]
+            candidates[row, :len(docs)] = docs
+            candidate_lexical[row, :len(docs)] = scores / scores.max()
+
+        indices = np.zeros((len(queries), out_k), dtype=np.int64)
+        similarities = np.zeros((len(queries), out_k), dtype=np.float32)
+        prefiltered = np.flatnonzero(~full_scan)
+        if len(prefiltered):
+            rows = candidates[prefiltered]
+            # [p, c] cosines between each query and its own candidates only
+            cosine = np.einsum("pd,pcd->pc", queries[prefiltered], self.embeddings[np.maximum(rows, 0)])
+            cosine[rows < 0] = -np.inf
+            if self.fallback_below is not None:
+                rescan = cosine.max(axis=1) < self.fallback_below
+                full_scan[prefiltered[rescan]] = True
+                prefiltered, rows, cosine = prefiltered[~rescan], rows[~rescan], cosine[~rescan]
+            local_indices, local_scores = top_k(self._combine(cosine, candidate_lexical[prefiltered]), out_k)
+            indices[prefiltered] = np.take_along_axis(rows, local_indices, axis=1)
+            similarities[prefiltered] = local_scores
+
+        scanned = np.flatnonzero(full_scan)
+        if len(scanned):
+            combined = queries[scanned] @ self.embeddings.T
+            if self.hybrid_weight:
+                lexical = np.zeros_like(combined)
+                for position, row in enumerate(scanned):
+                    docs, scores = matches[row]
+                    if len(docs):
+                        lexical[position, docs] = scores / scores.max()
+                combined = self._combine(combined, lexical)
+            indices[scanned], similarities[scanned] = top_k(combined, out_k)
+
+        self.queries += len(queries)
+        self.full_scans += len(scanned)
+        metrics.incr("lexical_queries", len(queries))
+        metrics.incr("lexical_full_scans", len(scanned))
+        return indices, similarities
+
+    def _combine(self, cosine, normalized_lexical):
+        if not self.hybrid_weight:
+            return cosine
+        return (1 - self.hybrid_weight) * cosine + self.hybrid_weight * normalized_lexical
@@ -0,0 +1,263 @@
+"""
+Lightweight timing and counters for the validation pipeline.
+
+Stages are timed with spans and volumes are counted with counters:
+- spans: transcript fetch, model load, encode, similarity, LeMUR calls...;
+- counters: items encoded, cache hits...;
+- observations: distributions such as encode batch sizes.
+
+Everything is aggregated in-process and can be exported as JSON (snapshot / to_json) or in the
+Prometheus text format (to_prometheus).
+
+Collection is off unless LLM_VALIDATION_METRICS=1 is set or enable() is called. While it is off,
+span() returns a shared no-op context manager and incr()/observe() return immediately, so the
+instrumented hot paths pay one function call and a flag check.
+
+    with metrics.span("encode", granularity="sentence"):
+        vectors = model.encode(sentences)
+    metrics.incr("items_encoded", len(sentences))
+
+profile() wraps a block in cProfile (or pyinstrument when installed and asked for).
+"""
+from contextlib import contextmanager
+import functools
+import json
+import os
+import threading
+import time
+
+PROMETHEUS_PREFIX = "llm_validation_"
+
+_enabled = os.environ.get("LLM_VALIDATION_METRICS", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+# (name, labels) -> [count, total_seconds, max_seconds]
+_spans = {}
+# (name, labels) -> value
+_counters = {}
+# (name, labels) -> [count, sum, max]
+_observations = {}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _observations.clear()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            entry = _spans.get(self.key)
+            if entry is None:
+                _spans[self.key] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+        return False
+
+
+def span(name, **labels):
+    """
+    Context manager timing one execution of a pipeline stage.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span((name, tuple(sorted(labels.items()))))
+
+
+def timed(name, **labels):
+    """
+    Decorator version of span().
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def incr(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """
+    Record one sample of a distribution, e.g. an encode batch size.
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        entry = _observations.get(key)
+        if entry is None:
+            _observations[key] = [1, value, value]
+        else:
+            entry[0] += 1
+            entry[1] += value
+            entry[2] = max(entry[2], value)
+
+
+def snapshot():
+    """
+    Returns:
+    - dict: {"spans": [...], "counters": [...], "observations": [...]}, one entry per (name, labels).
+    """
+    with _lock:
+        return {
+            "spans": [
+                {"name": name, "labels": dict(labels), "count": count, "total_s": total, "mean_s": total / count, "max_s": longest}
+                for (name, labels), (count, total, longest) in _spans.items()
+            ],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _counters.items()],
+            "observations": [
+                {"name": name, "labels": dict(labels), "count": count, "sum": total, "mean": total / count, "max": largest}
+                for (name, labels), (count, total, largest) in _observations.items()
+            ],
+        }
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def to_prometheus():
+    """
+    Render the current metrics in the Prometheus text exposition format.
+
+    Spans become <name>_seconds summaries (count and sum), counters <name>_total and
+    observations <name> summaries, all prefixed with llm_validation_.
+    """
+    data = snapshot()
+    lines = []
+    typed = set()
+
+    def header(metric, kind):
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} {kind}")
+
+    for entry in data["spans"]:
+        metric = f"{PROMETHEUS_PREFIX}{entry['name']}_seconds"
+        header(metric, "summary")
+        labels = _prometheus_labels(entry["labels"])
+        lines.append(f"{metric}_count{labels} {entry['count']}")
+        lines.append(f"{metric}_sum{labels} {entry['total_s']:.9f}")
+    for entry in data["counters"]:
+        metric = f"{PROMETHEUS_PREFIX}{entry['name']}_total"
+        header(metric, "counter")
+        lines.append(f"{metric}{_prometheus_labels(entry['labels'])} {entry['value']}")
+    for entry in data["observations"]:
+        metric = f"{PROMETHEUS_PREFIX}{entry['name']}"
+        header(metric, "summary")
+        labels = _prometheus_labels(entry["labels"])
+        lines.append(f"{metric}_count{labels} {entry['count']}")
+        lines.append(f"{metric}_sum{labels} {entry['sum']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=None, format="json"):
+    """
+    Print (or write to path) the collected metrics when collection is enabled. The scripts call this on exit.
+    """
+    if not _enabled:
+        return
+    text = to_prometheus() if format == "prometheus" else to_json()
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+@contextmanager
+def profile(output=None, backend="cprofile", top=25):
+    """
+    Profile the enclosed block.
+
+    Args:
+    - output (str or None): file for the raw profile (.prof for cProfile, .html for pyinstrument);
+      None prints the top entries instead.
+    - backend (str): "cprofile" (stdlib) or "pyinstrument" (optional dependency).
+    - top (int): rows printed when output is None.
+    """
+    if backend == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w") as f:
+                    f.write(profiler.output_html())
+            else:
+                print(profiler.output_text())
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
@@ -0,0 +1,121 @@
+import threading
+
+import metrics
+
+# Sentence transformer models are loaded lazily and exactly once per process.
+# sentence_transformers (and torch) are only imported on first use, so importing the
+# validators stays cheap and does no network or model work.
+_models = {}
+_model_locks = {}
+# model name -> SentenceEmbeddingMemo wrapping the loaded model
+_encoders = {}
+_registry_lock = threading.Lock()
+
+_punkt_ready = False
+_punkt_lock = threading.Lock()
+
+
+def _lock_for(model_name):
+    with _registry_lock:
+        if model_name not in _model_locks:
+            _model_locks[model_name] = threading.Lock()
+        return _model_locks[model_name]
+
+
+def get_model(model_name):
+    """
+    Return the shared SentenceTransformer for model_name, loading it on first use.
+
+    Safe to call from many threads: each model has its own lock, so two threads asking
+    for the same model wait for a single load, while different models can load in parallel.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    with _lock_for(model_name):
+        model = _models.get(model_name)
+        if model is None:
+            with metrics.span("model_load", model=model_name):
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+            _models[model_name] = model
+    return model
+
+
+def get_encoder(model_name):
+    """
+    Return get_model(model_name) behind the process-wide sentence embedding memo (sentence_memo.py).
+
+    The validators encode through this, so a sentence that was already embedded by this model,
+    in any transcript or output, is never sent to the model again.
+    """
+    model = get_model(model_name)
+    encoder = _encoders.get(model_name)
+    if encoder is None or encoder.model is not model:
+        with _lock_for(model_name):
+            encoder = _encoders.get(model_name)
+            if encoder is None or encoder.model is not model:
+                from sentence_memo import SentenceEmbeddingMemo
+                encoder = SentenceEmbeddingMemo(model, model_name)
+                _encoders[model_name] = encoder
+    return encoder
+
+
+def wrap_encoder(model_name, wrapper):
+    """
+    Route every later get_encoder(model_name) call in this process through wrapper(encoder).
+
+    Used by the validation service to put its micro-batcher in front of the memo. The wrapped
+    encoder must expose the wrapped one's model attribute, so get_encoder keeps returning it.
+    """
+    encoder = get_encoder(model_name)
+    with _lock_for(model_name):
+        wrapped = wrapper(encoder)
+        _encoders[model_name] = wrapped
+    return wrapped
+
+
+def encoder_stats():
+    """
+    Hit/miss and saved-time counters of every model's sentence embedding memo.
+    """
+    return {model_name: encoder.stats() for model_name, encoder in _encoders.items()}
+
+
+def warm(*model_names):
+    """
+    Load the given models (and the punkt tokenizer) up front, e.g. at service start-up,
+    so the first validation call does not pay the load.
+    """
+    ensure_punkt()
+    for model_name in model_names:
+        get_model(model_name)
+
+
+def loaded_models():
+    return list(_models)
+
+
+def ensure_punkt():
+    """
+    Make sure the NLTK punkt tokenizer is available, downloading it at most once per process
+    and only if it is not already installed locally.
+    """
+    global _punkt_ready
+    if _punkt_ready:
+        return
+    with _punkt_lock:
+        if _punkt_ready:
+            return
+        import nltk
+        try:
+            nltk.data.find("tokenizers/punkt")
+        except LookupError:
+            nltk.download("punkt", quiet=True)
+        _punkt_ready = True
+
+
+def sent_tokenize(text):
+    import nltk
+    ensure_punkt()
+    return nltk.sent_tokenize(text)
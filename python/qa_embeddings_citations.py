@@ -1,12 +1,15 @@
 from pydantic import BaseModel
 import assemblyai as aai
 from assemblyai import LemurQuestionAnswer
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
-import nltk
 import requests
-nltk.download('punkt')
+import metrics
+from cascade import DEFAULT_BAND, FAST_GRANULARITY_THRESHOLDS, FAST_MODEL, cascade_citations, cascade_scores
+from grounding import FusedIndex, score_granularities, citations
+from grounding_index import get_fused_index, search_granularities
+from embedding_cache import load_transcript_embeddings
+from model_registry import get_encoder
+from transcript_loader import get_default_loader
 
 # Replace with your API token
 assembly_key = os.environ.get("assemblyai_key")
@@ -17,27 +20,7 @@ headers = {
     "Authorization": assembly_key
 }
 
-model = SentenceTransformer("infgrad/stella-base-en-v2")
-
-def get_transcript(transcript_id, file_url):
-    if transcript_id:
-        return aai.Transcript.get_by_id(transcript_id)
-    else:
-        transcriber = aai.Transcriber()
-        return transcriber.transcribe(file_url)
-
-def extract_paragraphs_and_sentences(transcript):
-    paragraphs = [p.text for p in transcript.get_paragraphs()]
-    sentences = [s.text for s in transcript.get_sentences()]
-    return paragraphs, sentences
-
-def sliding_window(sentences, window_size=3):
-    return [" ".join(sentences[i:i+window_size]) for i in range(0, len(sentences) - window_size + 1)]
-
-def compare_against_all_granularities(embedding, embeddings_list, k):
-    similarities = cosine_similarity([embedding], embeddings_list)[0]
-    top_k_indices = similarities.argsort()[-k:][::-1]
-    return top_k_indices, similarities[top_k_indices]
+MODEL_NAME = "infgrad/stella-base-en-v2"
 
 GRANULARITY_THRESHOLDS = {
     "sentence": 0.88,
@@ -45,74 +28,169 @@ GRANULARITY_THRESHOLDS = {
     "chunk": 0.84
 }
 
-def process_lemur_qa(lemur_qa, sentence_embeddings, paragraph_embeddings, chunk_embeddings, k=3):
-    qa_embeddings = {}
-    for item in lemur_qa:
-        embedding = model.encode([item.answer])[0]
-        qa_embeddings[item.answer] = embedding
-
-    results = []
-    for qa_item in lemur_qa:
-        qa_answer = qa_item.answer
-        qa_answer_embedding = qa_embeddings[qa_answer]
-
-        top_k_sentence_indices, top_k_sentence_similarities = compare_against_all_granularities(qa_answer_embedding, sentence_embeddings, k)
-        top_k_paragraph_indices, top_k_paragraph_similarities = compare_against_all_granularities(qa_answer_embedding, paragraph_embeddings, k)
-        top_k_chunk_indices, top_k_chunk_similarities = compare_against_all_granularities(qa_answer_embedding, chunk_embeddings, k)
-
-        # Calculate the margin by which each top similarity score exceeds its respective threshold
-        sentence_margin = top_k_sentence_similarities[0] - GRANULARITY_THRESHOLDS["sentence"]
-        paragraph_margin = top_k_paragraph_similarities[0] - GRANULARITY_THRESHOLDS["paragraph"]
-        chunk_margin = top_k_chunk_similarities[0] - GRANULARITY_THRESHOLDS["chunk"]
-        
-        # Determine the granularity with the highest margin
-        max_margin = max(sentence_margin, paragraph_margin, chunk_margin)
-        
-        if max_margin == sentence_margin and sentence_margin > 0:
-            transcript_ref = sentences[top_k_sentence_indices[0]]
-            most_similar_granularity = top_k_sentence_similarities[0]
-        elif max_margin == paragraph_margin and paragraph_margin > 0:
-            transcript_ref = paragraphs[top_k_paragraph_indices[0]]
-            most_similar_granularity = top_k_paragraph_similarities[0]
-        elif max_margin == chunk_margin and chunk_margin > 0:
-            transcript_ref = sentence_chunks[top_k_chunk_indices[0]]
-            most_similar_granularity = top_k_chunk_similarities[0]
+def _qa_field(item, name):
+    # LemurQuestionAnswer objects from the SDK, or plain dicts from JSON
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def _qa_result(qa_item, citation):
+    transcript_ref, similarity, passed = citation
+    return {
+        "question": _qa_field(qa_item, "question"),
+        "answer": _qa_field(qa_item, "answer"),
+        "citation": {
+            "reference": transcript_ref,
+            "similarity_score": similarity
+        },
+        "grounding_threshold_passed": passed
+    }
+
+
+def process_lemur_qa_batch(jobs, k=3, model_name=MODEL_NAME, thresholds=GRANULARITY_THRESHOLDS):
+    """
+    Ground the answers of many LeMUR QA responses, possibly against different transcripts.
+
+    Reentrant: everything it needs comes in through jobs, so it is safe to call from a worker pool.
+
+    Args:
+    - jobs (list): (texts, embeddings, lemur_qa) tuples. texts and embeddings are dicts keyed by
+      granularity ("sentence", "paragraph", "chunk"), as returned by load_transcript_embeddings.
+      embeddings may also be a FusedIndex or a dict of grounding_index indexes (e.g. "lexical").
+    - k (int): number of nearest transcript items kept per granularity.
+    - model_name (str): sentence transformer used to embed the answers.
+    - thresholds (dict): granularity -> similarity threshold.
+
+    Returns:
+    - list of lists: one list of citation dicts per job, in the same format as process_lemur_qa.
+    """
+    with metrics.span("validate", output="qa"):
+        return _process_lemur_qa_batch(jobs, k, model_name, thresholds)
+
+
+def _process_lemur_qa_batch(jobs, k, model_name, thresholds):
+    answers = [_qa_field(item, "answer") for _, _, lemur_qa in jobs for item in lemur_qa]
+    if not answers:
+        return [[] for _ in jobs]
+    # All answers of all jobs go through the encoder in one batch
+    answer_embeddings = get_encoder(model_name).encode(answers)
+    metrics.incr("items_validated", len(answers), output="qa")
+
+    all_results = []
+    offset = 0
+    for texts, embeddings, lemur_qa in jobs:
+        job_embeddings = answer_embeddings[offset:offset + len(lemur_qa)]
+        job_answers = answers[offset:offset + len(lemur_qa)]
+        offset += len(lemur_qa)
+        if not lemur_qa:
+            all_results.append([])
+            continue
+        if isinstance(embeddings, dict) and any(hasattr(index, "search") for index in embeddings.values()):
+            scores = search_granularities(job_embeddings, embeddings, k, query_texts=job_answers)
         else:
-            transcript_ref = "No reference met the threshold."
-            most_similar_granularity = max_margin
-        
-        grounding_threshold_passed = max_margin > 0
-        
-        results.append({
-            "question": qa_item.question,
-            "answer": qa_answer,
-            "citation": {
-                "reference": transcript_ref,
-                "similarity_score": most_similar_granularity
-            },
-            "grounding_threshold_passed": grounding_threshold_passed
-        })
-    return results
+            scores = score_granularities(job_embeddings, embeddings, k)
+        results = [_qa_result(qa_item, citation) for qa_item, citation in zip(lemur_qa, citations(scores, thresholds, texts))]
+        metrics.incr("items_filtered", sum(not result["grounding_threshold_passed"] for result in results), output="qa")
+        all_results.append(results)
+    return all_results
+
+
+def fast_transcript_index(transcript_id, fast_model_name=FAST_MODEL, cache=None):
+    """
+    The fast model's FusedIndex of a transcript, for the fourth slot of a process_lemur_qa_batch_cascade job.
+
+    Segments and fast embeddings come from the on-disk cache when the transcript was seen before,
+    the same way filter_summary_sentences builds its cascade indexes.
+    """
+    _, granularity_embeddings = load_transcript_embeddings(
+        transcript_id, fast_model_name, lambda: get_default_loader().load(transcript_id),
+        get_encoder(fast_model_name).encode, cache,
+    )
+    return get_fused_index((transcript_id, fast_model_name, "exact", 3, 1), granularity_embeddings)
+
+
+def process_lemur_qa_batch_cascade(jobs, k=3, model_name=MODEL_NAME, band=DEFAULT_BAND, fast_model_name=FAST_MODEL,
+                                   thresholds=GRANULARITY_THRESHOLDS, fast_thresholds=FAST_GRANULARITY_THRESHOLDS):
+    """
+    process_lemur_qa_batch in cascade mode (see cascade.py): the fast model grounds every answer and
+    model_name only re-scores answers within band of the fast thresholds. Escalated answers cite and
+    score with model_name, the others with the fast model.
+
+    A job is (texts, embeddings, lemur_qa) or (texts, embeddings, lemur_qa, fast_index). fast_index
+    holds the fast model's transcript embeddings in any form cascade_scores accepts, e.g. from
+    fast_transcript_index. Without it the fast embeddings are encoded from texts, once per texts
+    dict in the call. The embeddings slot of a job may be a zero-argument callable, so the slow
+    transcript embeddings are only produced for jobs where some answer escalates.
+
+    Returns:
+    - (list of lists, dict): results in the process_lemur_qa_batch format, and escalation stats.
+    """
+    fast_encoder = get_encoder(fast_model_name)
+    # id(texts) -> fast FusedIndex, for jobs without a prebuilt one that share a transcript
+    encoded = {}
+    all_results = []
+    totals = {"items": 0, "escalated": 0}
+    with metrics.span("validate", output="qa_cascade"):
+        for job in jobs:
+            texts, embeddings, lemur_qa = job[:3]
+            if not lemur_qa:
+                all_results.append([])
+                continue
+            fast_index = job[3] if len(job) > 3 else None
+            if fast_index is None:
+                if id(texts) not in encoded:
+                    encoded[id(texts)] = FusedIndex({granularity: fast_encoder.encode(items) for granularity, items in texts.items()})
+                fast_index = encoded[id(texts)]
+            answers = [_qa_field(item, "answer") for item in lemur_qa]
+            fast_scores, slow_scores, escalated, stats = cascade_scores(
+                answers, fast_index, embeddings, fast_model_name, model_name, fast_thresholds, k, band
+            )
+            totals["items"] += stats["items"]
+            totals["escalated"] += stats["escalated"]
+            job_citations = cascade_citations(fast_scores, slow_scores, escalated, fast_thresholds, thresholds, texts)
+            results = [_qa_result(qa_item, citation) for qa_item, citation in zip(lemur_qa, job_citations)]
+            metrics.incr("items_validated", len(results), output="qa")
+            metrics.incr("items_filtered", sum(not result["grounding_threshold_passed"] for result in results), output="qa")
+            all_results.append(results)
+    totals["escalated_fraction"] = totals["escalated"] / totals["items"] if totals["items"] else 0.0
+    return all_results, totals
+
+
+def process_lemur_qa(lemur_qa, sentence_embeddings, paragraph_embeddings, chunk_embeddings, k=3, model_name=MODEL_NAME,
+                     sentences=None, paragraphs=None, sentence_chunks=None, cascade=False, cascade_band=DEFAULT_BAND,
+                     transcript_id=None):
+    if sentences is None or paragraphs is None or sentence_chunks is None:
+        raise ValueError("process_lemur_qa needs the sentences, paragraphs and sentence_chunks the embeddings were built from")
+    texts = {"sentence": sentences, "paragraph": paragraphs, "chunk": sentence_chunks}
+    embeddings = {"sentence": sentence_embeddings, "paragraph": paragraph_embeddings, "chunk": chunk_embeddings}
+    if cascade:
+        # With a transcript_id the fast embeddings come from the embedding cache instead of being re-encoded
+        job = (texts, embeddings, lemur_qa) + ((fast_transcript_index(transcript_id),) if transcript_id else ())
+        return process_lemur_qa_batch_cascade([job], k, model_name, cascade_band)[0][0]
+    return process_lemur_qa_batch([(texts, embeddings, lemur_qa)], k, model_name)[0]
 
 
 if __name__ == "__main__":
     API_KEY = ""
     FILE_URL = "https://github.com/AssemblyAI-Examples/audio-examples/raw/main/20230607_me_canadian_wildfires.mp3"
     TRANSCRIPT_ID = "6vkxdgap5h-8d7b-4559-a702-16bf4c7c3b44"
-    MODEL_NAME = "infgrad/stella-base-en-v2"
+    model = get_encoder(MODEL_NAME)
 
     # headers = initialize_assemblyai(API_KEY, "https://api.assemblyai.com/lemur/v3/generate/task")
-    transcript = get_transcript(TRANSCRIPT_ID, FILE_URL)
-    paragraphs, sentences = extract_paragraphs_and_sentences(transcript)
-    sentence_chunks = sliding_window(sentences)
-    sentence_embeddings = model.encode(sentences)
-    paragraph_embeddings = model.encode(paragraphs)
-    chunk_embeddings = model.encode(sentence_chunks)
+    # Repeat runs against the same transcript id read segments and embeddings from the on-disk cache
+    texts, embeddings = load_transcript_embeddings(
+        TRANSCRIPT_ID,
+        MODEL_NAME,
+        lambda: get_default_loader().load(TRANSCRIPT_ID),
+        model.encode,
+    )
+    sentences, paragraphs, sentence_chunks = texts["sentence"], texts["paragraph"], texts["chunk"]
+    sentence_embeddings, paragraph_embeddings, chunk_embeddings = embeddings["sentence"], embeddings["paragraph"], embeddings["chunk"]
 
     # Lemur QA processing
     lemur_qa = [LemurQuestionAnswer(question='What locations are affected by the wildfires?', answer='Maine, Maryland, Minnesota, New York City, the Mid Atlantic, and the Northeast.'), LemurQuestionAnswer(question='What is the cause of the wildfires?', answer='The wildfires are caused by dry conditions this season combined with weather systems channeling the smoke from the Canadian wildfires into parts of the US.'), LemurQuestionAnswer(question='Will the wildfires continue to proliferate?', answer='YES. The fires are expected to continue burning for a bit longer according to the expert.'), LemurQuestionAnswer(question='What is the relationship between climate change and wildfires?', answer='Climate change leads to an earlier start to fire season, fires lasting longer, and more frequent fires overall.'), LemurQuestionAnswer(question='Who is interviewed in the audio?', answer='Peter DiCarlo, an associate professor at Johns Hopkins University.')]
 
-    results = process_lemur_qa(lemur_qa, sentence_embeddings, paragraph_embeddings, chunk_embeddings)
+    results = process_lemur_qa(lemur_qa, sentence_embeddings, paragraph_embeddings, chunk_embeddings,
+                               sentences=sentences, paragraphs=paragraphs, sentence_chunks=sentence_chunks)
     for result in results:
         print(result)
         # question = result["question"]
@@ -124,4 +202,5 @@ if __name__ == "__main__":
         # print(f"ANSWER: {answer}")
         # print(f"CITATION: {reference}")
         # print(f"SIMILARITY SCORE: {similarity}")
-        print("*********************************")
\ No newline at end of file
+        print("*********************************")
+    metrics.dump()
@@ -0,0 +1,141 @@
+"""
+Compact float16 / int8 storage for transcript embeddings, with a scoring kernel that works on it directly.
+
+Rows are L2-normalized before they are compressed, so a score is just a dot product:
+- float16 halves the memory of float32;
+- int8 stores every row as int8 values plus one float32 scale (max |x| / 127), about a quarter.
+
+Neither building nor scoring materializes the full float32 matrix: both work on one block of rows
+at a time (normalize and compress it; upcast, multiply and apply the per-row scales), so peak
+extra memory is one block.
+"""
+import numpy as np
+
+import metrics
+
+from grounding import FusedIndex, GRANULARITIES, as_rows, best_granularity, normalize_rows, passes_thresholds, top_k
+
+COMPACT_DTYPES = ("float32", "float16", "int8")
+BLOCK_ROWS = 4096
+
+
+class CompactEmbeddings:
+    def __init__(self, data, scales=None):
+        self.data = data
+        self.scales = scales
+
+    @property
+    def dtype(self):
+        return str(self.data.dtype)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def quantize(embeddings, dtype="int8", block_rows=BLOCK_ROWS):
+    """
+    Normalize and compress a [n, d] embedding matrix to float32, float16 or per-row-scaled int8.
+    """
+    embeddings = as_rows(embeddings)
+    return quantize_stacked([embeddings], embeddings.shape[1], dtype, block_rows)
+
+
+def quantize_stacked(matrices, dim, dtype="int8", block_rows=BLOCK_ROWS):
+    """
+    quantize() of several [n_i, dim] matrices stacked in order, block by block into the compact arrays.
+    """
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(f"Unknown embedding dtype {dtype!r}, expected one of {COMPACT_DTYPES}")
+    matrices = [as_rows(matrix) for matrix in matrices]
+    n = sum(len(matrix) for matrix in matrices)
+    data = np.empty((n, dim), dtype=dtype)
+    scales = np.empty(n, dtype=np.float32) if dtype == "int8" else None
+    row = 0
+    for matrix in matrices:
+        for start in range(0, len(matrix), block_rows):
+            normalized = normalize_rows(matrix[start:start + block_rows])
+            end = row + len(normalized)
+            if scales is None:
+                data[row:end] = normalized
+            else:
+                block_scales = np.abs(normalized).max(axis=1) / 127.0
+                block_scales[block_scales == 0] = 1.0
+                data[row:end] = np.round(normalized / block_scales[:, None])
+                scales[row:end] = block_scales
+            row = end
+    return CompactEmbeddings(data, scales)
+
+
+def compact_scores(query_embeddings, compact, block_rows=BLOCK_ROWS):
+    """
+    Cosine similarities [q, n] between queries and a CompactEmbeddings matrix, computed block by block.
+    """
+    queries = normalize_rows(query_embeddings)
+    n = len(compact)
+    scores = np.empty((len(queries), n), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = compact.data[start:start + block_rows].astype(np.float32)
+        block_scores = queries @ block.T
+        if compact.scales is not None:
+            block_scores *= compact.scales[start:start + block_rows]
+        scores[:, start:start + block_rows] = block_scores
+    return scores
+
+
+class CompactFusedIndex(FusedIndex):
+    """
+    FusedIndex whose stacked matrix is kept as float16 or int8; same search() results format.
+    """
+
+    def __init__(self, granularity_embeddings, dtype="int8"):
+        matrices, dim = self._layout(granularity_embeddings)
+        # Quantized block by block; no float32 stack is ever built
+        self.compact = quantize_stacked(matrices, dim, dtype)
+        self.matrix = self.compact.data
+
+    @property
+    def nbytes(self):
+        return self.compact.nbytes
+
+    def search(self, query_embeddings, k=3):
+        with metrics.span("similarity", backend=self.compact.dtype):
+            similarities = compact_scores(query_embeddings, self.compact)
+            scores = {}
+            for position, granularity in enumerate(self.granularities):
+                start, end = self.offsets[position], self.offsets[position + 1]
+                scores[granularity] = top_k(similarities[:, start:end], k)
+        return scores
+
+
+def decision_flips(query_embeddings, granularity_embeddings, thresholds, k=3, dtypes=("float16", "int8")):
+    """
+    How often compact scoring changes a decision compared with float32.
+
+    For each dtype reports the number of queries whose keep/filter decision (any granularity over its
+    threshold) flips, whose winning granularity / pass state under the largest-margin rule flips,
+    the largest absolute score error and the index size in bytes.
+    """
+    granularity_embeddings = {granularity: granularity_embeddings[granularity] for granularity in GRANULARITIES}
+    reference_index = FusedIndex(granularity_embeddings)
+    reference = reference_index.search(query_embeddings, k)
+    reference_passed = passes_thresholds(reference, thresholds)
+    reference_winners, reference_margins, reference_best = best_granularity(reference, thresholds)
+
+    report = {"queries": len(query_embeddings), "float32_bytes": reference_index.matrix.nbytes}
+    for dtype in dtypes:
+        index = CompactFusedIndex(granularity_embeddings, dtype)
+        scores = index.search(query_embeddings, k)
+        winners, margins, best = best_granularity(scores, thresholds)
+        reference_citation = np.where(reference_margins > 0, reference_winners, -1)
+        citation = np.where(margins > 0, winners, -1)
+        report[dtype] = {
+            "keep_filter_flips": int((passes_thresholds(scores, thresholds) != reference_passed).sum()),
+            "citation_flips": int((citation != reference_citation).sum()),
+            "max_abs_score_error": float(np.max(np.abs(best - reference_best))) if len(best) else 0.0,
+            "bytes": index.nbytes,
+        }
+    return report
@@ -0,0 +1,169 @@
+"""
+Sentence-level embedding memo shared by every validator.
+
+Boilerplate transcript lines ("Thanks all for joining", "Awesome.") and sentences that LeMUR
+repeats between runs are encoded once per model: each text is normalized (unicode NFC, runs of
+whitespace collapsed), hashed together with the model name, and looked up first in a bounded
+in-memory LRU and then, when enabled, in an on-disk SQLite store. Only strings seen for the
+first time reach the encoder, in one batch.
+
+The disk store is off unless a path is given or LLM_VALIDATION_SENTENCE_MEMO is set; the LRU
+size defaults to LLM_VALIDATION_SENTENCE_MEMO_SIZE (20,000 vectors, ~60 MB for 768-d models).
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+import metrics
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("LLM_VALIDATION_SENTENCE_MEMO_SIZE", 20_000))
+DEFAULT_STORE_PATH = os.environ.get("LLM_VALIDATION_SENTENCE_MEMO")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def memo_key(model_name, text):
+    return hashlib.sha1(f"{model_name}\x1f{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SentenceEmbeddingMemo:
+    """
+    Drop-in wrapper around an encoder's encode(list of str).
+
+    Args:
+    - model: the encoder, e.g. a SentenceTransformer.
+    - model_name (str): part of every key, so two models never share vectors.
+    - max_entries (int): capacity of the in-memory LRU.
+    - store_path (str or None): SQLite file backing the LRU; None keeps the memo in memory only.
+    """
+
+    def __init__(self, model, model_name, max_entries=DEFAULT_MAX_ENTRIES, store_path=DEFAULT_STORE_PATH):
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+        if store_path:
+            os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+            self._store = sqlite3.connect(store_path, timeout=30, check_same_thread=False)
+            self._store.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._store.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+    def __getattr__(self, name):
+        # Everything but encode (e.g. get_sentence_embedding_dimension) goes to the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def encode(self, sentences, **kwargs):
+        if isinstance(sentences, str):
+            return self.encode([sentences], **kwargs)[0]
+        sentences = list(sentences)
+        if kwargs or not sentences:
+            # Non-default encode options change the vectors; don't memoize them
+            return self.model.encode(sentences, **kwargs)
+
+        keys = [memo_key(self.model_name, sentence) for sentence in sentences]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+
+        missing = {key: sentence for key, sentence in zip(keys, sentences) if key not in found}
+        found_on_disk = {}
+        if missing and self._store is not None:
+            found_on_disk = self._load(list(missing))
+            found.update(found_on_disk)
+            for key in found_on_disk:
+                del missing[key]
+
+        encode_seconds = 0.0
+        if missing:
+            metrics.observe("encode_batch_size", len(missing), model=self.model_name)
+            start = time.perf_counter()
+            with metrics.span("model_encode", model=self.model_name):
+                vectors = np.asarray(self.model.encode(list(missing.values())), dtype=np.float32)
+            encode_seconds = time.perf_counter() - start
+            encoded = dict(zip(missing, vectors))
+            found.update(encoded)
+            if self._store is not None:
+                self._save(encoded)
+
+        with self._lock:
+            # Per input string: repeats of a missing string within the same call count as hits
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+            self.disk_hits += len(found_on_disk)
+            self.encode_seconds += encode_seconds
+            for key in dict.fromkeys(keys):
+                self._lru[key] = found[key]
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+        metrics.incr("items_encoded", len(missing), model=self.model_name)
+        metrics.incr("sentence_memo_hits", len(keys) - len(missing), model=self.model_name)
+        return np.stack([found[key] for key in keys])
+
+    def _load(self, keys):
+        found = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._store.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def _save(self, encoded):
+        with self._lock:
+            self._store.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in encoded.items()],
+            )
+            self._store.commit()
+
+    def stats(self):
+        """
+        Returns:
+        - dict: hit/miss counters, the hit rate and the encode time the hits saved, estimated from
+          the measured per-sentence encode time of the misses.
+        """
+        lookups = self.hits + self.misses
+        per_sentence = self.encode_seconds / self.misses if self.misses else 0.0
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._lru),
+            "encode_seconds": self.encode_seconds,
+            "saved_seconds": self.hits * per_sentence,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
@@ -0,0 +1,128 @@
+"""
+Streaming grounding filter: validate LeMUR output sentence by sentence while it is still arriving.
+
+The transcript is indexed once up front; after that every completed sentence costs one encode
+of a single sentence and one search per granularity, so the first verdict is available long
+before the full response has been generated.
+"""
+import asyncio
+import time
+
+import metrics
+from grounding import GRANULARITIES, FusedIndex
+from grounding_index import build_index, search_granularities
+from model_registry import sent_tokenize
+
+
+class IncrementalSentenceSplitter:
+    """
+    Detects sentence boundaries in text that arrives in arbitrary pieces.
+
+    The buffered text is re-tokenized on every feed, and all but the last sentence are released:
+    the last one may still grow (or turn out to be an abbreviation such as "Dr."), so it is only
+    released by flush() once the stream has ended.
+    """
+
+    def __init__(self, tokenize=sent_tokenize):
+        self.tokenize = tokenize
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = self.tokenize(self.buffer)
+        if len(sentences) < 2:
+            return []
+        complete = sentences[:-1]
+        # Keep the raw tail, whitespace included, so the next piece is appended exactly as sent
+        tail_start = self.buffer.rfind(sentences[-1])
+        self.buffer = self.buffer[tail_start:] if tail_start >= 0 else sentences[-1]
+        return complete
+
+    def flush(self):
+        sentences = self.tokenize(self.buffer) if self.buffer.strip() else []
+        self.buffer = ""
+        return sentences
+
+
+class StreamingGroundingFilter:
+    """
+    Scores completed sentences against pre-indexed transcript embeddings.
+
+    Args:
+    - model: encoder with an encode(list of str) method, e.g. model_registry.get_encoder(name).
+    - texts (dict): granularity -> list of transcript texts.
+    - embeddings (dict): granularity -> transcript embeddings (as returned by load_transcript_embeddings).
+    - thresholds (dict): granularity -> similarity threshold.
+    - k (int): nearest transcript items kept per granularity.
+    - index_backend (str): "exact" searches one fused matrix of all granularities; "ivf", "lexical" or
+      "auto" build a grounding_index per granularity.
+    """
+
+    def __init__(self, model, texts, embeddings, thresholds, k=3, index_backend="exact", tokenize=sent_tokenize):
+        self.model = model
+        self.texts = texts
+        self.thresholds = thresholds
+        self.k = k
+        self.tokenize = tokenize
+        if index_backend == "exact":
+            self.index = FusedIndex({granularity: embeddings[granularity] for granularity in GRANULARITIES})
+        else:
+            self.index = {
+                granularity: build_index(embeddings[granularity], index_backend, texts=texts[granularity])
+                for granularity in GRANULARITIES
+            }
+
+    def _search(self, embedding, sentence):
+        if isinstance(self.index, FusedIndex):
+            return self.index.search(embedding, self.k)
+        return search_granularities(embedding, self.index, self.k, query_texts=[sentence])
+
+    def verdict(self, sentence):
+        with metrics.span("validate", output="stream"):
+            return self._verdict(sentence)
+
+    def _verdict(self, sentence):
+        embedding = self.model.encode([sentence])
+        passed = False
+        citations = {}
+        for granularity, (indices, similarities) in self._search(embedding, sentence).items():
+            if indices.shape[1] == 0:
+                continue
+            similarity = float(similarities[0, 0])
+            citations[granularity] = {"reference": self.texts[granularity][indices[0, 0]], "similarity_score": similarity}
+            passed = passed or similarity >= self.thresholds[granularity]
+        return {"sentence": sentence, "keep": passed, "citations": citations}
+
+    def filter(self, pieces):
+        """
+        Generator: consume an iterable of text pieces and yield one verdict per completed sentence.
+        """
+        splitter = IncrementalSentenceSplitter(self.tokenize)
+        for piece in pieces:
+            for sentence in splitter.feed(piece):
+                yield self.verdict(sentence)
+        for sentence in splitter.flush():
+            yield self.verdict(sentence)
+
+    async def afilter(self, pieces):
+        """
+        Async generator version of filter() for async text streams.
+
+        Each verdict (encode + search) runs on a worker thread so the event loop keeps serving other tasks.
+        """
+        splitter = IncrementalSentenceSplitter(self.tokenize)
+        async for piece in pieces:
+            for sentence in splitter.feed(piece):
+                yield await asyncio.to_thread(self.verdict, sentence)
+        for sentence in splitter.flush():
+            yield await asyncio.to_thread(self.verdict, sentence)
+
+
+def timed_verdicts(verdicts):
+    """
+    Wrap a verdict stream and attach seconds-since-start to every verdict, for latency measurements.
+    """
+    start = time.perf_counter()
+    for verdict in verdicts:
+        verdict["elapsed"] = time.perf_counter() - start
+        yield verdict
@@ -1,10 +1,13 @@
 import assemblyai as aai
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
 import os
-
-nltk.download('punkt')
+import metrics
+from cascade import DEFAULT_BAND, FAST_MODEL, FAST_SUMMARY_THRESHOLDS, cascade_passes, cascade_scores
+from grounding import score_granularities, passes_thresholds
+from grounding_index import get_fused_index, get_transcript_indexes, search_granularities
+from embedding_cache import load_transcript_embeddings
+from model_registry import get_encoder, sent_tokenize
+from streaming_filter import StreamingGroundingFilter
+from transcript_loader import get_default_loader
 
 # Configuration and Initialization
 aai.settings.api_key = os.environ.get("assemblyai_key")
@@ -12,83 +15,139 @@ lemur_endpoint = "https://api.assemblyai.com/lemur/v3/generate/task"
 headers = {
     "Authorization": os.environ.get("assemblyai_key")
 }
-FILE_URL = "https://github.com/AssemblyAI-Examples/audio-examples/raw/main/20230607_me_canadian_wildfires.mp3"
-
-
-def get_transcript(transcript_id=None):
-    if transcript_id:
-        return aai.Transcript.get_by_id(transcript_id)
-    else:
-        transcriber = aai.Transcriber()
-        return transcriber.transcribe(FILE_URL)
-
-
-def extract_paragraphs_and_sentences(transcript):
-    return [p.text for p in transcript.get_paragraphs()], [s.text for s in transcript.get_sentences()]
 
-
-def sliding_window(sentences, window_size=3):
-    return [" ".join(sentences[i:i+window_size]) for i in range(0, len(sentences) - window_size + 1)]
+SENTENCE_THRESHOLD = 0.80
+PARAGRAPH_THRESHOLD = 0.73
+CHUNK_THRESHOLD = 0.78
+SUMMARY_THRESHOLDS = {
+    "sentence": SENTENCE_THRESHOLD,
+    "paragraph": PARAGRAPH_THRESHOLD,
+    "chunk": CHUNK_THRESHOLD,
+}
 
 
 def get_sentence_transformer_embeddings(sentences, model_name):
-    model = SentenceTransformer(model_name)
-    return model.encode(sentences)
-
-
-def compare_against_all_granularities(summary_embedding, embeddings_list, k):
-    similarities = cosine_similarity([summary_embedding], embeddings_list)[0]
-    top_k_indices = similarities.argsort()[-k:][::-1]
-    return top_k_indices, similarities[top_k_indices]
-
-
-def filter_summary_sentences(summary, transcript_id, model_name, k=3):
-    # Load the transcript using the provided ID
-    transcript = aai.Transcript.get_by_id(transcript_id)
-    print(transcript)
-    paragraphs = [paragraph.text for paragraph in transcript.get_paragraphs()]
-    sentences = [sentence.text for sentence in transcript.get_sentences()]
-    model = SentenceTransformer(model_name)
-    summary_sentences = nltk.sent_tokenize(summary)
-    summary_embeddings = {sentence: model.encode([sentence])[0] for sentence in summary_sentences}
-    # Get the embeddings
-    sentence_embeddings = model.encode(sentences)
-    paragraph_embeddings = model.encode(paragraphs)
-    sentence_chunks = sliding_window(sentences)
-    chunk_embeddings = model.encode(sentence_chunks)
-
-    
-    
+    return get_encoder(model_name).encode(sentences)
+
+
+def filter_summary_sentences(summary, transcript_id, model_name, k=3, cache=None, chunk_mode="exact",
+                             window_size=3, stride=1, index_backend=None, embedding_dtype="float32",
+                             cascade=False, cascade_band=DEFAULT_BAND, fast_model_name=FAST_MODEL):
+    def fetch_segments():
+        # Paragraphs and sentences are requested concurrently and kept in the segment cache
+        return get_default_loader().load(transcript_id)
+
+    def transcript_index(name):
+        # Segments and embeddings come from the on-disk cache when this transcript was validated before
+        # chunk_mode="pooled" derives the chunk vectors from the sentence vectors instead of re-encoding them
+        texts, granularity_embeddings = load_transcript_embeddings(
+            transcript_id, name, fetch_segments, get_encoder(name).encode, cache,
+            window_size=window_size, stride=stride, chunk_mode=chunk_mode,
+        )
+        index_key = (transcript_id, name, chunk_mode, window_size, stride)
+        if index_backend is None:
+            # One matmul over the fused sentence/paragraph/chunk matrix, then a top-k per granularity segment
+            # embedding_dtype="float16"/"int8" keeps the cached index compact (see quantization.py)
+            return get_fused_index(index_key, granularity_embeddings, embedding_dtype)
+        # Indexes are built once per transcript and reused by every later query against it
+        # index_backend="lexical" prefilters on the transcript texts before the dense search
+        return get_transcript_indexes(index_key, granularity_embeddings, index_backend, granularity_texts=texts)
+
+    if cascade:
+        # The slow model's transcript index is only built if some sentence lands in the uncertainty band
+        new_summary, filtered_sentences, _ = filter_summary_sentences_cascade(
+            summary, transcript_index(fast_model_name), lambda: transcript_index(model_name), model_name, k,
+            band=cascade_band, fast_model_name=fast_model_name,
+        )
+        return new_summary, filtered_sentences
+    return filter_summary_sentences_local(summary, transcript_index(model_name), model_name, k)
+
+
+def split_summary(summary_sentences, passed):
+    """
+    Returns:
+    - (str, list): the passed sentences joined into the new summary (each followed by a space), and the failed ones.
+    """
     new_summary = ""
     filtered_sentences = []
-    sentence_threshold = 0.80
-    paragraph_threshold = 0.73
-    chunk_threshold = 0.78
-
-    for sentence, embedding in summary_embeddings.items():
-        top_k_sentence_indices, top_k_sentence_similarities = compare_against_all_granularities(embedding, sentence_embeddings, k)
-        top_k_paragraph_indices, top_k_paragraph_similarities = compare_against_all_granularities(embedding, paragraph_embeddings, k)
-        top_k_chunk_indices, top_k_chunk_similarities = compare_against_all_granularities(embedding, chunk_embeddings, k)
-        
-        if any(sim >= sentence_threshold for sim in top_k_sentence_similarities) or \
-           any(sim >= paragraph_threshold for sim in top_k_paragraph_similarities) or \
-           any(sim >= chunk_threshold for sim in top_k_chunk_similarities):
+    for sentence, sentence_passed in zip(summary_sentences, passed):
+        if sentence_passed:
             new_summary += sentence + " "
         else:
             filtered_sentences.append(sentence)
-    
     return new_summary, filtered_sentences
 
 
+def filter_summary_sentences_local(summary, granularity_index, model_name, k=3, thresholds=SUMMARY_THRESHOLDS):
+    """
+    Filter a summary against transcript embeddings that are already in memory.
+
+    granularity_index is a dict of granularity -> embeddings, a FusedIndex, or a dict of
+    grounding_index indexes. No transcript fetch happens here, which makes it usable offline.
+    """
+    with metrics.span("validate", output="summary"):
+        # dict.fromkeys drops repeated sentences, same as the old {sentence: embedding} mapping
+        summary_sentences = list(dict.fromkeys(sent_tokenize(summary)))
+        if not summary_sentences:
+            return "", []
+        # Encode every summary sentence in one batch instead of one call per sentence
+        summary_embeddings = get_encoder(model_name).encode(summary_sentences)
+
+        if isinstance(granularity_index, dict) and any(hasattr(index, "search") for index in granularity_index.values()):
+            scores = search_granularities(summary_embeddings, granularity_index, k, query_texts=summary_sentences)
+        else:
+            scores = score_granularities(summary_embeddings, granularity_index, k)
+        passed = passes_thresholds(scores, thresholds)
+    metrics.incr("items_validated", len(summary_sentences), output="summary")
+    metrics.incr("items_filtered", int((~passed).sum()), output="summary")
+    return split_summary(summary_sentences, passed)
+
+
+def filter_summary_sentences_cascade(summary, fast_index, slow_index, model_name, k=3, band=DEFAULT_BAND,
+                                     fast_model_name=FAST_MODEL, thresholds=SUMMARY_THRESHOLDS,
+                                     fast_thresholds=FAST_SUMMARY_THRESHOLDS):
+    """
+    filter_summary_sentences_local in cascade mode (see cascade.py): fast_model_name decides the clear
+    passes and fails, model_name re-scores only the sentences within band of the fast thresholds.
+
+    slow_index may be a zero-argument callable, so the slow transcript index is only built when needed.
+
+    Returns:
+    - (str, list, dict): new summary, filtered sentences, and {"items", "escalated", "escalated_fraction"}.
+    """
+    with metrics.span("validate", output="summary_cascade"):
+        summary_sentences = list(dict.fromkeys(sent_tokenize(summary)))
+        if not summary_sentences:
+            return "", [], {"items": 0, "escalated": 0, "escalated_fraction": 0.0}
+        fast_scores, slow_scores, escalated, stats = cascade_scores(
+            summary_sentences, fast_index, slow_index, fast_model_name, model_name, fast_thresholds, k, band
+        )
+        passed = cascade_passes(fast_scores, slow_scores, escalated, fast_thresholds, thresholds)
+    metrics.incr("items_validated", len(summary_sentences), output="summary")
+    metrics.incr("items_filtered", int((~passed).sum()), output="summary")
+    return (*split_summary(summary_sentences, passed), stats)
+
+
+def stream_filter_summary_sentences(pieces, transcript_id, model_name, k=3, cache=None, index_backend="exact"):
+    """
+    Streaming counterpart of filter_summary_sentences.
+
+    pieces is an iterable of text fragments (e.g. tokens from a streamed LeMUR response). Yields a
+    {"sentence", "keep", "citations"} verdict for every sentence as soon as it is complete.
+    Use StreamingGroundingFilter.afilter directly for async streams.
+    """
+    model = get_encoder(model_name)
+    texts, granularity_embeddings = load_transcript_embeddings(
+        transcript_id, model_name,
+        lambda: get_default_loader().load(transcript_id),
+        model.encode, cache,
+    )
+    streaming_filter = StreamingGroundingFilter(model, texts, granularity_embeddings, SUMMARY_THRESHOLDS, k, index_backend)
+    return streaming_filter.filter(pieces)
+
+
 if __name__ == "__main__":
-    # transcript = get_transcript("6mvfr2epvp-65bc-46dc-8b4e-b87487b5da4b")
-    # paragraphs, sentences = extract_paragraphs_and_sentences(transcript)
-    
     model_name = "infgrad/stella-base-en-v2"
-    # sentence_embeddings = get_sentence_transformer_embeddings(sentences, model_name)
-    # paragraph_embeddings = get_sentence_transformer_embeddings(paragraphs, model_name)
-    # sentence_chunks = sliding_window(sentences)
-    # chunk_embeddings = get_sentence_transformer_embeddings(sentence_chunks, model_name)
     
     lemur_summary = "Wildfires in Canada are making the air dirty in many places in the US. Smoke from the fires is traveling through the sky and making it hard to breathe in places like New York and Baltimore. The smoke has tiny pieces in it that can get inside your lungs if you breathe them. This can make you sick, especially kids and older adults. The pieces in the smoke are much more than normal and that's why the air is unhealthy. More people could get sick until the weather changes and moves the smoke away. Fires might happen more often in the future because of climate change, so dirty air could affect more places."
     
@@ -100,3 +159,4 @@ if __name__ == "__main__":
     print("***************************")
     print("FILTERED SENTENCES")
     print(filtered_sentences)
+    metrics.dump()
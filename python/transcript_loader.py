@@ -0,0 +1,135 @@
+"""
+Concurrent transcript segment loader backed by the embedding cache's segment store.
+
+The SDK's transcript.get_paragraphs() and transcript.get_sentences() are two blocking round-trips
+made one after the other, on every run. TranscriptLoader requests both endpoints at the same time,
+for any number of transcript ids, over one pooled requests.Session. Each transcript's paragraph
+and sentence texts are kept with TranscriptEmbeddingCache.put_segments, the same store
+load_transcript_embeddings reads, so later runs, and the other validators, read them from disk.
+
+    loader = TranscriptLoader()
+    paragraphs, sentences = loader.load(transcript_id)
+    segments = loader.load_many(transcript_ids)  # {transcript_id: (paragraphs, sentences)}
+
+base_url points the loader at any server speaking the AssemblyAI transcript API, e.g. a local fake in tests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from embedding_cache import get_default_cache
+
+DEFAULT_BASE_URL = os.environ.get("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TranscriptLoader:
+    """
+    Args:
+    - api_key (str): AssemblyAI key; defaults to the assemblyai_key environment variable like the validators.
+    - base_url (str): API root, e.g. the URL of a local fake server.
+    - cache (TranscriptEmbeddingCache): segment store; defaults to the shared on-disk cache. Pass False to always fetch.
+    - max_workers (int): concurrent HTTP requests (two per transcript); also the connection pool size.
+    - timeout (float): per-request timeout in seconds.
+    - max_retries (int): retries of connection errors and 429/5xx answers, with exponential backoff.
+    """
+
+    def __init__(self, api_key=None, base_url=DEFAULT_BASE_URL, cache=None, max_workers=8, timeout=60.0, max_retries=3):
+        self.api_key = api_key if api_key is not None else os.environ.get("assemblyai_key")
+        self.base_url = base_url.rstrip("/")
+        self.cache = get_default_cache() if cache is None else cache
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES, allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if self.api_key:
+            self.session.headers["Authorization"] = self.api_key
+
+    def _fetch_texts(self, transcript_id, kind):
+        # kind is "paragraphs" or "sentences"; both endpoints answer {kind: [{"text": ...}, ...], ...}
+        with metrics.span("transcript_fetch", stage=f"get_{kind}"):
+            response = self.session.get(f"{self.base_url}/v2/transcript/{transcript_id}/{kind}", timeout=self.timeout)
+            response.raise_for_status()
+            return [item["text"] for item in response.json()[kind]]
+
+    def fetch_many(self, transcript_ids, return_exceptions=False):
+        """
+        Fetch paragraphs and sentences of every id from the API, all requests in flight together.
+
+        Returns:
+        - dict: transcript id -> (paragraphs, sentences), or -> the exception when return_exceptions is set.
+        """
+        transcript_ids = list(dict.fromkeys(transcript_ids))
+        if not transcript_ids:
+            return {}
+        results = {}
+        with ThreadPoolExecutor(min(self.max_workers, 2 * len(transcript_ids))) as pool:
+            futures = {
+                transcript_id: (pool.submit(self._fetch_texts, transcript_id, "paragraphs"),
+                                pool.submit(self._fetch_texts, transcript_id, "sentences"))
+                for transcript_id in transcript_ids
+            }
+            for transcript_id, (paragraphs, sentences) in futures.items():
+                try:
+                    results[transcript_id] = (paragraphs.result(), sentences.result())
+                except Exception as e:
+                    if not return_exceptions:
+                        for pending in futures.values():
+                            for future in pending:
+                                future.cancel()
+                        raise
+                    results[transcript_id] = e
+        return results
+
+    def load_many(self, transcript_ids, return_exceptions=False):
+        """
+        Segments of every id: from the segment cache where present, fetched concurrently (and cached) otherwise.
+        """
+        transcript_ids = list(dict.fromkeys(transcript_ids))
+        found = {}
+        if self.cache:
+            for transcript_id in transcript_ids:
+                segments = self.cache.get_segments(transcript_id)
+                if segments is not None:
+                    found[transcript_id] = segments
+        metrics.incr("segment_cache_hits", len(found))
+        missing = [transcript_id for transcript_id in transcript_ids if transcript_id not in found]
+        metrics.incr("segment_cache_misses", len(missing))
+        for transcript_id, segments in self.fetch_many(missing, return_exceptions).items():
+            if self.cache and not isinstance(segments, Exception):
+                self.cache.put_segments(transcript_id, *segments)
+            found[transcript_id] = segments
+        return {transcript_id: found[transcript_id] for transcript_id in transcript_ids}
+
+    def load(self, transcript_id):
+        """
+        Returns:
+        - (list, list): paragraph texts and sentence texts of the transcript.
+        """
+        return self.load_many([transcript_id])[transcript_id]
+
+
+_default_loader = None
+_default_loader_pid = None
+_default_loader_lock = threading.Lock()
+
+
+def get_default_loader():
+    """
+    The process-wide loader. A forked worker (bulk_validate) gets its own, since pooled sockets
+    must not be shared across processes.
+    """
+    global _default_loader, _default_loader_pid
+    with _default_loader_lock:
+        if _default_loader is None or _default_loader_pid != os.getpid():
+            _default_loader = TranscriptLoader()
+            _default_loader_pid = os.getpid()
+        return _default_loader
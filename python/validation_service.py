@@ -0,0 +1,307 @@
+"""
+Long-running local HTTP service for summary, QA and action-item grounding.
+
+The scripts pay the model load, the punkt check and the transcript fetch on every run. The
+service pays them once at start-up and then keeps transcripts indexed in memory. Concurrent
+requests share the encoder through a MicroBatcher. It coalesces the texts of every request that
+arrives within max_wait into one encoder batch of up to max_batch texts.
+
+Endpoints (JSON in and out):
+
+    POST /v1/validate       a bulk_validate manifest job: transcript_id, transcript_text or
+                            transcript_sentences, plus any of summary, qa and action_items
+    POST /v1/summary        the same body, only the summary is validated
+    POST /v1/qa             the same body, only qa
+    POST /v1/action_items   the same body, only action_items (a list of items or a LeMUR response)
+    GET  /health            status, loaded models and in-flight requests
+    GET  /metrics           the metrics module in Prometheus text format
+
+Requests beyond --max-in-flight get a 503 with Retry-After instead of queueing without bound.
+
+    python validation_service.py [--port 8765] [--model NAME] [--max-batch 64] [--max-wait-ms 5] [--max-in-flight 64]
+"""
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+
+import metrics
+import model_registry
+from action_items_embeddings_citations import validate_action_items
+from bulk_validate import DEFAULT_MODEL, transcript_key
+from chunking import split_into_paragraphs
+from embedding_cache import encode_segments, load_transcript_embeddings
+from grounding import FusedIndex
+from model_registry import get_encoder, sent_tokenize
+
+OUTPUTS = ("summary", "qa", "action_items")
+TRANSCRIPT_CACHE_SIZE = 32
+
+
+class MicroBatcher:
+    """
+    Encoder wrapper that merges concurrent encode calls into shared batches.
+
+    Each encode call queues its texts and blocks. A single worker thread takes the first waiting
+    call, keeps collecting calls for up to max_wait seconds or until max_batch texts are
+    gathered, encodes them all at once and hands every caller its own rows. A call that would push
+    the batch past max_batch starts the next batch instead; a call larger than max_batch is
+    encoded on its own. Calls with keyword arguments or a single string skip the queue.
+    """
+
+    def __init__(self, encoder, max_batch=64, max_wait=0.005):
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        # A call that did not fit the previous batch; it starts the next one ahead of the queue
+        self.pending = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        # Everything else (model, stats, clear...) is the wrapped encoder's
+        if name == "encoder":
+            raise AttributeError(name)
+        return getattr(self.encoder, name)
+
+    def encode(self, sentences, **kwargs):
+        if kwargs or isinstance(sentences, str) or len(sentences) == 0:
+            return self.encoder.encode(sentences, **kwargs)
+        future = Future()
+        self.queue.put((list(sentences), future))
+        return future.result()
+
+    def _collect(self, first):
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Closing: finish this batch, then let _run see the sentinel
+                self.queue.put(None)
+                break
+            if size + len(item[0]) > self.max_batch:
+                self.pending = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first, self.pending = self.pending or self.queue.get(), None
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = [text for sentences, _ in batch for text in sentences]
+            try:
+                embeddings = self.encoder.encode(texts)
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            metrics.incr("microbatch_calls", len(batch))
+            metrics.observe("microbatch_texts", len(texts))
+            offset = 0
+            for sentences, future in batch:
+                future.set_result(embeddings[offset:offset + len(sentences)])
+                offset += len(sentences)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class ValidationService:
+    """
+    The validation logic behind the HTTP handler, usable without a server.
+
+    Args:
+    - model_name (str): sentence transformer used for transcripts and outputs.
+    - k (int): nearest transcript items kept per granularity.
+    - max_in_flight (int): concurrent requests admitted before answering 503.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, k=3, max_in_flight=64):
+        self.model_name = model_name
+        self.k = k
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        # transcript key -> (texts, FusedIndex), most recently used last
+        self.transcripts = OrderedDict()
+
+    def try_acquire(self):
+        with self.lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def health(self):
+        return {
+            "status": "ok",
+            "model": self.model_name,
+            "loaded_models": model_registry.loaded_models(),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "transcripts_cached": len(self.transcripts),
+        }
+
+    def transcript(self, job):
+        """
+        Segments and fused index of the job's transcript, built once and kept in a small LRU.
+        """
+        key = transcript_key(job)
+        with self.lock:
+            entry = self.transcripts.get(key)
+            if entry is not None:
+                self.transcripts.move_to_end(key)
+                return entry
+        model = get_encoder(self.model_name)
+        if job.get("transcript_id"):
+            from transcript_loader import get_default_loader
+
+            texts, embeddings = load_transcript_embeddings(
+                job["transcript_id"], self.model_name, lambda: get_default_loader().load(job["transcript_id"]), model.encode
+            )
+        else:
+            sentences = job.get("transcript_sentences") or sent_tokenize(job["transcript_text"])
+            paragraphs = job.get("transcript_paragraphs") or split_into_paragraphs(sentences)
+            texts, embeddings = encode_segments(paragraphs, sentences, model.encode)
+        entry = (texts, FusedIndex(embeddings))
+        with self.lock:
+            self.transcripts[key] = entry
+            while len(self.transcripts) > TRANSCRIPT_CACHE_SIZE:
+                self.transcripts.popitem(last=False)
+        return entry
+
+    def validate(self, job, outputs=OUTPUTS):
+        """
+        Validate the requested outputs of one job; same result format as bulk_validate.validate_job.
+        """
+        from qa_embeddings_citations import process_lemur_qa_batch
+        from summary_embeddings_citations import filter_summary_sentences_local
+
+        if not (job.get("transcript_id") or job.get("transcript_text") or job.get("transcript_sentences")):
+            raise ValueError("A job needs transcript_id, transcript_text or transcript_sentences")
+        with metrics.span("service_request"):
+            texts, index = self.transcript(job)
+            result = {"id": job.get("id"), "transcript": transcript_key(job)}
+            if "summary" in outputs and job.get("summary"):
+                new_summary, filtered_sentences = filter_summary_sentences_local(job["summary"], index, self.model_name, self.k)
+                result["summary"] = {"new_summary": new_summary, "filtered_sentences": filtered_sentences}
+            if "qa" in outputs and job.get("qa"):
+                result["qa"] = process_lemur_qa_batch([(texts, index, job["qa"])], self.k, self.model_name)[0]
+            if "action_items" in outputs and job.get("action_items"):
+                action_items = validate_action_items(job["action_items"], texts, index, self.model_name, self.k)
+                result["action_items"] = action_items["action_items"]
+                result["action_item_sections"] = action_items["sections"]
+        return result
+
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    ROUTES = {
+        "/v1/validate": OUTPUTS,
+        "/v1/summary": ("summary",),
+        "/v1/qa": ("qa",),
+        "/v1/action_items": ("action_items",),
+    }
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json", headers=None):
+        payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._reply(200, self.server.service.health())
+        if self.path == "/metrics":
+            return self._reply(200, metrics.to_prometheus(), "text/plain; version=0.0.4")
+        return self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        outputs = self.ROUTES.get(self.path)
+        if outputs is None:
+            return self._reply(404, {"error": f"Unknown path {self.path}"})
+        service = self.server.service
+        if not service.try_acquire():
+            metrics.incr("service_rejected")
+            return self._reply(503, {"error": "Too many requests in flight"}, headers={"Retry-After": "1"})
+        try:
+            try:
+                job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError as e:
+                return self._reply(400, {"error": f"Invalid JSON: {e}"})
+            try:
+                result = service.validate(job, outputs)
+            except (KeyError, TypeError, ValueError) as e:
+                return self._reply(400, {"error": str(e)})
+            except Exception as e:
+                metrics.incr("service_errors")
+                return self._reply(500, {"error": str(e)})
+            return self._reply(200, result)
+        finally:
+            service.release()
+
+
+def make_server(service, host="127.0.0.1", port=8765, max_batch=64, max_wait=0.005):
+    """
+    Bind a ThreadingHTTPServer for service and put a MicroBatcher in front of its model's encoder.
+
+    Does not start serving; call serve_forever() (tests run it on a thread with port=0).
+    """
+    model_registry.wrap_encoder(service.model_name, lambda encoder: MicroBatcher(encoder, max_batch, max_wait))
+    server = ThreadingHTTPServer((host, port), ValidationHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    args = parser.parse_args()
+
+    metrics.enable()
+    # Model load and the punkt check happen here, once, instead of on the first request
+    model_registry.warm(args.model)
+    server = make_server(ValidationService(args.model, args.k, args.max_in_flight), args.host, args.port,
+                         args.max_batch, args.max_wait_ms / 1000)
+    print(f"Serving {args.model} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()